@@ -1,11 +1,15 @@
+import atexit
+
 from flask import Flask
 from flask_login import LoginManager, UserMixin
 
 from config.auth_config import load_user_config
 from config.server_config import Config
 from core.audio_manager import AudioManager
+from core.capture_backends import create_outputs
 from core.file_manager import FileManager
 from core.input_manager import InputManager
+from core.media_clock import ClockSync
 from core.shell_manager import ShellManager
 from core.stream_manager import StreamManager
 from core.system_manager import SystemManager
@@ -29,12 +33,25 @@ def create_app():
     login_manager.login_view = "auth.login"
 
     audio_manager = AudioManager(socketio)
-    stream_manager = StreamManager(socketio)
+    atexit.register(audio_manager.shutdown)
+    stream_manager = StreamManager(
+        socketio,
+        create_outputs(app.config["CAPTURE_BACKEND"], **app.config["CAPTURE_OPTIONS"]),
+        app.config["RECORDING_DIR"],
+        encoder_profile=app.config["ENCODER_PROFILE"],
+    )
+    # Initialize PortAudio and scan devices up front so the first audio start does not pay for it
+    socketio.start_background_task(audio_manager.warm_up)
+    if app.config["CALIBRATE_ENCODERS"] or stream_manager.encoder_profile is None:
+        socketio.start_background_task(stream_manager.calibrate_encoders)
     input_manager = InputManager()
+    input_manager.set_origin(stream_manager.get_input_origin())
+    stream_manager.origin_changed = input_manager.set_origin
     shell_manager = ShellManager()
     file_manager = FileManager()
     task_manager = TaskManager()
     system_manager = SystemManager()
+    clock_sync = ClockSync()
 
     app.input_manager = input_manager
     app.audio_manager = audio_manager
@@ -43,6 +60,7 @@ def create_app():
     app.file_manager = file_manager
     app.task_manager = task_manager
     app.system_manager = system_manager
+    app.clock_sync = clock_sync
 
     # Register blueprints
     app.register_blueprint(auth_routes.bp)
@@ -54,7 +72,7 @@ def create_app():
     app.register_blueprint(task_routes.bp)
 
     # Register socket event handlers
-    register_events(socketio, input_manager, audio_manager, shell_manager, task_manager)
+    register_events(socketio, app)
 
     @login_manager.user_loader
     def load_user(user_id):
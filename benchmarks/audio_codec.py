@@ -0,0 +1,91 @@
+# Compares the bandwidth, CPU time and added latency of raw PCM audio messages with Opus at several bitrates.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.audio_codec import AudioDecoder, AudioEncoder, available_codecs
+
+
+def synthetic_audio(rate, seconds):
+    # Speech-like: a wandering pitch with harmonics, amplitude bursts and a little noise
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * seconds)) / rate
+    pitch = 160 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / rate
+    voice = sum(np.sin(phase * harmonic) / harmonic for harmonic in range(1, 6))
+    envelope = np.clip(np.sin(2 * np.pi * 2.5 * t), 0, None)
+    samples = 0.25 * voice * envelope + 0.01 * rng.standard_normal(len(t))
+    return (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+
+
+def run(samples, args, codec, bitrate):
+    rate = args.rate
+    encoder = AudioEncoder(codec, rate, args.frame_ms, bitrate)
+    decoder = AudioDecoder(rate)
+    pcm = samples.tobytes()
+    chunk_bytes = args.chunk * 2
+    sent, encode_time, decode_time, decoded = 0, 0.0, 0.0, []
+    for offset in range(0, len(pcm) - chunk_bytes + 1, chunk_bytes):
+        start = time.perf_counter()
+        payload = encoder.encode(pcm[offset:offset + chunk_bytes])
+        encode_time += time.perf_counter() - start
+        if payload is None:
+            continue
+        sent += len(payload)
+        start = time.perf_counter()
+        decoded.append(decoder.decode(payload))
+        decode_time += time.perf_counter() - start
+
+    output = np.frombuffer(b"".join(decoded), dtype=np.int16).astype(np.float64)
+    reference = samples[:len(output)].astype(np.float64)
+    # Opus delays its output by a few milliseconds; align before comparing
+    lag = 0
+    if codec != "pcm":
+        window = min(len(output), rate)
+        correlation = np.correlate(output[:window], reference[:window // 2], mode="valid")
+        lag = int(np.argmax(correlation))
+    aligned = output[lag:]
+    noise = np.sum((aligned - reference[:len(aligned)]) ** 2) or 1e-9
+    snr = 10 * np.log10(np.sum(reference[:len(aligned)] ** 2) / noise)
+    return sent, encode_time, decode_time, lag, snr
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=int, default=48000)
+    parser.add_argument("--chunk", type=int, default=4096, help="Frames per device read")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--frame-ms", type=float, default=20)
+    parser.add_argument("--bitrates", type=int, nargs="+", default=[16, 32, 64], help="Opus bitrates in kbps")
+    args = parser.parse_args()
+
+    samples = synthetic_audio(args.rate, args.seconds)
+    seconds = len(samples) / args.rate
+    runs = [("pcm", None)]
+    if "opus" in available_codecs():
+        runs += [("opus", bitrate) for bitrate in args.bitrates]
+    else:
+        print("Opus unavailable: PyAV is missing or built without libopus")
+
+    pcm_kbps = None
+    chunk_ms = args.chunk / args.rate * 1000
+    print(f"{seconds:.1f}s of mono audio at {args.rate} Hz, {args.chunk}-frame reads ({chunk_ms:.1f} ms)")
+    for codec, bitrate in runs:
+        sent, encode_time, decode_time, lag, snr = run(samples, args, codec, bitrate or 32)
+        kbps = sent * 8 / seconds / 1000
+        pcm_kbps = pcm_kbps or kbps
+        # Added latency: samples held back for a partial frame, plus the codec's own lookahead
+        added_ms = (args.frame_ms if codec != "pcm" else 0) + lag / args.rate * 1000
+        label = codec if bitrate is None else f"{codec} {bitrate} kbps"
+        print(f"  {label:<14} {kbps:8.1f} kbps ({pcm_kbps / kbps:5.1f}x smaller) "
+              f"encode {encode_time / seconds * 1000:6.2f} ms/s decode {decode_time / seconds * 1000:6.2f} ms/s "
+              f"added latency <= {added_ms:5.1f} ms SNR {snr:5.1f} dB")
+
+
+if __name__ == "__main__":
+    main()
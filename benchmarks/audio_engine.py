@@ -0,0 +1,101 @@
+# Measures audio stream start/stop latency with a PyAudio host per stream versus the persistent audio engine.
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.audio_engine import PA_INT16, AudioEngine
+from tests.fake_audio import FAKE_DELAYS, FakeAudioBackend
+
+
+def legacy_start(backend, stream_name, rate, chunk):
+    # What every start used to do: a new host, plus a device scan and test open for system audio
+    host = backend.PyAudio()
+    args = {"format": PA_INT16, "channels": 1, "rate": rate, "frames_per_buffer": chunk, "input": True}
+    if stream_name == "server_system":
+        for index in range(host.get_device_count()):
+            if "stereo mix" in host.get_device_info_by_index(index)["name"].lower():
+                host.open(format=PA_INT16, channels=1, rate=44100, input=True, frames_per_buffer=1024,
+                          input_device_index=index, start=False).close()
+                args["input_device_index"] = index
+                break
+    return host, host.open(**args)
+
+
+def legacy_stop(host, stream):
+    stream.stop_stream()
+    stream.close()
+    host.terminate()
+
+
+def run_legacy(backend, stream_name, args):
+    starts, stops = [], []
+    for _ in range(args.toggles):
+        start = time.perf_counter()
+        host, stream = legacy_start(backend, stream_name, args.rate, args.chunk)
+        starts.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        legacy_stop(host, stream)
+        stops.append(time.perf_counter() - start)
+    return starts, stops
+
+
+def run_engine(backend, stream_name, args):
+    # The same calls AudioManager makes to start a stream on the shared engine
+    engine = AudioEngine(backend)
+    role = stream_name.removeprefix("server_")
+    starts, stops = [], []
+    for _ in range(args.toggles):
+        start = time.perf_counter()
+        device = engine.device_for(role, args.rate)
+        stream = engine.open(format=PA_INT16, channels=1, rate=args.rate, frames_per_buffer=args.chunk, input=True,
+                             input_device_index=device)
+        starts.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        engine.close(stream)
+        stops.append(time.perf_counter() - start)
+    return starts, stops
+
+
+def describe(label, starts, stops, hosts):
+    print(f"  {label:<8} first start {starts[0] * 1000:7.1f} ms, later starts median "
+          f"{statistics.median(starts[1:] or starts) * 1000:6.1f} ms, stop median {statistics.median(stops) * 1000:6.1f} ms, "
+          f"{hosts} host init(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--toggles", type=int, default=10)
+    parser.add_argument("--rate", type=int, default=48000)
+    parser.add_argument("--chunk", type=int, default=4096)
+    parser.add_argument("--init-delay", type=float, default=FAKE_DELAYS["init_delay"],
+                        help="Simulated PortAudio initialization, seconds")
+    parser.add_argument("--query-delay", type=float, default=FAKE_DELAYS["query_delay"],
+                        help="Simulated device query, seconds")
+    parser.add_argument("--open-delay", type=float, default=FAKE_DELAYS["open_delay"],
+                        help="Simulated stream open, seconds")
+    parser.add_argument("--terminate-delay", type=float, default=FAKE_DELAYS["terminate_delay"],
+                        help="Simulated PortAudio shutdown, seconds")
+    args = parser.parse_args()
+
+    delays = {
+        "init_delay": args.init_delay,
+        "query_delay": args.query_delay,
+        "open_delay": args.open_delay,
+        "terminate_delay": args.terminate_delay,
+    }
+    for stream_name in ("server_mic", "server_system"):
+        print(f"{stream_name}, {args.toggles} start/stop toggles")
+        backend = FakeAudioBackend(**delays)
+        starts, stops = run_legacy(backend, stream_name, args)
+        describe("legacy", starts, stops, backend.hosts)
+        backend = FakeAudioBackend(**delays)
+        starts, stops = run_engine(backend, stream_name, args)
+        describe("engine", starts, stops, backend.hosts)
+
+
+if __name__ == "__main__":
+    main()
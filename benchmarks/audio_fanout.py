@@ -0,0 +1,67 @@
+# Measures server audio delivery to several listeners sharing one capture, with some listeners too slow to keep up.
+import argparse
+import itertools
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.audio_codec import unpack_header
+from core.audio_manager import AudioManager
+from core.media_clock import media_time
+from tests.fake_audio import FakeAudioBackend
+
+
+class FakeSocketIO:
+    # Records what each listener received; slow listeners take send_delay per message, like a congested link
+    def __init__(self, slow, send_delay):
+        self.slow = slow
+        self.send_delay = send_delay
+        self.received = {}
+
+    def emit(self, event, data, room=None):  # noqa: ARG002
+        if room in self.slow:
+            time.sleep(self.send_delay)
+        _, sequence, _, timestamp = unpack_header(data)
+        self.received.setdefault(room, []).append((sequence, media_time() - timestamp))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listeners", type=int, default=4)
+    parser.add_argument("--slow", type=int, default=1, help="How many of the listeners cannot keep up")
+    parser.add_argument("--send-delay", type=float, default=0.1, help="Seconds a slow listener takes per message")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--chunk", type=int, default=960)
+    parser.add_argument("--codec", default="pcm")
+    args = parser.parse_args()
+
+    sids = [f"listener{i}" for i in range(args.listeners)]
+    socketio = FakeSocketIO(set(sids[:args.slow]), args.send_delay)
+    backend = FakeAudioBackend(init_delay=0, query_delay=0, open_delay=0, terminate_delay=0)
+    manager = AudioManager(socketio, backend)
+    manager.update_settings({"type": "server", "chunk": args.chunk, "codec": args.codec})
+    for sid in sids:
+        manager.start_stream(sid, "server_mic")
+    time.sleep(args.seconds)
+    listeners = manager.get_stats()["listeners"]["server_mic"]
+    for sid in sids:
+        manager.stop_stream("server_mic", sid)
+
+    print(f"{args.listeners} listeners ({args.slow} slow) on one microphone capture, {args.seconds:.0f}s, "
+          f"{backend.opened} device stream(s) opened")
+    for sid in sids:
+        received = socketio.received.get(sid, [])
+        sequences = [sequence for sequence, _ in received]
+        gaps = sum(1 for previous, sequence in itertools.pairwise(sequences) if sequence != previous + 1)
+        latency = statistics.median(latency for _, latency in received) * 1000 if received else 0.0
+        stats = listeners[sid]
+        print(f"  {sid}{' (slow)' if sid in socketio.slow else '       '} received {len(received):4d}, "
+              f"dropped {stats['dropped']:4d}, gaps {gaps:4d}, queued {stats['queued']:3d}, "
+              f"median capture-to-send {latency:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
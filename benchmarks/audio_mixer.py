@@ -0,0 +1,55 @@
+# Measures the CPU cost of resampling and mixing microphone and system audio, per second of mixed output.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.audio_mixer import AudioMixer
+
+
+def tone(rate, seconds, frequency):
+    t = np.arange(int(rate * seconds)) / rate
+    return (np.sin(2 * np.pi * frequency * t) * 8000).astype(np.int16).tobytes()
+
+
+def run(args, chunk):
+    sources = {"mic": args.mic_rate, "system": args.system_rate}
+    mixer = AudioMixer(args.rate, sources, {"mic": 1.0, "system": 0.8})
+    pcm = {name: tone(rate, args.seconds, 440 if name == "mic" else 660) for name, rate in sources.items()}
+    # Each source reads the same duration per chunk at its own rate, as the capture threads do
+    chunks = {name: round(chunk * rate / args.rate) * 2 for name, rate in sources.items()}
+    reads = min(len(pcm[name]) // chunks[name] for name in sources)
+
+    mixed = 0
+    start = time.process_time()
+    for index in range(reads):
+        for name in ("system", "mic"):
+            size = chunks[name]
+            mixer.push(name, pcm[name][index * size:(index + 1) * size])
+        mixed += len(mixer.mix()) // 2
+    elapsed = time.process_time() - start
+    return mixed / args.rate, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=int, default=48000, help="Mixed output rate")
+    parser.add_argument("--mic-rate", type=int, default=48000)
+    parser.add_argument("--system-rate", type=int, default=44100)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[256, 1024, 4096], help="Output frames per read")
+    args = parser.parse_args()
+
+    print(f"mic {args.mic_rate} Hz + system {args.system_rate} Hz -> {args.rate} Hz, {args.seconds:.0f}s of audio")
+    for chunk in args.chunks:
+        seconds, elapsed = run(args, chunk)
+        print(f"  chunk {chunk:>5}: {elapsed / seconds * 1000:6.3f} ms CPU per second of audio "
+              f"({elapsed / seconds * 100:5.3f}% of one core)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Measures time and transient allocations per frame of the scale/encode/serialize hot loop,
+# comparing the previous per-frame allocating path with the buffer-reusing one.
+import argparse
+import base64
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.capture_backends import SyntheticBackend
+from core.image_encoders import encode_jpeg
+from core.stream_pipeline import EncodedFrame, FrameScaler, scale_frame
+from core.stream_protocol import format_sse_frame, pack_encoded_frame
+
+
+def legacy_sse(payload, fps, extra):
+    data = {"image": base64.b64encode(payload).decode(), "fps": fps, **extra}
+    return f"data: {json.dumps(data)}\n\n".encode()
+
+
+def legacy_loop(frames, args):
+    height, width = frames[0].shape[:2]
+
+    def run(seq, frame):
+        scaled = scale_frame(frame, args.resolution, width, height)
+        buffer = encode_jpeg(scaled, args.quality)
+        encoded = EncodedFrame(seq, 0.0, scaled.shape[1], scaled.shape[0], keyframe=True, tiles=[(0, 0, 0, 0, buffer)])
+        # Every viewer serialized the frame on its own
+        for _ in range(args.viewers):
+            if args.transport == "sse":
+                legacy_sse(buffer, 60, {"seq": seq})
+            else:
+                pack_encoded_frame(encoded)
+
+    return run
+
+
+def current_loop(args):
+    scaler = FrameScaler()
+
+    def run(seq, frame):
+        scaled = scaler.scale(frame, args.resolution, args.interpolation)
+        buffer = encode_jpeg(scaled, args.quality)
+        encoded = EncodedFrame(seq, 0.0, scaled.shape[1], scaled.shape[0], keyframe=True, tiles=[(0, 0, 0, 0, buffer)])
+        payload = format_sse_frame(buffer, 60, {"seq": seq}) if args.transport == "sse" else pack_encoded_frame(encoded)
+        # Viewers share the serialized payload
+        for _ in range(args.viewers):
+            len(payload)
+
+    return run
+
+
+def measure(label, run, frames):
+    run(0, frames[0])
+    start = time.perf_counter()
+    for seq, frame in enumerate(frames, 1):
+        run(seq, frame)
+    elapsed = (time.perf_counter() - start) / len(frames)
+
+    tracemalloc.start()
+    peaks = []
+    for seq, frame in enumerate(frames, 1):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        run(seq, frame)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - baseline)
+    tracemalloc.stop()
+
+    peak = sum(peaks) / len(peaks) / 1024
+    print(f"{label:<8} {elapsed * 1e3:8.2f} ms/frame {peak:10.1f} KiB allocated at peak/frame")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--resolution", type=int, default=50)
+    parser.add_argument("--interpolation", choices=("nearest", "linear", "area", "cubic"), default="linear")
+    parser.add_argument("--transport", choices=("binary", "sse"), default="sse")
+    parser.add_argument("--viewers", type=int, default=3)
+    args = parser.parse_args()
+
+    source = SyntheticBackend(args.width, args.height, change_rate=0.02)
+    frames = [source.grab() for _ in range(args.frames)]
+
+    print(f"{args.width}x{args.height} at {args.resolution}% q={args.quality}, "
+          f"{args.transport}, {args.viewers} viewer(s)")
+    measure("legacy", legacy_loop(frames, args), frames)
+    measure("current", current_loop(args), frames)
+
+
+if __name__ == "__main__":
+    main()
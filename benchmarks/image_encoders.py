@@ -0,0 +1,45 @@
+# Runs the encoder calibration on synthetic or replayed frames and shows which encoder each target bitrate selects.
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.capture_backends import ReplayBackend, SyntheticBackend
+from core.encoder_calibration import calibrate, select_encoder
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replay", help="Directory of frames or .npy/.npz file to replay instead of synthetic frames")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--change-rate", type=float, default=0.02)
+    parser.add_argument("--frames", type=int, default=3)
+    parser.add_argument("--quality", type=int, default=70)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--bitrates", type=int, nargs="+", default=[2000, 10000, 50000, 200000],
+                        help="Target bitrates in kbps to select an encoder for")
+    args = parser.parse_args()
+
+    source = ReplayBackend(args.replay) if args.replay else SyntheticBackend(args.width, args.height,
+                                                                            change_rate=args.change_rate)
+    frames = [source.grab() for _ in range(args.frames)]
+    profile = calibrate(frames)
+
+    height, width = frames[0].shape[:2]
+    pixels = width * height
+    print(f"{profile['machine']} ({profile['cpu_count']} CPUs), {len(frames)} frame(s) of {width}x{height}")
+    for result in profile["results"]:
+        ms = result["ms_per_mpx"] * pixels / 1e6
+        kbps = result["bytes_per_px"] * pixels * args.fps * 8 / 1000
+        print(f"  {result['encoder']:<16} q={result['quality']:<3} {ms:8.2f} ms/frame "
+              f"{result['bytes_per_px'] * pixels / 1024:8.1f} KiB/frame {kbps:10.0f} kbps at {args.fps} FPS")
+    for bitrate in args.bitrates:
+        encoder = select_encoder(profile, args.quality, (pixels, args.fps), bitrate, args.workers)
+        print(f"target {bitrate:>7} kbps -> {encoder}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Runs the full StreamManager pipeline headless against a synthetic or replayed capture source.
+import argparse
+import sys
+import time
+from pathlib import Path
+from threading import Thread
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.capture_backends import ReplayBackend, SyntheticBackend
+from core.stream_manager import LAYERS, StreamManager
+from core.stream_protocol import pack_encoded_frame
+
+
+def consume(subscriber, deadline, totals):
+    while time.perf_counter() < deadline:
+        frame = subscriber.get()
+        if frame is not None:
+            totals[subscriber.sid] += len(pack_encoded_frame(frame))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replay", help="Directory of frames or .npy/.npz file to replay instead of synthetic frames")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--change-rate", type=float, default=0.02)
+    parser.add_argument("--encoding", choices=("jpeg", "tiles", "h264", "vp8"), default="jpeg")
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--resolution", type=int, default=100)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--viewers", type=int, default=1)
+    parser.add_argument("--viewport", type=int, nargs=4, metavar=("X", "Y", "WIDTH", "HEIGHT"),
+                        help="Stream only this native region")
+    parser.add_argument("--outputs", type=int, default=1, help="Number of side-by-side synthetic displays")
+    parser.add_argument("--output", default="0",
+                        help="Display index to stream, 'desktop' for all of them composited, or 'each' for one "
+                             "independent pipeline per display")
+    parser.add_argument("--layers", nargs="+", choices=LAYERS,
+                        help="Simulcast layers of the default profile to subscribe viewers to")
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    if args.replay:
+        backends = [ReplayBackend(args.replay)]
+    else:
+        backends = [
+            SyntheticBackend(args.width, args.height, change_rate=args.change_rate, seed=index,
+                             origin=(index * args.width, 0))
+            for index in range(args.outputs)
+        ]
+
+    manager = StreamManager(socketio=None, capture_backend=backends)
+    outputs = range(len(backends)) if args.output == "each" else [args.output]
+    profiles = []
+    for output in outputs:
+        profile = "default" if not profiles else f"output-{output}"
+        manager.update_settings({
+            "profile": profile,
+            "output": output,
+            "encoding": args.encoding,
+            "quality": args.quality,
+            "resolution_percentage": args.resolution,
+            "target_fps": args.fps,
+            "encode_workers": args.workers,
+            "viewport": dict(zip(("x", "y", "width", "height"), args.viewport, strict=True)) if args.viewport else None,
+        })
+        profiles.append(profile)
+
+    subscribers = [
+        manager.subscribe(f"{profile}-viewer-{i}", profile, binary=True)
+        for profile in profiles
+        for i in range(args.viewers)
+    ] if not args.layers else [
+        manager.subscribe(f"{layer}-viewer-{i}", binary=True, layer=layer)
+        for layer in args.layers
+        for i in range(args.viewers)
+    ]
+    totals = {subscriber.sid: 0 for subscriber in subscribers}
+    deadline = time.perf_counter() + args.seconds
+    cpu_start = time.process_time()
+    threads = [Thread(target=consume, args=(subscriber, deadline, totals)) for subscriber in subscribers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cpu = time.process_time() - cpu_start
+
+    all_stats = manager.get_stream_stats()
+    manager.stop_all()
+
+    print(f"{args.encoding} q={args.quality} {args.viewers} viewer(s) per pipeline, "
+          f"{cpu / args.seconds * 100:.0f}% CPU")
+    for stats in all_stats:
+        settings = manager.get_current_settings(stats["profile"])
+        print(f"{stats['profile']}: output {settings['output']} {settings['native_width']}x{settings['native_height']}")
+        for stage, values in stats["pipeline"].items():
+            if values["processed"]:
+                print(f"  {stage:<12} {values['fps']:6.1f} fps {values['avg_ms']:8.2f} ms avg "
+                      f"p95 {values['p95_ms']:8.2f} ms p99 {values['p99_ms']:8.2f} ms {values['dropped']:6d} dropped")
+        for sid, delivery in stats["subscribers"].items():
+            print(f"  {sid:<20} {delivery['sent'] / args.seconds:6.1f} fps "
+                  f"{totals[sid] / max(1, delivery['sent']) / 1024:8.1f} KiB/frame {delivery['dropped']:6d} dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# Compares bytes on the wire and server CPU per frame for the SSE and binary stream transports.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.capture_backends import render_desktop
+from core.image_encoders import encode_jpeg
+from core.stream_protocol import FRAME_JPEG, FrameInfo, format_sse_frame, pack_frame
+
+# Socket.IO sends a binary event as a text placeholder packet plus one binary attachment.
+SOCKETIO_BINARY_OVERHEAD = len('451-["stream_frame",{"_placeholder":true,"num":0}]') + 1
+
+
+def measure(label, frames, serialize):
+    total_bytes = 0
+    start = time.process_time()
+    for seq, buffer in enumerate(frames, 1):
+        total_bytes += serialize(seq, buffer)
+    cpu = time.process_time() - start
+    count = len(frames)
+    print(f"{label:<8} {total_bytes / count / 1024:10.1f} KiB/frame {cpu / count * 1e6:10.1f} us CPU/frame")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    frame = render_desktop(args.width, args.height)
+    start = time.process_time()
+    buffers = [encode_jpeg(frame, args.quality) for _ in range(args.frames)]
+    encode_cpu = (time.process_time() - start) / args.frames
+    print(f"{args.width}x{args.height} q={args.quality}: JPEG {len(buffers[0]) / 1024:.1f} KiB, "
+          f"encode {encode_cpu * 1e6:.1f} us CPU/frame (shared by both transports)\n")
+
+    measure("sse", buffers, lambda _, buffer: len(format_sse_frame(buffer, 60)))
+    measure("binary", buffers, lambda seq, buffer: len(
+        pack_frame(FRAME_JPEG, FrameInfo(seq, time.time(), args.width, args.height), buffer),
+    ) + SOCKETIO_BINARY_OVERHEAD)
+
+
+if __name__ == "__main__":
+    main()
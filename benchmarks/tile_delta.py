@@ -0,0 +1,66 @@
+# Compares full-frame JPEG encoding with tile delta encoding on a mostly static desktop.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.capture_backends import SyntheticBackend
+from core.image_encoders import encode_jpeg
+from core.stream_protocol import FLAG_KEYFRAME, FRAME_JPEG, FrameInfo, pack_frame, pack_tiles
+from core.tile_encoder import TileEncoder
+
+
+def run_full(frames, quality):
+    total = 0
+    for seq, frame in enumerate(frames, 1):
+        height, width = frame.shape[:2]
+        info = FrameInfo(seq, 0.0, width, height)
+        total += len(pack_frame(FRAME_JPEG, info, encode_jpeg(frame, quality), FLAG_KEYFRAME))
+    return total
+
+
+def run_tiles(frames, quality, tile_size, keyframe_interval):
+    encoder = TileEncoder(tile_size, keyframe_interval)
+    total = 0
+    for seq, frame in enumerate(frames, 1):
+        height, width = frame.shape[:2]
+        info = FrameInfo(seq, 0.0, width, height)
+        keyframe, rects = encoder.dirty_tiles(frame)
+        if not rects:
+            continue
+        tiles = [(x, y, w, h, encode_jpeg(frame[y:y + h, x:x + w], quality)) for x, y, w, h in rects]
+        if keyframe:
+            total += len(pack_frame(FRAME_JPEG, info, tiles[0][4], FLAG_KEYFRAME))
+        else:
+            total += len(pack_tiles(info, tiles, keyframe))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--tile-size", type=int, default=64)
+    parser.add_argument("--keyframe-interval", type=int, default=300)
+    args = parser.parse_args()
+
+    # A blinking caret toggling every 15 frames is the only change on screen.
+    source = SyntheticBackend(args.width, args.height, change_rate=0, caret_blink=15)
+    frames = [source.grab() for _ in range(args.frames)]
+
+    for label, run in (
+        ("full", lambda: run_full(frames, args.quality)),
+        ("tiles", lambda: run_tiles(frames, args.quality, args.tile_size, args.keyframe_interval)),
+    ):
+        start = time.process_time()
+        total = run()
+        cpu = time.process_time() - start
+        print(f"{label:<6} {total / args.frames / 1024:10.1f} KiB/frame {cpu / args.frames * 1e3:8.2f} ms CPU/frame")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Compares bitrate and per-frame latency of the JPEG stream with the inter-frame video codecs.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from cv2 import IMREAD_COLOR, imdecode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.capture_backends import SyntheticBackend
+from core.image_encoders import encode_jpeg
+from core.video_encoder import VIDEO_CODECS, VideoEncoder, av, available_codecs, even_frame
+
+
+def run_jpeg(frames, quality):
+    sizes, encode_times, decode_times = [], [], []
+    for frame in frames:
+        start = time.perf_counter()
+        payload = encode_jpeg(frame, quality)
+        encode_times.append(time.perf_counter() - start)
+        sizes.append(len(payload))
+
+        start = time.perf_counter()
+        imdecode(payload, IMREAD_COLOR)
+        decode_times.append(time.perf_counter() - start)
+    return sizes, encode_times, decode_times
+
+
+def run_video(frames, codec, fps, bitrate, gop_size):
+    height, width = frames[0].shape[:2]
+    encoder = VideoEncoder(codec, (width, height), fps, bitrate, gop_size)
+    decoder = av.CodecContext.create(codec, "r")
+    sizes, encode_times, decode_times = [], [], []
+    for frame in frames:
+        start = time.perf_counter()
+        payload, _ = encoder.encode(frame)
+        encode_times.append(time.perf_counter() - start)
+        if payload is None:
+            continue
+        sizes.append(len(payload))
+
+        start = time.perf_counter()
+        for decoded in decoder.decode(av.Packet(payload)):
+            decoded.to_ndarray(format="bgr24")
+        decode_times.append(time.perf_counter() - start)
+    return sizes, encode_times, decode_times
+
+
+def report(label, results, frame_count, fps):
+    sizes, encode_times, decode_times = results
+    kbps = sum(sizes) * 8 / 1000 / (frame_count / fps)
+    encode_ms = np.array(encode_times) * 1e3
+    decode_ms = np.array(decode_times) * 1e3
+    print(f"{label:<6} {sum(sizes) / frame_count / 1024:8.1f} KiB/frame {kbps:9.0f} kbps "
+          f"encode {encode_ms.mean():6.2f} ms (p95 {np.percentile(encode_ms, 95):6.2f}) "
+          f"decode {decode_ms.mean():6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--change-rate", type=float, default=0.005)
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--bitrate", type=int, default=4000, help="Video bitrate in kbps")
+    parser.add_argument("--gop", type=int, default=120)
+    parser.add_argument("--codecs", nargs="*", choices=tuple(VIDEO_CODECS), default=None)
+    args = parser.parse_args()
+
+    source = SyntheticBackend(args.width, args.height, change_rate=args.change_rate)
+    frames = [even_frame(source.grab()) for _ in range(args.frames)]
+
+    report("jpeg", run_jpeg(frames, args.quality), args.frames, args.fps)
+    codecs = args.codecs if args.codecs is not None else available_codecs()
+    if not codecs:
+        print("No video codecs available; install PyAV (pip install av) to compare them.")
+    for codec in codecs:
+        report(codec, run_video(frames, codec, args.fps, args.bitrate, args.gop), args.frames, args.fps)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,14 @@
+import json
+import os
 import secrets
 
 
 class Config:
     SECRET_KEY = secrets.token_urlsafe(24)
+    # "dxcam" on Windows hosts; "synthetic" or "replay" to run the stream pipeline headless
+    CAPTURE_BACKEND = os.environ.get("CAPTURE_BACKEND", "dxcam")
+    CAPTURE_OPTIONS = json.loads(os.environ.get("CAPTURE_OPTIONS", "{}"))
+    RECORDING_DIR = os.environ.get("RECORDING_DIR", "recordings")
+    # Encoder benchmark results for this host, written by calibration and reused on later starts
+    ENCODER_PROFILE = os.environ.get("ENCODER_PROFILE", "encoder_profile.json")
+    CALIBRATE_ENCODERS = os.environ.get("CALIBRATE_ENCODERS", "").lower() in ("1", "true", "yes")
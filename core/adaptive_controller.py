@@ -0,0 +1,190 @@
+import time
+from threading import Lock
+
+DECREASE_INTERVAL = 0.5
+INCREASE_INTERVAL = 2.0
+SAMPLE_TIMEOUT = 5.0
+# Switching layers costs a keyframe, so it reacts slower than the encoder knobs
+LAYER_DECREASE_INTERVAL = 2.0
+LAYER_INCREASE_INTERVAL = 10.0
+
+
+class AdaptiveController:
+    def __init__(self, smoothing=0.2):
+        self.smoothing = smoothing
+        self.lock = Lock()
+        self.enabled = False
+        self.target_latency = 0.15
+        self.max_queue_depth = 4
+        self.bounds = {}
+        self.quality = 100
+        self.resolution_percentage = 100
+        self.fps = 60
+        self.samples = {}
+        self.decision = None
+        self.decisions = 0
+        self.last_decision_time = 0.0
+
+    def configure(self, settings):
+        with self.lock:
+            enabled = settings["adaptive"]
+            bounds = {
+                "quality": (settings["min_quality"], settings["quality"]),
+                "resolution_percentage": (settings["min_resolution_percentage"], settings["resolution_percentage"]),
+                "fps": (settings["min_fps"], settings["target_fps"] or 60),
+            }
+            self.target_latency = settings["target_latency"] / 1000
+            self.max_queue_depth = settings["max_queue_depth"]
+            if enabled and not self.enabled:
+                # Start from the user's settings and only back off once congestion shows up
+                self.quality, self.resolution_percentage, self.fps = (high for _, high in bounds.values())
+                self.samples.clear()
+            self.enabled = enabled
+            self.bounds = bounds
+            for knob, (low, high) in bounds.items():
+                setattr(self, knob, max(min(low, high), min(high, getattr(self, knob))))
+
+    def current(self):
+        with self.lock:
+            return self.quality, self.resolution_percentage, self.fps
+
+    def record(self, sid, latency, rtt, queue_depth):
+        with self.lock:
+            previous = self.samples.get(sid)
+            if previous:
+                alpha = self.smoothing
+                latency = previous[0] + alpha * (latency - previous[0])
+                rtt = previous[1] + alpha * (rtt - previous[1])
+            self.samples[sid] = (latency, rtt, queue_depth, time.time())
+
+    def forget(self, sid):
+        with self.lock:
+            self.samples.pop(sid, None)
+
+    def update(self):
+        with self.lock:
+            if not self.enabled:
+                return None
+
+            now = time.time()
+            samples = [sample for sample in self.samples.values() if now - sample[3] < SAMPLE_TIMEOUT]
+            if not samples:
+                return None
+
+            # A shared broadcast has to keep its slowest viewer within budget
+            latency = max(sample[0] for sample in samples)
+            queue_depth = max(sample[2] for sample in samples)
+            elapsed = now - self.last_decision_time
+
+            if latency > self.target_latency * 1.25 or queue_depth > self.max_queue_depth:
+                decision = self._decrease() if elapsed >= DECREASE_INTERVAL else None
+            elif latency < self.target_latency * 0.75 and queue_depth <= 1:
+                decision = self._increase() if elapsed >= INCREASE_INTERVAL else None
+            else:
+                decision = None
+
+            if decision:
+                self.decision = decision
+                self.decisions += 1
+                self.last_decision_time = now
+            return decision
+
+    def _decrease(self):
+        low, _ = self.bounds["quality"]
+        if self.quality > low:
+            self.quality = max(low, self.quality - 15)
+            return f"quality -> {self.quality}"
+
+        low, _ = self.bounds["resolution_percentage"]
+        if self.resolution_percentage > low:
+            self.resolution_percentage = max(low, self.resolution_percentage - 10)
+            return f"resolution -> {self.resolution_percentage}%"
+
+        low, _ = self.bounds["fps"]
+        if self.fps > low:
+            self.fps = max(low, int(self.fps * 0.75))
+            return f"fps -> {self.fps}"
+        return None
+
+    def _increase(self):
+        # Undo the cuts in reverse order, restoring frame rate first
+        _, high = self.bounds["fps"]
+        if self.fps < high:
+            self.fps = min(high, self.fps + 5)
+            return f"fps -> {self.fps}"
+
+        _, high = self.bounds["resolution_percentage"]
+        if self.resolution_percentage < high:
+            self.resolution_percentage = min(high, self.resolution_percentage + 10)
+            return f"resolution -> {self.resolution_percentage}%"
+
+        _, high = self.bounds["quality"]
+        if self.quality < high:
+            self.quality = min(high, self.quality + 5)
+            return f"quality -> {self.quality}"
+        return None
+
+    def snapshot(self):
+        with self.lock:
+            if not self.enabled:
+                return None
+            samples = list(self.samples.values())
+            return {
+                "quality": self.quality,
+                "resolution_percentage": self.resolution_percentage,
+                "fps": self.fps,
+                "target_latency_ms": round(self.target_latency * 1000),
+                "latency_ms": round(max((sample[0] for sample in samples), default=0) * 1000, 1),
+                "rtt_ms": round(max((sample[1] for sample in samples), default=0) * 1000, 1),
+                "queue_depth": max((sample[2] for sample in samples), default=0),
+                "decision": self.decision,
+                "decisions": self.decisions,
+            }
+
+
+class LayerSelector:
+    def __init__(self, layers, layer, smoothing=0.2):
+        self.layers = layers
+        self.index = layers.index(layer)
+        self.smoothing = smoothing
+        self.lock = Lock()
+        self.target_latency = 0.15
+        self.max_queue_depth = 4
+        self.latency = None
+        self.last_switch = time.time()
+        self.switches = 0
+
+    @property
+    def layer(self):
+        return self.layers[self.index]
+
+    def configure(self, settings):
+        with self.lock:
+            self.target_latency = settings["target_latency"] / 1000
+            self.max_queue_depth = settings["max_queue_depth"]
+
+    def record(self, latency, queue_depth):
+        with self.lock:
+            if self.latency is not None:
+                latency = self.latency + self.smoothing * (latency - self.latency)
+            self.latency = latency
+
+            # Unlike the shared controller this only looks at one viewer, so others are never held back by it
+            elapsed = time.time() - self.last_switch
+            congested = latency > self.target_latency * 1.25 or queue_depth > self.max_queue_depth
+            if congested and self.index > 0 and elapsed >= LAYER_DECREASE_INTERVAL:
+                self.index -= 1
+            elif (
+                latency < self.target_latency * 0.75
+                and queue_depth <= 1
+                and self.index < len(self.layers) - 1
+                and elapsed >= LAYER_INCREASE_INTERVAL
+            ):
+                self.index += 1
+            else:
+                return None
+
+            self.latency = None
+            self.last_switch = time.time()
+            self.switches += 1
+            return self.layers[self.index]
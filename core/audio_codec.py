@@ -0,0 +1,191 @@
+import struct
+
+import numpy as np
+
+try:
+    import av
+except ImportError:
+    av = None
+
+# Every audio message opens with the codec id, so either side can decode it without knowing the other's settings,
+# a sequence number the receiving jitter buffer orders frames by, the chunk's RMS and peak levels for meters, and the
+# capture time of its first sample on the shared media clock, so playout can be lined up with video and timed
+AUDIO_HEADER = struct.Struct("<BIHHd")
+# "cn" is a comfort noise marker sent in place of silence; its body is the silent duration in milliseconds
+AUDIO_CODECS = {"pcm": 0, "opus": 1, "cn": 2}
+CODEC_NAMES = {codec_id: name for name, codec_id in AUDIO_CODECS.items()}
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+OPUS_FRAME_DURATIONS = (2.5, 5, 10, 20, 40, 60)
+PACKET_LENGTH = struct.Struct("<H")
+LEVEL_SCALE = 65535
+
+
+def available_codecs():
+    if av is None or "libopus" not in av.codecs_available:
+        return ["pcm"]
+    return ["pcm", "opus"]
+
+
+def validate_codec(codec, rate, frame_ms):
+    if codec not in ("pcm", "opus"):
+        msg = f"Unknown audio codec: {codec}"
+        raise ValueError(msg)
+    if codec == "pcm":
+        return
+    if codec not in available_codecs():
+        msg = "Opus audio requires PyAV built with libopus (pip install av)."
+        raise ValueError(msg)
+    if rate not in OPUS_RATES:
+        msg = f"Opus supports sample rates {', '.join(map(str, OPUS_RATES))}, not {rate}"
+        raise ValueError(msg)
+    if frame_ms not in OPUS_FRAME_DURATIONS:
+        msg = f"Opus frames must be one of {', '.join(map(str, OPUS_FRAME_DURATIONS))} ms, not {frame_ms}"
+        raise ValueError(msg)
+
+
+def audio_levels(pcm):
+    # (RMS, peak) as fractions of full scale
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    if not len(samples):
+        return 0.0, 0.0
+    wide = samples.astype(np.float32)
+    return float(np.sqrt(np.mean(wide * wide))) / 32768, float(np.max(np.abs(wide))) / 32768
+
+
+def pack_header(codec, sequence, levels, timestamp=0.0):
+    rms, peak = (round(max(0.0, min(1.0, level)) * LEVEL_SCALE) for level in levels)
+    return AUDIO_HEADER.pack(AUDIO_CODECS[codec], sequence & 0xFFFFFFFF, rms, peak, timestamp)
+
+
+def pack_comfort_noise(duration_ms, sequence=0, levels=(0.0, 0.0), timestamp=0.0):
+    return pack_header("cn", sequence, levels, timestamp) + PACKET_LENGTH.pack(max(0, min(0xFFFF, round(duration_ms))))
+
+
+def pack_audio(codec, packets, sequence=0, levels=(0.0, 0.0), timestamp=0.0):
+    header = pack_header(codec, sequence, levels, timestamp)
+    if codec == "pcm":
+        return header + b"".join(packets)
+    return header + b"".join(PACKET_LENGTH.pack(len(packet)) + packet for packet in packets)
+
+
+def unpack_header(payload):
+    if len(payload) < AUDIO_HEADER.size:
+        msg = "Invalid audio payload"
+        raise ValueError(msg)
+    codec_id, sequence, rms, peak, timestamp = AUDIO_HEADER.unpack_from(payload)
+    codec = CODEC_NAMES.get(codec_id)
+    if codec is None:
+        msg = "Invalid audio payload"
+        raise ValueError(msg)
+    return codec, sequence, (rms / LEVEL_SCALE, peak / LEVEL_SCALE), timestamp
+
+
+def unpack_audio(payload):
+    codec, _, _, _ = unpack_header(payload)
+    if codec == "pcm":
+        return codec, [payload[AUDIO_HEADER.size:]]
+    if codec == "cn":
+        # The silent duration in milliseconds
+        return codec, list(PACKET_LENGTH.unpack_from(payload, AUDIO_HEADER.size))
+
+    packets = []
+    offset = AUDIO_HEADER.size
+    while offset + PACKET_LENGTH.size <= len(payload):
+        (length,) = PACKET_LENGTH.unpack_from(payload, offset)
+        offset += PACKET_LENGTH.size
+        packets.append(payload[offset:offset + length])
+        offset += length
+    return codec, packets
+
+
+class OpusEncoder:
+    def __init__(self, rate, frame_ms=20, bitrate=32):
+        validate_codec("opus", rate, frame_ms)
+        self.rate = rate
+        self.frame_ms = frame_ms
+        self.bitrate = bitrate
+        self.frame_samples = int(rate * frame_ms / 1000)
+        self.pending = b""
+        self.pts = 0
+
+        self.context = av.CodecContext.create("libopus", "w")
+        self.context.sample_rate = rate
+        self.context.layout = "mono"
+        self.context.format = "s16"
+        self.context.bit_rate = bitrate * 1000
+        self.context.options = {"application": "lowdelay", "frame_duration": f"{frame_ms:g}", "vbr": "on"}
+        self.context.open()
+
+    def encode(self, pcm):
+        # Device chunks rarely line up with Opus frames; the remainder waits for the next chunk
+        self.pending += pcm
+        frame_bytes = self.frame_samples * 2
+        packets = []
+        while len(self.pending) >= frame_bytes:
+            samples = np.frombuffer(self.pending, dtype=np.int16, count=self.frame_samples)
+            self.pending = self.pending[frame_bytes:]
+            frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="s16", layout="mono")
+            frame.sample_rate = self.rate
+            frame.pts = self.pts
+            self.pts += self.frame_samples
+            packets.extend(bytes(packet) for packet in self.context.encode(frame))
+        return packets
+
+
+class OpusDecoder:
+    def __init__(self, rate):
+        validate_codec("opus", rate, 20)
+        self.rate = rate
+        self.context = av.CodecContext.create("opus", "r")
+        self.context.sample_rate = rate
+        self.context.layout = "mono"
+        # The decoder always produces 48 kHz float samples; the device stream wants 16-bit at its own rate
+        self.resampler = av.AudioResampler(format="s16", layout="mono", rate=rate)
+
+    def decode(self, packet):
+        chunks = []
+        for frame in self.context.decode(av.Packet(packet)):
+            chunks.extend(resampled.to_ndarray().tobytes() for resampled in self.resampler.resample(frame))
+        return b"".join(chunks)
+
+
+class AudioEncoder:
+    def __init__(self, codec, rate, frame_ms=20, bitrate=32):
+        self.codec = codec
+        self.rate = rate
+        self.opus = OpusEncoder(rate, frame_ms, bitrate) if codec == "opus" else None
+        self.sequence = 0
+
+    def encode(self, pcm, levels=(0.0, 0.0), timestamp=0.0):
+        # timestamp is when pcm's first sample was captured; Opus packets start with the samples still held back
+        if self.opus:
+            timestamp -= len(self.opus.pending) / 2 / self.rate
+            packets = self.opus.encode(pcm)
+        else:
+            packets = [pcm]
+        if not packets:
+            return None
+        payload = pack_audio(self.codec, packets, self.sequence, levels, timestamp)
+        self.sequence += 1
+        return payload
+
+    def comfort_noise(self, duration_ms, levels, timestamp=0.0):
+        payload = pack_comfort_noise(duration_ms, self.sequence, levels, timestamp)
+        self.sequence += 1
+        return payload
+
+
+class AudioDecoder:
+    def __init__(self, rate):
+        self.rate = rate
+        self.opus = None
+
+    def decode(self, payload):
+        codec, packets = unpack_audio(payload)
+        if codec == "pcm":
+            return packets[0]
+        if codec == "cn":
+            return bytes(round(packets[0] * self.rate / 1000) * 2)
+        if self.opus is None:
+            self.opus = OpusDecoder(self.rate)
+        return b"".join(self.opus.decode(packet) for packet in packets)
@@ -0,0 +1,159 @@
+import time
+from threading import Lock
+
+try:
+    import pyaudio
+except ImportError:
+    pyaudio = None
+
+DEVICE_ROLES = ("mic", "system", "output")
+CANDIDATE_RATES = (8000, 16000, 22050, 24000, 32000, 44100, 48000, 96000)
+LOOPBACK_NAMES = ("stereo mix", "what u hear", "wave out mix", "loopback")
+PA_INT16 = 8
+
+SYSTEM_AUDIO_HELP = (
+    "Stereo Mix not found or disabled. To enable:\n"
+    "1. Right-click the speaker icon in the taskbar; open Sound settings.\n"
+    "2. Click 'Sound Control Panel' (Win 10) or 'More sound settings' (Win 11); go to the Recording tab.\n"
+    "3. Right-click an empty area; select 'Show Disabled Devices'.\n"
+    "4. Enable Stereo Mix."
+)
+
+
+class AudioEngine:
+    def __init__(self, backend=None):
+        self.backend = backend or pyaudio
+        self.lock = Lock()
+        self.host = None
+        self.inventory = None
+        self.inventory_time = 0.0
+        self.open_streams = set()
+        # role -> device index; None follows the host's default device
+        self.selected = dict.fromkeys(DEVICE_ROLES)
+
+    def _ensure_host(self):
+        if self.backend is None:
+            msg = "Audio requires PyAudio (pip install PyAudio)."
+            raise RuntimeError(msg)
+        if self.host is None:
+            self.host = self.backend.PyAudio()
+        return self.host
+
+    def devices(self, *, refresh=False):
+        with self.lock:
+            if refresh or self.inventory is None:
+                self._scan()
+            return [dict(device) for device in self.inventory]
+
+    def _scan(self):
+        # PortAudio only notices added or removed devices when re-initialized, which must wait for idle streams
+        if self.host is not None and not self.open_streams:
+            self.host.terminate()
+            self.host = None
+        host = self._ensure_host()
+        inventory = []
+        for index in range(host.get_device_count()):
+            info = host.get_device_info_by_index(index)
+            inputs = int(info.get("maxInputChannels", 0))
+            outputs = int(info.get("maxOutputChannels", 0))
+            inventory.append({
+                "index": index,
+                "name": info["name"],
+                "host_api": info.get("hostApi"),
+                "input_channels": inputs,
+                "output_channels": outputs,
+                "default_rate": int(info.get("defaultSampleRate", 0)),
+                "rates": self._supported_rates(host, index, inputs),
+                "loopback": inputs > 0 and any(name in info["name"].lower() for name in LOOPBACK_NAMES),
+            })
+        self.inventory = inventory
+        self.inventory_time = time.time()
+
+    def _supported_rates(self, host, index, inputs):
+        rates = []
+        for rate in CANDIDATE_RATES:
+            try:
+                if inputs:
+                    host.is_format_supported(rate, input_device=index, input_channels=1, input_format=PA_INT16)
+                else:
+                    host.is_format_supported(rate, output_device=index, output_channels=1, output_format=PA_INT16)
+            except ValueError:
+                continue
+            rates.append(rate)
+        return rates
+
+    def select_device(self, role, index):
+        if role not in DEVICE_ROLES:
+            msg = f"Unknown audio device role: {role}"
+            raise ValueError(msg)
+        devices = self.devices()
+        with self.lock:
+            if index is not None:
+                device = next((device for device in devices if device["index"] == index), None)
+                channels = "output_channels" if role == "output" else "input_channels"
+                if device is None or not device[channels]:
+                    msg = f"No {role} device with index {index}"
+                    raise ValueError(msg)
+            self.selected[role] = index
+
+    def device_for(self, role, rate):
+        devices = self.devices()
+        with self.lock:
+            index = self.selected[role]
+        if index is not None or role != "system":
+            return index
+
+        candidates = [device for device in devices if device["loopback"]]
+        for device in candidates:
+            if not device["rates"] or rate in device["rates"]:
+                return device["index"]
+        if candidates:
+            return candidates[0]["index"]
+        raise RuntimeError(SYSTEM_AUDIO_HELP)
+
+    def capture_rate(self, index, rate):
+        # The requested rate when the device supports it (or is the host default), else the device's own rate
+        if index is None:
+            return rate
+        device = next((device for device in self.devices() if device["index"] == index), None)
+        if device is None or not device["rates"] or rate in device["rates"]:
+            return rate
+        return device["default_rate"] or rate
+
+    def open(self, **kwargs):
+        with self.lock:
+            stream = self._ensure_host().open(**kwargs)
+            self.open_streams.add(stream)
+            return stream
+
+    def close(self, stream):
+        with self.lock:
+            self.open_streams.discard(stream)
+        try:
+            stream.stop_stream()
+            stream.close()
+        except Exception as e:
+            print(f"Error closing audio stream: {e}")
+
+    def terminate(self):
+        with self.lock:
+            for stream in list(self.open_streams):
+                try:
+                    stream.close()
+                except Exception as e:
+                    print(f"Error closing audio stream: {e}")
+            self.open_streams.clear()
+            if self.host is not None:
+                self.host.terminate()
+                self.host = None
+
+    def stats(self):
+        with self.lock:
+            return {
+                "initialized": self.host is not None,
+                "devices": len(self.inventory) if self.inventory is not None else None,
+                "inventory_time": self.inventory_time or None,
+                "open_streams": len(self.open_streams),
+                "selected": dict(self.selected),
+            }
+
@@ -0,0 +1,70 @@
+import math
+
+from .audio_codec import audio_levels
+
+# Silence is still reported this often, so meters keep moving and the client keeps its comfort noise going
+COMFORT_NOISE_INTERVAL = 0.5
+
+
+class VoiceGate:
+    def __init__(self, threshold_db=-50.0, hangover=0.3, *, enabled=False):
+        self.threshold_db = threshold_db
+        self.hangover = hangover
+        self.enabled = enabled
+        self.open = False
+        self.silent_for = 0.0
+        # Silence suppressed since the last comfort noise marker
+        self.pending = 0.0
+        self.levels = (0.0, 0.0)
+        self.sent = 0
+        self.suppressed = 0
+        self.markers = 0
+
+    def configure(self, threshold_db, hangover, *, enabled):
+        self.threshold_db = threshold_db
+        self.hangover = hangover
+        self.enabled = enabled
+
+    def process(self, pcm, duration):
+        # "audio" to send the chunk, "cn" to send a comfort noise marker covering self.pending, or None to hold back
+        self.levels = audio_levels(pcm)
+        rms_db = 20 * math.log10(self.levels[0]) if self.levels[0] > 0 else -math.inf
+        if rms_db >= self.threshold_db:
+            self.silent_for = 0.0
+        else:
+            self.silent_for += duration
+
+        # Hangover keeps the gate open briefly after speech so trailing syllables are not cut off
+        if not self.enabled or self.silent_for <= self.hangover:
+            self.open = True
+            self.pending = 0.0
+            self.sent += 1
+            return "audio"
+
+        self.suppressed += 1
+        first = self.open
+        self.open = False
+        self.pending += duration
+        if first or self.pending >= COMFORT_NOISE_INTERVAL:
+            self.markers += 1
+            return "cn"
+        return None
+
+    def take_pending(self):
+        pending = self.pending
+        self.pending = 0.0
+        return pending
+
+    def stats(self):
+        rms, peak = self.levels
+        return {
+            "enabled": self.enabled,
+            "open": self.open,
+            "rms": round(rms, 5),
+            "peak": round(peak, 5),
+            "rms_db": round(20 * math.log10(rms), 1) if rms > 0 else None,
+            "threshold_db": self.threshold_db,
+            "sent": self.sent,
+            "suppressed": self.suppressed,
+            "markers": self.markers,
+        }
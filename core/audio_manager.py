@@ -1,28 +1,53 @@
-import logging
-import queue
+import math
 from threading import Lock, Thread
 
-import pyaudio
+from .audio_codec import AudioDecoder, AudioEncoder, unpack_header, validate_codec
+from .audio_engine import PA_INT16, AudioEngine
+from .audio_gate import VoiceGate
+from .audio_mixer import AudioMixer
+from .fanout import FanOut, Subscriber
+from .jitter_buffer import JitterBuffer, conceal
+from .media_clock import media_time
+
+# Weight of each new capture-to-playout sample in the smoothed playback latency
+LATENCY_SMOOTHING = 0.1
+# How much audio a listener may fall behind by before its oldest chunks are dropped
+SEND_QUEUE_SECONDS = 0.5
+# Changing these restarts a running capture, so they are refused while a capture has several listeners
+CAPTURE_SETTINGS = ("rate", "chunk", "codec", "frame_ms", "bitrate")
 
 
 class AudioManager:
-    def __init__(self, socketio):
+    def __init__(self, socketio, audio_backend=None):
         self.socketio = socketio
         self.audio_lock = Lock()
+        # One PortAudio host for the life of the app; streams come and go without re-initializing it
+        self.engine = AudioEngine(audio_backend)
 
         self.configs = {
             "server": {
-                "format": pyaudio.paInt16,
+                "format": PA_INT16,
                 "channels": 1,
                 "rate": 48000,
                 "chunk": 4096,
+                "codec": "pcm",
+                "frame_ms": 20,
+                "bitrate": 32,
+                "mic_gain": 1.0,
+                "system_gain": 1.0,
+                "vad": False,
+                "vad_threshold": -50.0,
+                "vad_hangover": 300,
                 "emit_event": "server_audio_data",
             },
             "client": {
-                "format": pyaudio.paInt16,
+                "format": PA_INT16,
                 "channels": 1,
                 "rate": 48000,
                 "chunk": 512,
+                "codec": "pcm",
+                "frame_ms": 20,
+                "bitrate": 32,
                 "emit_event": "client_audio_data",
             },
         }
@@ -32,105 +57,261 @@ class AudioManager:
                 "active": False,
                 "type": "output",
                 "config": "client",
-                "queue": queue.Queue(),
+                "device": "output",
+                "buffer": JitterBuffer(),
+                # The one client whose microphone is playing; starting from another client takes it over
+                "owner": None,
+                "thread": None,
+                "restart": False,
             },
             "server_mic": {
                 "active": False,
                 "type": "input",
                 "config": "server",
                 "device": "mic",
+                # One capture per source, sent to every listener through its own bounded queue
+                "fanout": FanOut(),
+                "thread": None,
+                "restart": False,
             },
             "server_system": {
                 "active": False,
                 "type": "input",
                 "config": "server",
                 "device": "system",
+                "fanout": FanOut(),
+                "thread": None,
+                "restart": False,
+            },
+            "server_mix": {
+                "active": False,
+                "type": "mix",
+                "config": "server",
+                # The first source clocks the mix
+                "sources": ("mic", "system"),
+                "fanout": FanOut(),
+                "thread": None,
+                "restart": False,
             },
         }
+        self.mixer = None
+        # stream name -> VoiceGate of a running server stream
+        self.gates = {}
+        # Smoothed seconds from the client capturing audio to it leaving this host's speakers
+        self.playback_latency = None
 
-    def _get_system_audio_device(self, p):
-        for i in range(p.get_device_count()):
-            info = p.get_device_info_by_index(i)
-            if "stereo mix" not in info["name"].lower():
-                continue
-
-            try:
-                test_stream = p.open(
-                    format=pyaudio.paInt16,
-                    channels=1,
-                    rate=44100,
-                    input=True,
-                    frames_per_buffer=1024,
-                    input_device_index=i,
-                    start=False,
-                )
-                test_stream.close()
-            except Exception:
-                logging.exception("Error getting system audio device")
-            else:
-                return i
-
-        msg = (
-            "Stereo Mix not found or disabled. To enable:\n"
-            "1. Right-click the speaker icon in the taskbar; open Sound settings.\n"
-            "2. Click 'Sound Control Panel' (Win 10) or 'More sound settings' (Win 11); go to the Recording tab.\n"
-            "3. Right-click an empty area; select 'Show Disabled Devices'.\n"
-            "4. Enable Stereo Mix."
-        )
-        raise RuntimeError(msg)
-
-    def _create_stream(self, stream_name):
+    def _create_stream(self, stream_name, role=None, rate=None, chunk=None):
         state = self.streams[stream_name]
         config = self.configs[state["config"]]
-
-        p = pyaudio.PyAudio()
-
-        rate = config["rate"] // 2 if stream_name == "client_playback" else config["rate"]
+        output = state["type"] == "output"
 
         stream_args = {
             "format": config["format"],
             "channels": config["channels"],
-            "rate": rate,
-            "frames_per_buffer": config["chunk"],
-            "input": state["type"] == "input",
-            "output": state["type"] == "output",
+            "rate": rate or self._stream_rate(stream_name),
+            "frames_per_buffer": chunk or config["chunk"],
+            "input": not output,
+            "output": output,
         }
 
-        if stream_name == "server_system":
-            stream_args["input_device_index"] = self._get_system_audio_device(p)
+        device = self.engine.device_for(role or state["device"], stream_args["rate"])
+        if device is not None:
+            stream_args["output_device_index" if output else "input_device_index"] = device
+
+        return self.engine.open(**stream_args)
 
-        return p, p.open(**stream_args)
+    def _stream_rate(self, stream_name):
+        rate = self.configs[self.streams[stream_name]["config"]]["rate"]
+        # The browser downsamples its microphone by two before sending
+        return rate // 2 if stream_name == "client_playback" else rate
 
-    def _stream_handler(self, sid, stream_name):
-        p = None
+    def _frame_duration(self, stream_name):
+        config = self.configs[self.streams[stream_name]["config"]]
+        if config["codec"] == "opus":
+            return config["frame_ms"] / 1000
+        return config["chunk"] / self._stream_rate(stream_name)
+
+    def _run_stream(self, stream_name):
+        # Runs until the last listener leaves; a settings change restarts the handler with the new config
+        state = self.streams[stream_name]
+        handler = self._mix_handler if state["type"] == "mix" else self._stream_handler
+        while True:
+            with self.audio_lock:
+                if not state["active"]:
+                    state["thread"] = None
+                    if "fanout" in state:
+                        # Only left behind when the capture failed; their send loops end with it
+                        state["fanout"].clear()
+                    return
+                state["restart"] = False
+            handler(stream_name)
+
+    def _stream_handler(self, stream_name):
         stream = None
         state = self.streams[stream_name]
         config = self.configs[state["config"]]
 
         try:
             with self.audio_lock:
-                p, stream = self._create_stream(stream_name)
+                stream = self._create_stream(stream_name)
+                rate = self._stream_rate(stream_name)
+                if state["type"] == "input":
+                    encoder = AudioEncoder(config["codec"], rate, config["frame_ms"], config["bitrate"])
+                    gate = self.gates[stream_name] = self._create_gate(config)
+                    # A chunk's first sample was captured this long before read() hands it over
+                    capture_delay = config["chunk"] / rate + stream.get_input_latency()
+                else:
+                    decoder = AudioDecoder(rate)
+                    samples = round(self._frame_duration(stream_name) * rate)
+                    playout = {"previous": None, "missing": 0, "output_latency": stream.get_output_latency()}
 
-            while state["active"]:
+            while state["active"] and not state["restart"]:
                 if state["type"] == "input":
-                    data = stream.read(config["chunk"], exception_on_overflow=False)
-                    self.socketio.emit(config["emit_event"], data, room=sid)
+                    pcm = stream.read(config["chunk"], exception_on_overflow=False)
+                    data = self._encode_chunk(encoder, gate, pcm, rate, media_time() - capture_delay)
+                    if data:
+                        state["fanout"].publish(data)
                 else:
-                    try:
-                        data = state["queue"].get(timeout=0.05)
-                        if data:
-                            stream.write(data)
-                    except queue.Empty:
-                        continue
+                    self._play_next(state["buffer"], stream, decoder, samples, playout)
         except Exception as e:
             print(f"Stream error ({stream_name}): {e}")
+            state["active"] = False
         finally:
+            self.gates.pop(stream_name, None)
+            if stream:
+                self.engine.close(stream)
+
+    def _mix_handler(self, stream_name):
+        state = self.streams[stream_name]
+        config = self.configs[state["config"]]
+        streams = {}
+        readers = []
+        mixer = None
+
+        try:
             with self.audio_lock:
-                if stream:
-                    stream.stop_stream()
-                    stream.close()
-                if p:
-                    p.terminate()
+                rates = {}
+                for source in state["sources"]:
+                    # Each device captures at a rate it supports; the mixer resamples to the stream rate
+                    rate = self.engine.capture_rate(self.engine.device_for(source, config["rate"]), config["rate"])
+                    chunk = round(config["chunk"] * rate / config["rate"])
+                    streams[source] = (self._create_stream(stream_name, source, rate, chunk), chunk)
+                    rates[source] = rate
+                gains = {source: config[f"{source}_gain"] for source in state["sources"]}
+                mixer = self.mixer = AudioMixer(config["rate"], rates, gains)
+                encoder = AudioEncoder(config["codec"], config["rate"], config["frame_ms"], config["bitrate"])
+                gate = self.gates[stream_name] = self._create_gate(config)
+
+            clock, *others = state["sources"]
+            for source in others:
+                reader = Thread(target=self._read_source, args=(state, source, *streams[source], mixer), daemon=True)
+                reader.start()
+                readers.append(reader)
+
+            clock_stream, clock_chunk = streams[clock]
+            # The mix is stamped with the clock source's capture time; the others trail it by their backlog
+            capture_delay = clock_chunk / rates[clock] + clock_stream.get_input_latency()
+            while state["active"] and not state["restart"]:
+                mixer.push(clock, clock_stream.read(clock_chunk, exception_on_overflow=False))
+                captured = media_time() - capture_delay
+                data = self._encode_chunk(encoder, gate, mixer.mix(), config["rate"], captured)
+                if data:
+                    state["fanout"].publish(data)
+        except Exception as e:
+            print(f"Stream error ({stream_name}): {e}")
+            state["active"] = False
+        finally:
+            self.gates.pop(stream_name, None)
+            if self.mixer is mixer:
+                self.mixer = None
+            # Readers finish their current chunk before the streams they read from are closed
+            for reader in readers:
+                reader.join(timeout=1)
+            for stream, _ in streams.values():
+                self.engine.close(stream)
+
+    def _create_gate(self, config):
+        return VoiceGate(config["vad_threshold"], config["vad_hangover"] / 1000, enabled=config["vad"])
+
+    def _encode_chunk(self, encoder, gate, pcm, rate, captured):
+        duration = len(pcm) / 2 / rate
+        decision = gate.process(pcm, duration)
+        if decision == "audio":
+            return encoder.encode(pcm, gate.levels, captured)
+        if decision == "cn":
+            # A marker covers the silence suppressed up to the end of this chunk
+            pending = gate.take_pending()
+            return encoder.comfort_noise(pending * 1000, gate.levels, captured + duration - pending)
+        return None
+
+    def _read_source(self, state, source, stream, chunk, mixer):
+        try:
+            while state["active"] and not state["restart"]:
+                mixer.push(source, stream.read(chunk, exception_on_overflow=False))
+        except Exception as e:
+            print(f"Error reading {source} audio: {e}")
+
+    def _play_next(self, buffer, stream, decoder, samples, playout):
+        payload = buffer.pop()
+        if payload is not None:
+            pcm = decoder.decode(payload)
+            playout["previous"] = pcm or playout["previous"]
+            playout["missing"] = 0
+        else:
+            # Keep the device fed through gaps instead of stalling until the next frame arrives
+            playout["missing"] += 1
+            pcm = conceal(playout["previous"], samples, playout["missing"])
+        if pcm:
+            stream.write(pcm)
+        if payload is not None:
+            # The client stamps its capture time on the server's clock, so this spans the whole trip
+            _, _, _, timestamp = unpack_header(payload)
+            self._record_latency(media_time() + playout["output_latency"] - timestamp)
+
+    def _record_latency(self, latency):
+        if self.playback_latency is None:
+            self.playback_latency = latency
+        else:
+            self.playback_latency += (latency - self.playback_latency) * LATENCY_SMOOTHING
+
+    def queue_client_audio(self, sid, data):
+        state = self.streams["client_playback"]
+        if not state["active"] or state["owner"] != sid:
+            return
+        try:
+            _, sequence, _, _ = unpack_header(data)
+        except ValueError as e:
+            print(f"Error reading client audio: {e}")
+            return
+        state["buffer"].push(sequence, data)
+
+    def get_stats(self):
+        mixer = self.mixer
+        latency = self.playback_latency
+        return {
+            "playback": {
+                **self.streams["client_playback"]["buffer"].stats(),
+                "latency_ms": round(latency * 1000, 1) if latency is not None else None,
+            },
+            "engine": self.engine.stats(),
+            "mixer": mixer.stats() if mixer else None,
+            "levels": {name: gate.stats() for name, gate in list(self.gates.items())},
+            "listeners": {
+                name: state["fanout"].stats() for name, state in self.streams.items() if "fanout" in state
+            },
+        }
+
+    def warm_up(self):
+        try:
+            self.engine.devices()
+        except Exception as e:
+            print(f"Error initializing audio: {e}")
+
+    def get_devices(self, *, refresh=False):
+        return {"devices": self.engine.devices(refresh=refresh), "selected": dict(self.engine.selected)}
+
+    def select_device(self, role, index):
+        self.engine.select_device(role, None if index is None else int(index))
 
     def start_stream(self, sid, stream_name):
         with self.audio_lock:
@@ -139,27 +320,125 @@ class AudioManager:
                 raise ValueError(msg)
 
             state = self.streams[stream_name]
-            if not state["active"]:
-                state["active"] = True
-                Thread(target=self._stream_handler, args=(sid, stream_name)).start()
+            if "fanout" in state:
+                self._add_listener(sid, stream_name)
+            elif state["owner"] != sid or not state["active"]:
+                state["owner"] = sid
+                state["buffer"].configure(self._frame_duration(stream_name))
+                self.playback_latency = None
+
+            state["active"] = True
+            # A capture that is still winding down picks up again instead of a second one opening the device
+            if state["thread"] is None:
+                state["thread"] = Thread(target=self._run_stream, args=(stream_name,))
+                state["thread"].start()
 
-    def stop_stream(self, stream_name):
+    def _add_listener(self, sid, stream_name):
+        state = self.streams[stream_name]
+        config = self.configs[state["config"]]
+        max_queue = max(2, math.ceil(SEND_QUEUE_SECONDS * config["rate"] / config["chunk"]))
+        subscriber = Subscriber(sid, max_queue, "drop_oldest")
+        state["fanout"].add(subscriber)
+        Thread(target=self._send_loop, args=(subscriber, config["emit_event"]), daemon=True).start()
+
+    def _send_loop(self, subscriber, event):
+        # A slow listener only backs up its own queue, never the capture or the other listeners
+        while subscriber.active:
+            data = subscriber.get()
+            if data is None:
+                continue
+            self.socketio.emit(event, data, room=subscriber.sid)
+            subscriber.record_sent(len(data))
+
+    def stop_stream(self, stream_name, sid=None):
+        # Without a sid the stream stops for every listener
         with self.audio_lock:
-            if stream_name in self.streams:
-                state = self.streams[stream_name]
-                state["active"] = False
+            if stream_name not in self.streams:
+                return
+            state = self.streams[stream_name]
+            if "fanout" in state:
+                if sid is None:
+                    state["fanout"].clear()
+                else:
+                    state["fanout"].remove(sid)
+                if len(state["fanout"]):
+                    return
+            elif sid is not None and state["owner"] != sid:
+                return
+            else:
+                state["owner"] = None
+                state["buffer"].clear()
+            state["active"] = False
 
-                if state["type"] == "output" and "queue" in state:
-                    while not state["queue"].empty():
-                        state["queue"].get()
+    def disconnect(self, sid):
+        for stream_name in self.streams:
+            self.stop_stream(stream_name, sid)
 
-                if stream_name == "client_playback":
-                    state["queue"] = queue.Queue()
+    def shutdown(self):
+        # Stops every stream and releases the PortAudio host; called once as the server exits
+        for stream_name in self.streams:
+            self.stop_stream(stream_name)
+        with self.audio_lock:
+            threads = [state["thread"] for state in self.streams.values() if state["thread"]]
+        for thread in threads:
+            thread.join(timeout=1)
+        self.engine.terminate()
 
     def update_settings(self, settings):
         with self.audio_lock:
-            config = self.configs["client" if settings["type"] == "client" else "server"]
-            if "rate" in settings:
-                config["rate"] = settings["rate"]
-            if "chunk" in settings:
-                config["chunk"] = settings["chunk"]
+            config_name = "client" if settings["type"] == "client" else "server"
+            config = self.configs[config_name]
+            rate = settings.get("rate", config["rate"])
+            codec = settings.get("codec", config["codec"])
+            frame_ms = settings.get("frame_ms", config["frame_ms"])
+            validate_codec(codec, rate // 2 if config_name == "client" else rate, frame_ms)
+
+            capture = {
+                "rate": rate,
+                "chunk": settings.get("chunk", config["chunk"]),
+                "codec": codec,
+                "frame_ms": frame_ms,
+                "bitrate": max(6, min(510, int(settings["bitrate"]))) if "bitrate" in settings else config["bitrate"],
+            }
+            restart = config_name == "server" and any(config[key] != capture[key] for key in CAPTURE_SETTINGS)
+            if restart:
+                self._check_unshared()
+            config.update(capture)
+            if restart:
+                for state in self.streams.values():
+                    if state["config"] == "server" and state["active"]:
+                        state["restart"] = True
+            self._update_gain_settings(config_name, config, settings)
+            self._update_gate_settings(config_name, config, settings)
+
+    def _check_unshared(self):
+        # Chunks carry no sample rate, so a restart would leave the other listeners playing at the old one
+        shared = [
+            stream_name for stream_name, state in self.streams.items()
+            if state["config"] == "server" and state["active"] and len(state["fanout"]) > 1
+        ]
+        if shared:
+            msg = f"Capture settings cannot change while {', '.join(shared)} has more than one listener"
+            raise ValueError(msg)
+
+    def _update_gate_settings(self, config_name, config, settings):
+        if config_name != "server":
+            return
+        if "vad" in settings:
+            config["vad"] = bool(settings["vad"])
+        if "vad_threshold" in settings:
+            config["vad_threshold"] = max(-90.0, min(0.0, float(settings["vad_threshold"])))
+        if "vad_hangover" in settings:
+            config["vad_hangover"] = max(0, min(2000, int(settings["vad_hangover"])))
+        for gate in list(self.gates.values()):
+            gate.configure(config["vad_threshold"], config["vad_hangover"] / 1000, enabled=config["vad"])
+
+    def _update_gain_settings(self, config_name, config, settings):
+        if config_name != "server":
+            return
+        for source in ("mic", "system"):
+            key = f"{source}_gain"
+            if key in settings:
+                config[key] = max(0.0, min(4.0, float(settings[key])))
+        if self.mixer:
+            self.mixer.set_gains({source: config[f"{source}_gain"] for source in ("mic", "system")})
@@ -0,0 +1,84 @@
+from threading import Lock
+
+import numpy as np
+
+# How far a secondary source may run ahead of the one clocking the mix before its oldest audio is dropped
+MAX_BACKLOG_SECONDS = 0.2
+
+
+class Resampler:
+    def __init__(self, source_rate, target_rate):
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self.step = source_rate / target_rate
+        # The previous chunk's last sample, so interpolation runs across chunk boundaries without clicks
+        self.last = np.zeros(1, dtype=np.float32)
+        self.position = 1.0
+
+    def process(self, samples):
+        if self.source_rate == self.target_rate:
+            return samples
+        buffer = np.concatenate((self.last, samples))
+        end = len(buffer) - 1
+        count = max(0, int(np.floor((end - self.position) / self.step)) + 1)
+        positions = self.position + np.arange(count) * self.step
+        output = np.interp(positions, np.arange(len(buffer)), buffer).astype(np.float32)
+        self.position += count * self.step - end
+        self.last = buffer[-1:]
+        return output
+
+
+class AudioMixer:
+    def __init__(self, rate, sources, gains=None):
+        # sources: name -> capture rate; the first one clocks the mix
+        self.rate = rate
+        self.lock = Lock()
+        self.clock = next(iter(sources))
+        self.resamplers = {name: Resampler(source_rate, rate) for name, source_rate in sources.items()}
+        self.buffers = {name: np.zeros(0, dtype=np.float32) for name in sources}
+        self.gains = dict.fromkeys(sources, 1.0)
+        self.gains.update(gains or {})
+        self.max_backlog = int(rate * MAX_BACKLOG_SECONDS)
+        self.dropped = dict.fromkeys(sources, 0)
+        self.underruns = dict.fromkeys(sources, 0)
+
+    def set_gains(self, gains):
+        with self.lock:
+            for name, gain in gains.items():
+                if name in self.gains:
+                    self.gains[name] = float(gain)
+
+    def push(self, name, pcm):
+        samples = self.resamplers[name].process(np.frombuffer(pcm, dtype=np.int16).astype(np.float32))
+        with self.lock:
+            buffer = np.concatenate((self.buffers[name], samples))
+            if name != self.clock and len(buffer) > self.max_backlog:
+                self.dropped[name] += len(buffer) - self.max_backlog
+                buffer = buffer[-self.max_backlog:]
+            self.buffers[name] = buffer
+
+    def mix(self):
+        # Emits whatever the clock source has; the others fill in what they have and are padded with silence
+        with self.lock:
+            count = len(self.buffers[self.clock])
+            if not count:
+                return b""
+            mixed = np.zeros(count, dtype=np.float32)
+            for name, buffer in self.buffers.items():
+                available = min(count, len(buffer))
+                if available < count and name != self.clock:
+                    self.underruns[name] += 1
+                mixed[:available] += buffer[:available] * self.gains[name]
+                self.buffers[name] = buffer[available:]
+        return np.clip(mixed, -32768, 32767).astype(np.int16).tobytes()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "rate": self.rate,
+                "clock": self.clock,
+                "gains": dict(self.gains),
+                "backlog_ms": {name: round(len(buffer) / self.rate * 1000, 1) for name, buffer in self.buffers.items()},
+                "dropped_samples": dict(self.dropped),
+                "underruns": dict(self.underruns),
+            }
@@ -0,0 +1,230 @@
+import re
+import time
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+from cv2 import FONT_HERSHEY_SIMPLEX, IMREAD_COLOR, imread, putText, rectangle
+
+try:
+    import dxcam
+except ImportError:
+    dxcam = None
+
+IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+DXCAM_OUTPUT = re.compile(r"Device\[(\d+)\] Output\[(\d+)\]")
+# Share of tiles repainted per frame, tile edge in pixels, and caret blink period in frames
+SYNTHETIC_OPTIONS = {"change_rate": 0.02, "tile_size": 64, "caret_blink": 15, "seed": 0}
+
+
+class CaptureBackend:
+    name = "base"
+
+    def __init__(self, origin=(0, 0)):
+        self.capturing = False
+        self.target_fps = 60
+        self._next_frame_time = 0.0
+        # Top-left corner of this output on the virtual desktop; the primary display sits at (0, 0)
+        self.origin = tuple(origin)
+
+    @property
+    def primary(self):
+        return self.origin == (0, 0)
+
+    @property
+    def is_capturing(self):
+        return self.capturing
+
+    def grab(self):
+        raise NotImplementedError
+
+    def start(self, target_fps=60, *, video_mode=True):  # noqa: ARG002
+        self.target_fps = target_fps or 60
+        self._next_frame_time = time.perf_counter()
+        self.capturing = True
+        return True
+
+    def stop(self):
+        self.capturing = False
+
+    def get_latest_frame(self):
+        if not self.is_capturing:
+            return None
+        self._wait_for_next_frame()
+        return self.grab()
+
+    def _wait_for_next_frame(self):
+        self._next_frame_time += 1.0 / self.target_fps
+        delay = self._next_frame_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Fell behind; pace from now instead of bursting to catch up
+            self._next_frame_time = time.perf_counter()
+
+
+def require_dxcam():
+    if dxcam is None:
+        msg = "Screen capture requires DXcam (pip install dxcam), which runs on Windows only."
+        raise RuntimeError(msg)
+
+
+class DxcamBackend(CaptureBackend):
+    name = "dxcam"
+
+    def __init__(self, output_idx=0, device_idx=0):
+        super().__init__()
+        require_dxcam()
+        self.camera = dxcam.create(device_idx=device_idx, output_idx=output_idx, output_color="BGR")
+        if not self.camera:
+            msg = "Failed to initialize camera."
+            raise RuntimeError(msg)
+        try:
+            # DXcam keeps the output it captures private and offers no other way to its desktop position
+            coordinates = self.camera._output.desc.DesktopCoordinates  # noqa: SLF001
+            self.origin = (coordinates.left, coordinates.top)
+        except AttributeError:
+            print(f"Could not read the desktop position of output {output_idx}; assuming (0, 0)")
+
+    @staticmethod
+    def list_outputs():
+        require_dxcam()
+        return [(int(device), int(output)) for device, output in DXCAM_OUTPUT.findall(dxcam.output_info())]
+
+    @property
+    def is_capturing(self):
+        return self.camera.is_capturing
+
+    def grab(self):
+        return self.camera.grab()
+
+    def start(self, target_fps=60, *, video_mode=True):
+        return self.camera.start(target_fps=target_fps, video_mode=video_mode)
+
+    def stop(self):
+        self.camera.stop()
+
+    def get_latest_frame(self):
+        return self.camera.get_latest_frame()
+
+
+def render_desktop(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), 235, dtype=np.uint8)
+    rectangle(frame, (0, height - 40), (width, height), (40, 40, 40), -1)
+    for _ in range(12):
+        x, y = int(rng.integers(0, max(1, width - 200))), int(rng.integers(0, max(1, height - 150)))
+        rectangle(frame, (x, y), (x + 200, y + 150), tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+    for row in range(40, height - 60, 24):
+        putText(frame, "The quick brown fox jumps over the lazy dog 0123456789", (20, row),
+                FONT_HERSHEY_SIMPLEX, 0.5, (20, 20, 20), 1)
+    return frame
+
+
+class SyntheticBackend(CaptureBackend):
+    name = "synthetic"
+
+    def __init__(self, width=1920, height=1080, origin=(0, 0), **options):
+        super().__init__(origin)
+        unknown = set(options) - set(SYNTHETIC_OPTIONS)
+        if unknown:
+            msg = f"Unknown synthetic backend options: {', '.join(sorted(unknown))}"
+            raise ValueError(msg)
+        options = {**SYNTHETIC_OPTIONS, **options}
+        self.width = width
+        self.height = height
+        self.change_rate = options["change_rate"]
+        self.tile_size = options["tile_size"]
+        self.caret_blink = options["caret_blink"]
+        self.rng = np.random.default_rng(options["seed"])
+        self.frame = render_desktop(width, height, options["seed"])
+        self.frame_count = 0
+        self.lock = Lock()
+
+    def grab(self):
+        with self.lock:
+            self._advance()
+            return self.frame.copy()
+
+    def _advance(self):
+        self.frame_count += 1
+        tile = self.tile_size
+        rows, cols = -(-self.height // tile), -(-self.width // tile)
+
+        changed = round(rows * cols * self.change_rate)
+        if changed:
+            for index in self.rng.choice(rows * cols, size=changed, replace=False):
+                y, x = divmod(int(index), cols)
+                color = self.rng.integers(0, 255, 3, dtype=np.uint8)
+                self.frame[y * tile:(y + 1) * tile, x * tile:(x + 1) * tile] = color
+
+        if self.caret_blink:
+            visible = (self.frame_count // self.caret_blink) % 2 == 0
+            self.frame[60:78, 40:42] = 20 if visible else 235
+
+
+class ReplayBackend(CaptureBackend):
+    name = "replay"
+
+    def __init__(self, path, *, loop=True, origin=(0, 0)):
+        super().__init__(origin)
+        self.frames = load_frames(path)
+        if not self.frames:
+            msg = f"No frames found in {path}"
+            raise RuntimeError(msg)
+        self.loop = loop
+        self.position = 0
+        self.lock = Lock()
+
+    def grab(self):
+        with self.lock:
+            if self.position >= len(self.frames):
+                if not self.loop:
+                    return None
+                self.position = 0
+            frame = self.frames[self.position]
+            self.position += 1
+            return frame
+
+
+def load_frames(path):
+    path = Path(path)
+    if path.is_dir():
+        files = sorted(file for file in path.iterdir() if file.suffix.lower() in IMAGE_SUFFIXES)
+        return [frame for frame in (imread(str(file), IMREAD_COLOR) for file in files) if frame is not None]
+
+    if path.suffix == ".npy":
+        return list(np.load(path))
+
+    if path.suffix == ".npz":
+        with np.load(path) as archive:
+            return list(archive["frames"])
+
+    msg = f"Unsupported replay source: {path}"
+    raise ValueError(msg)
+
+
+BACKENDS = {
+    DxcamBackend.name: DxcamBackend,
+    SyntheticBackend.name: SyntheticBackend,
+    ReplayBackend.name: ReplayBackend,
+}
+
+
+def create_backend(name, **options):
+    if name not in BACKENDS:
+        msg = f"Unknown capture backend: {name}"
+        raise ValueError(msg)
+    return BACKENDS[name](**options)
+
+
+def create_outputs(name, outputs=None, **options):
+    # One backend per display. Without an explicit list DXCam captures every attached output,
+    # while the other backends act as a single display unless given per-output options,
+    # e.g. [{"width": 1920, "height": 1080}, {"width": 1280, "height": 1024, "origin": [1920, 0], "seed": 1}]
+    if outputs is None and name == DxcamBackend.name:
+        detected = DxcamBackend.list_outputs()
+        outputs = [{"device_idx": device, "output_idx": output} for device, output in detected] or None
+    if not outputs:
+        return [create_backend(name, **options)]
+    return [create_backend(name, **{**options, **output}) for output in outputs]
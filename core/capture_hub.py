@@ -0,0 +1,142 @@
+import time
+from threading import Condition, Lock, Thread
+
+import numpy as np
+
+from .media_clock import media_time
+
+
+class CaptureHub:
+    def __init__(self, camera, target_fps=60):
+        self.camera = camera
+        self.target_fps = target_fps
+        self.condition = Condition()
+        self.camera_lock = Lock()
+        self.frame = None
+        self.frame_id = 0
+        self.timestamp = 0.0
+        self.users = 0
+        self.running = False
+        self.thread = None
+
+    def acquire(self):
+        with self.camera_lock:
+            self.users += 1
+            if self.users == 1:
+                self._start()
+
+    def release(self):
+        with self.camera_lock:
+            self.users = max(0, self.users - 1)
+            if self.users == 0:
+                self._stop()
+
+    def set_target_fps(self, target_fps):
+        with self.camera_lock:
+            self.target_fps = target_fps
+            if self.running:
+                self.camera.stop()
+                self.camera.start(target_fps=self.target_fps, video_mode=True)
+
+    def _start(self):
+        if not self.camera.is_capturing:
+            self.camera.start(target_fps=self.target_fps, video_mode=True)
+        self.running = True
+        self.thread = Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+
+    def _stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=1)
+            self.thread = None
+        if self.camera.is_capturing:
+            self.camera.stop()
+        with self.condition:
+            self.condition.notify_all()
+
+    def _capture_loop(self):
+        while self.running:
+            try:
+                frame = self.camera.get_latest_frame()
+            except Exception as e:
+                print(f"Capture error: {e}")
+                time.sleep(0.1)
+                continue
+
+            if frame is None:
+                continue
+
+            with self.condition:
+                self.frame = frame
+                self.frame_id += 1
+                self.timestamp = media_time()
+                self.condition.notify_all()
+
+    def latest(self):
+        with self.condition:
+            return self.frame_id, self.timestamp, self.frame
+
+    def wait_frame(self, last_id, timeout=0.1):
+        with self.condition:
+            if self.frame_id == last_id:
+                self.condition.wait(timeout)
+            if self.frame_id == last_id:
+                return last_id, None, None
+            return self.frame_id, self.timestamp, self.frame
+
+
+class CompositeHub:
+    def __init__(self, hubs, geometries):
+        self.hubs = hubs
+        left = min(x for x, _, _, _ in geometries)
+        top = min(y for _, y, _, _ in geometries)
+        self.origin = (left, top)
+        self.offsets = [(x - left, y - top) for x, y, _, _ in geometries]
+        self.width = max(x + width for x, _, width, _ in geometries) - left
+        self.height = max(y + height for _, y, _, height in geometries) - top
+        self.lock = Lock()
+        self.frame = None
+        self.frame_id = 0
+        self.timestamp = 0.0
+        self.member_ids = None
+
+    @property
+    def running(self):
+        return all(hub.running for hub in self.hubs)
+
+    def acquire(self):
+        for hub in self.hubs:
+            hub.acquire()
+
+    def release(self):
+        for hub in self.hubs:
+            hub.release()
+
+    def latest(self):
+        with self.lock:
+            frames = [hub.latest() for hub in self.hubs]
+            member_ids = tuple(frame_id for frame_id, _, _ in frames)
+            if member_ids == self.member_ids or any(frame is None for _, _, frame in frames):
+                return self.frame_id, self.timestamp, self.frame
+
+            # Built once per change and shared, so it is never written to after being handed out
+            canvas = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+            for (x, y), (_, _, frame) in zip(self.offsets, frames, strict=True):
+                height, width = frame.shape[:2]
+                canvas[y:y + height, x:x + width] = frame
+            self.member_ids = member_ids
+            self.frame = canvas
+            self.frame_id += 1
+            self.timestamp = max(timestamp for _, timestamp, _ in frames)
+            return self.frame_id, self.timestamp, self.frame
+
+    def wait_frame(self, last_id, timeout=0.1):
+        frame_id, timestamp, frame = self.latest()
+        if frame_id == last_id:
+            # The first output paces the composite; the others are picked up as they change
+            self.hubs[0].wait_frame(self.hubs[0].frame_id, timeout)
+            frame_id, timestamp, frame = self.latest()
+        if frame_id == last_id:
+            return last_id, None, None
+        return frame_id, timestamp, frame
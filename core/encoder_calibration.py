@@ -0,0 +1,90 @@
+import json
+import os
+import platform
+import time
+from pathlib import Path
+
+from .image_encoders import IMAGE_ENCODERS, available_encoders, encode_region
+
+CALIBRATION_QUALITIES = (50, 70, 90)
+
+
+def calibrate(frames, qualities=CALIBRATION_QUALITIES, repeats=2):
+    pixels = sum(frame.shape[0] * frame.shape[1] for frame in frames)
+    results = []
+    for encoder in available_encoders():
+        # Lossless encoders ignore quality, so one pass covers them
+        for quality in (100,) if IMAGE_ENCODERS[encoder]["lossless"] else qualities:
+            encode_region(encoder, frames[0], quality)
+            size = 0
+            start = time.perf_counter()
+            for _ in range(repeats):
+                size = sum(len(encode_region(encoder, frame, quality)) for frame in frames)
+            elapsed = (time.perf_counter() - start) / repeats
+            results.append({
+                "encoder": encoder,
+                "quality": quality,
+                "lossless": IMAGE_ENCODERS[encoder]["lossless"],
+                # Normalized per pixel so one calibration covers every resolution and viewport
+                "ms_per_mpx": round(elapsed * 1000 / pixels * 1e6, 3),
+                "bytes_per_px": round(size / pixels, 5),
+            })
+
+    height, width = frames[0].shape[:2]
+    return {
+        "host": platform.node(),
+        "machine": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "created": time.time(),
+        "frame_size": [width, height],
+        "frames": len(frames),
+        "results": results,
+    }
+
+
+def select_encoder(profile, quality, load, target_kbps, workers=1):
+    # load is the pixels per frame and frames per second to encode
+    pixels, fps = load
+    available = set(available_encoders())
+    nearest = {}
+    for result in profile["results"]:
+        encoder = result["encoder"]
+        if encoder not in available:
+            continue
+        distance = 0 if result["lossless"] else abs(result["quality"] - quality)
+        if encoder not in nearest or distance < nearest[encoder][0]:
+            nearest[encoder] = (distance, result)
+    if not nearest:
+        return "jpeg"
+
+    candidates = []
+    for _, result in nearest.values():
+        kbps = result["bytes_per_px"] * pixels * fps * 8 / 1000
+        ms = result["ms_per_mpx"] * pixels / 1e6
+        candidates.append((result["encoder"], kbps, ms))
+
+    # An encoder is only usable if the workers can keep up with the frame rate
+    budget = 1000 / fps * workers
+    fast_enough = [candidate for candidate in candidates if candidate[2] <= budget] or candidates
+    within_target = [candidate for candidate in fast_enough if candidate[1] <= target_kbps]
+    if within_target:
+        return min(within_target, key=lambda candidate: candidate[2])[0]
+    return min(fast_enough, key=lambda candidate: candidate[1])[0]
+
+
+def load_profile(path):
+    try:
+        with Path(path).open() as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Error loading encoder profile {path}: {e}")
+        return None
+
+
+def save_profile(path, profile):
+    path = Path(path)
+    temporary = path.with_name(f"{path.name}.tmp")
+    temporary.write_text(json.dumps(profile, indent=2))
+    temporary.replace(path)
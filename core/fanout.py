@@ -0,0 +1,184 @@
+import time
+from collections import deque
+from threading import Condition, Lock
+
+from .media_clock import media_time
+
+DROP_POLICIES = ("drop_oldest", "latest")
+MAX_PENDING_ACKS = 120
+ACK_TIMEOUT = 2.0
+
+
+class Subscriber:
+    def __init__(self, sid, max_queue=3, drop_policy="drop_oldest", on_resync=None):
+        self.sid = sid
+        self.max_queue = max_queue
+        self.drop_policy = drop_policy
+        self.on_resync = on_resync
+        self.queue = deque()
+        self.condition = Condition()
+        self.active = True
+        # Nothing can be decoded before the first keyframe
+        self.needs_keyframe = True
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.created = time.time()
+        # seq -> (send time, capture timestamp) for frames the client has not acknowledged yet
+        self.pending = {}
+        self.acked = 0
+        self.rtt = 0.0
+
+    def push(self, item, *, keyframe=True):
+        resync = False
+        with self.condition:
+            if not self.active:
+                return
+
+            if not keyframe and self.needs_keyframe:
+                self.dropped += 1
+                return
+
+            if keyframe:
+                self.needs_keyframe = False
+                if self.drop_policy == "latest":
+                    self.dropped += len(self.queue)
+                    self.queue.clear()
+
+            if len(self.queue) >= self.max_queue:
+                self.queue.popleft()
+                self.dropped += 1
+                # Deltas built on the dropped frame cannot be applied any more
+                while self.queue and not self.queue[0][1]:
+                    self.queue.popleft()
+                    self.dropped += 1
+                if not self.queue and not keyframe:
+                    self.dropped += 1
+                    self.needs_keyframe = True
+                    resync = True
+
+            if not self.needs_keyframe:
+                self.queue.append((item, keyframe))
+                self.condition.notify()
+
+        if resync and self.on_resync:
+            self.on_resync()
+
+    def get(self, timeout=0.1):
+        with self.condition:
+            if not self.queue and self.active:
+                self.condition.wait(timeout)
+            if not self.queue:
+                return None
+            item, _ = self.queue.popleft()
+            self.sent += 1
+            return item
+
+    def record_sent(self, size, seq=None, timestamp=None):
+        self.bytes_sent += size
+        if seq is None:
+            return
+        with self.condition:
+            self.pending[seq] = (media_time(), timestamp)
+            if len(self.pending) > MAX_PENDING_ACKS:
+                del self.pending[next(iter(self.pending))]
+
+    def acknowledge(self, seq):
+        now = media_time()
+        with self.condition:
+            sent = self.pending.pop(seq, None)
+            if sent is None:
+                return None
+            # Older frames still pending were lost or skipped by the client
+            for pending_seq in [pending_seq for pending_seq in self.pending if pending_seq < seq]:
+                del self.pending[pending_seq]
+            self.acked += 1
+            sent_time, timestamp = sent
+            self.rtt = now - sent_time
+            return now - timestamp, self.rtt, len(self.queue) + len(self.pending)
+
+    def in_flight(self):
+        with self.condition:
+            if not self.acked:
+                return 0
+            expired = media_time() - ACK_TIMEOUT
+            for seq in [seq for seq, (sent_time, _) in self.pending.items() if sent_time < expired]:
+                del self.pending[seq]
+            return len(self.pending)
+
+    def request_keyframe(self):
+        # Asks whichever broadcast this subscriber is currently on
+        with self.condition:
+            on_resync = self.on_resync
+        if on_resync:
+            on_resync()
+
+    def resync(self, on_resync):
+        # Frames and acks from the previous source mean nothing to the next one
+        with self.condition:
+            self.on_resync = on_resync
+            self.dropped += len(self.queue)
+            self.queue.clear()
+            self.pending.clear()
+            self.needs_keyframe = True
+
+    def close(self):
+        with self.condition:
+            self.active = False
+            self.queue.clear()
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            return {
+                "queued": len(self.queue),
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "bytes_sent": self.bytes_sent,
+                "needs_keyframe": self.needs_keyframe,
+                "in_flight": len(self.pending),
+                "rtt_ms": round(self.rtt * 1000, 1),
+                "connected_for": round(time.time() - self.created, 1),
+            }
+
+
+class FanOut:
+    def __init__(self):
+        self.lock = Lock()
+        self.subscribers = {}
+
+    def add(self, subscriber):
+        with self.lock:
+            previous = self.subscribers.get(subscriber.sid)
+            self.subscribers[subscriber.sid] = subscriber
+        if previous:
+            previous.close()
+
+    def remove(self, sid, *, close=True):
+        with self.lock:
+            subscriber = self.subscribers.pop(sid, None)
+        if subscriber and close:
+            subscriber.close()
+        return subscriber
+
+    def clear(self):
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+            self.subscribers.clear()
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def publish(self, item, *, keyframe=True):
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+        for subscriber in subscribers:
+            subscriber.push(item, keyframe=keyframe)
+
+    def stats(self):
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+        return {subscriber.sid: subscriber.stats() for subscriber in subscribers}
+
+    def __len__(self):
+        with self.lock:
+            return len(self.subscribers)
@@ -0,0 +1,76 @@
+from cv2 import IMWRITE_JPEG_OPTIMIZE, IMWRITE_JPEG_QUALITY, IMWRITE_PNG_COMPRESSION, IMWRITE_WEBP_QUALITY, imencode
+
+try:
+    from turbojpeg import TJFLAG_FASTDCT, TJSAMP_420, TurboJPEG
+except ImportError:
+    TurboJPEG = None
+
+# Image format ids, sent in the upper nibble of a frame's flags so the client picks the right decoder
+FORMAT_JPEG = 0
+FORMAT_WEBP = 1
+FORMAT_PNG = 2
+
+_turbojpeg = None
+
+
+def _load_turbojpeg():
+    global _turbojpeg  # noqa: PLW0603
+    if _turbojpeg is None and TurboJPEG is not None:
+        try:
+            _turbojpeg = TurboJPEG()
+        except OSError as e:
+            # The Python binding is installed but the libjpeg-turbo library itself is missing
+            print(f"libjpeg-turbo unavailable: {e}")
+            _turbojpeg = False
+    return _turbojpeg
+
+
+def _imencode(extension, frame, params):
+    success, buffer = imencode(extension, frame, params)
+    if not success:
+        msg = f"Failed to encode {extension} image"
+        raise RuntimeError(msg)
+    return buffer
+
+
+def encode_jpeg(frame, quality):
+    return _imencode(".jpg", frame, [int(IMWRITE_JPEG_QUALITY), quality])
+
+
+def encode_opencv_jpeg_optimized(frame, quality):
+    # Optimized Huffman tables: a few percent smaller for a second pass over the data
+    return _imencode(".jpg", frame, [int(IMWRITE_JPEG_QUALITY), quality, int(IMWRITE_JPEG_OPTIMIZE), 1])
+
+
+def encode_turbojpeg(frame, quality):
+    return _load_turbojpeg().encode(frame, quality=quality, jpeg_subsample=TJSAMP_420, flags=TJFLAG_FASTDCT)
+
+
+def encode_webp(frame, quality):
+    return _imencode(".webp", frame, [int(IMWRITE_WEBP_QUALITY), max(1, min(100, quality))])
+
+
+def encode_png(frame, _quality):
+    # Lossless and fast to compress at level 1; small only when the content is flat, like static UI
+    return _imencode(".png", frame, [int(IMWRITE_PNG_COMPRESSION), 1])
+
+
+IMAGE_ENCODERS = {
+    "jpeg": {"format": FORMAT_JPEG, "encode": encode_jpeg, "lossless": False, "mimetype": "image/jpeg"},
+    "jpeg-optimized": {
+        "format": FORMAT_JPEG, "encode": encode_opencv_jpeg_optimized, "lossless": False, "mimetype": "image/jpeg",
+    },
+    "turbojpeg": {"format": FORMAT_JPEG, "encode": encode_turbojpeg, "lossless": False, "mimetype": "image/jpeg"},
+    "webp": {"format": FORMAT_WEBP, "encode": encode_webp, "lossless": False, "mimetype": "image/webp"},
+    "png": {"format": FORMAT_PNG, "encode": encode_png, "lossless": True, "mimetype": "image/png"},
+}
+# Screenshots are offered in the formats every browser can show, each made by the encoder of the same name
+IMAGE_FORMATS = ("png", "jpeg", "webp")
+
+
+def available_encoders():
+    return [name for name in IMAGE_ENCODERS if name != "turbojpeg" or _load_turbojpeg()]
+
+
+def encode_region(encoder, frame, quality):
+    return IMAGE_ENCODERS[encoder]["encode"](frame, quality)
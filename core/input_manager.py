@@ -17,6 +17,11 @@ class InputManager:
             "find": "ctrl+f", "selectall": "ctrl+a",
         }
         self._original_clipboard = None
+        # Virtual desktop position of the streamed region; client coordinates are relative to it
+        self.origin = (0, 0)
+
+    def set_origin(self, origin):
+        self.origin = tuple(origin)
 
     def _preserve_clipboard(self):
         try:
@@ -32,7 +37,8 @@ class InputManager:
 
     def handle_mouse_event(self, data):
         event_type = data["type"]
-        x, y = int(data["x"]), int(data["y"])
+        origin_x, origin_y = self.origin
+        x, y = int(data["x"]) + origin_x, int(data["y"]) + origin_y
         self.mouse.position = (x, y)
 
         if event_type == "click":
@@ -0,0 +1,140 @@
+import math
+import time
+from threading import Condition
+
+import numpy as np
+
+# Gain applied when a lost frame is replaced by a repeat of the previous one
+CONCEALMENT_GAIN = 0.5
+
+
+class JitterBuffer:
+    def __init__(self, frame_duration=0.02, min_depth=1, max_depth=25):
+        self.condition = Condition()
+        self.frame_duration = frame_duration
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        # seq -> payload; played strictly in sequence order
+        self.frames = {}
+        self.next_seq = None
+        self.playing = False
+        self.target_depth = min_depth
+        self.jitter = 0.0
+        self.last_transit = None
+        self.origin = time.monotonic()
+        self.received = 0
+        self.played = 0
+        self.underruns = 0
+        self.overruns = 0
+        self.late = 0
+        self.concealed = 0
+
+    def configure(self, frame_duration):
+        with self.condition:
+            self.frame_duration = frame_duration
+            self._clear()
+
+    def clear(self):
+        with self.condition:
+            self._clear()
+
+    def _clear(self):
+        self.frames.clear()
+        self.next_seq = None
+        self.playing = False
+        self.target_depth = self.min_depth
+        self.jitter = 0.0
+        self.last_transit = None
+
+    def push(self, sequence, payload, arrival=None):
+        arrival = time.monotonic() if arrival is None else arrival
+        with self.condition:
+            self.received += 1
+            if self.next_seq is not None and sequence < self.next_seq:
+                if self.next_seq - sequence <= self.max_depth * 2:
+                    self.late += 1
+                    return
+                # Far behind what is playing: the sender restarted its sequence
+                self._clear()
+            self._update_jitter(sequence, arrival)
+            self.frames[sequence] = payload
+            self.condition.notify()
+
+    def _update_jitter(self, sequence, arrival):
+        # Interarrival jitter as in RFC 3550: the smoothed change in transit time between frames
+        transit = arrival - self.origin - sequence * self.frame_duration
+        if self.last_transit is not None:
+            self.jitter += (abs(transit - self.last_transit) - self.jitter) / 16
+        self.last_transit = transit
+        # Deep enough to ride out about three standard jitters, plus the frame being played
+        depth = math.ceil(3 * self.jitter / self.frame_duration) + 1
+        self.target_depth = max(self.min_depth, min(self.max_depth, depth))
+
+    def pop(self, timeout=None):
+        # Returns the next payload in sequence, or None when the caller should play concealment instead
+        timeout = self.frame_duration if timeout is None else timeout
+        with self.condition:
+            if not self.playing:
+                if len(self.frames) < self.target_depth:
+                    self.condition.wait(timeout)
+                if len(self.frames) < self.target_depth:
+                    return None
+                self.playing = True
+                self.next_seq = min(self.frames)
+
+            self._catch_up()
+            if self.next_seq not in self.frames:
+                self.condition.wait(timeout)
+                if not self.playing:
+                    # Cleared or restarted while waiting
+                    return None
+            payload = self.frames.pop(self.next_seq, None)
+            self.next_seq += 1
+            if payload is not None:
+                self.played += 1
+                return payload
+
+            if self.frames:
+                # A later frame is already here, so this one was lost or is too late to wait for
+                self.concealed += 1
+            else:
+                # Ran dry: refill to the target depth before playing again
+                self.underruns += 1
+                self.playing = False
+            return None
+
+    def _catch_up(self):
+        # Drop the oldest frames once the buffer holds well over its target, instead of playing late forever
+        limit = self.target_depth + max(2, self.target_depth)
+        while len(self.frames) > limit:
+            oldest = min(self.frames)
+            del self.frames[oldest]
+            self.overruns += 1
+            self.next_seq = max(self.next_seq, oldest + 1)
+        if self.frames and self.next_seq < min(self.frames) - self.target_depth:
+            self.next_seq = min(self.frames)
+
+    def stats(self):
+        with self.condition:
+            return {
+                "depth": len(self.frames),
+                "depth_ms": round(len(self.frames) * self.frame_duration * 1000, 1),
+                "target_depth": self.target_depth,
+                "target_ms": round(self.target_depth * self.frame_duration * 1000, 1),
+                "jitter_ms": round(self.jitter * 1000, 2),
+                "playing": self.playing,
+                "received": self.received,
+                "played": self.played,
+                "underruns": self.underruns,
+                "overruns": self.overruns,
+                "late": self.late,
+                "concealed": self.concealed,
+            }
+
+
+def conceal(previous, samples, missing):
+    # The first lost frame repeats the last one, faded; longer gaps fall silent
+    if previous is not None and missing == 1:
+        frame = np.frombuffer(previous, dtype=np.int16)[:samples]
+        return (frame * CONCEALMENT_GAIN).astype(np.int16).tobytes()
+    return bytes(samples * 2)
@@ -0,0 +1,52 @@
+import time
+from threading import Lock
+
+# Fixed once, so capture times follow the monotonic clock and never jump when the wall clock is adjusted,
+# while staying in epoch seconds for recordings, replay lookups and the client's clock offset
+EPOCH_OFFSET = time.time() - time.monotonic()
+MEDIA_TYPES = ("video", "audio")
+
+
+def media_time():
+    # The one timeline every audio chunk and video frame is stamped on
+    return time.monotonic() + EPOCH_OFFSET
+
+
+class ClockSync:
+    def __init__(self):
+        self.lock = Lock()
+        # sid -> the client's last report of its clock offset and per-media capture-to-playout latency
+        self.clients = {}
+
+    def ping(self, client_time):
+        # The client halves the round trip to estimate its offset from the server timeline
+        return {"client_time": client_time, "server_time": media_time()}
+
+    def report(self, sid, offset, rtt, latency):
+        with self.lock:
+            self.clients[sid] = {
+                "offset_ms": round(float(offset) * 1000, 1),
+                "rtt_ms": round(float(rtt) * 1000, 1),
+                "latency_ms": {
+                    media: round(float(latency[media]) * 1000, 1)
+                    for media in MEDIA_TYPES
+                    if latency.get(media) is not None
+                },
+                "updated": media_time(),
+            }
+
+    def remove(self, sid):
+        with self.lock:
+            self.clients.pop(sid, None)
+
+    def stats(self):
+        with self.lock:
+            clients = {sid: dict(client) for sid, client in self.clients.items()}
+        now = media_time()
+        for client in clients.values():
+            client["age"] = round(now - client.pop("updated"), 1)
+            latency = client["latency_ms"]
+            if all(media in latency for media in MEDIA_TYPES):
+                # Positive when audio plays out after the video it belongs to
+                client["av_offset_ms"] = round(latency["audio"] - latency["video"], 1)
+        return {"server_time": now, "clients": clients}
@@ -0,0 +1,109 @@
+import time
+from threading import Lock, Thread
+
+try:
+    import win32gui
+except ImportError:
+    win32gui = None
+
+# Standard Windows cursor resource ids mapped to CSS cursor names
+CURSOR_SHAPES = {
+    32512: "default",
+    32513: "text",
+    32514: "wait",
+    32515: "crosshair",
+    32516: "n-resize",
+    32642: "nwse-resize",
+    32643: "nesw-resize",
+    32644: "ew-resize",
+    32645: "ns-resize",
+    32646: "move",
+    32648: "not-allowed",
+    32649: "pointer",
+    32650: "progress",
+    32651: "help",
+}
+CURSOR_SHOWING = 0x00000001
+
+_cursor_handles = None
+
+
+def _load_cursor_handles():
+    global _cursor_handles  # noqa: PLW0603
+    if _cursor_handles is None:
+        _cursor_handles = {}
+        for resource_id, shape in CURSOR_SHAPES.items():
+            try:
+                _cursor_handles[win32gui.LoadCursor(0, resource_id)] = shape
+            except Exception as e:
+                print(f"Error loading cursor {resource_id}: {e}")
+    return _cursor_handles
+
+
+def sample_cursor():
+    if win32gui is None:
+        return None
+    try:
+        flags, handle, (x, y) = win32gui.GetCursorInfo()
+    except Exception:
+        return None
+    shape = _load_cursor_handles().get(handle, "default") if flags & CURSOR_SHOWING else "none"
+    return x, y, shape
+
+
+class MetadataChannel:
+    def __init__(self, sample, emit, recipients, rate=30):
+        self.sample = sample
+        self.emit = emit
+        self.recipients = recipients
+        self.rate = rate
+        self.state = {}
+        self.lock = Lock()
+        self.thread = None
+        self.running = False
+        self.ticks = 0
+        self.messages = 0
+
+    def set_rate(self, rate):
+        self.rate = max(1, rate)
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.thread = Thread(target=self._loop, daemon=True)
+            self.thread.start()
+
+    def _loop(self):
+        known = set()
+        while self.running:
+            start = time.perf_counter()
+            with self.lock:
+                sids = set(self.recipients())
+                if not sids:
+                    self.running = False
+                    self.state = {}
+                    break
+
+            try:
+                current = self.sample()
+            except Exception as e:
+                print(f"Error sampling stream metadata: {e}")
+                current = {}
+
+            # Everything that changed during this tick goes out as one message
+            changes = {key: value for key, value in current.items() if self.state.get(key) != value}
+            self.state.update(changes)
+            self.ticks += 1
+            for sid in sids:
+                message = changes if sid in known else self.state
+                if message:
+                    self.emit(dict(message), sid)
+                    self.messages += 1
+            known = sids
+
+            time.sleep(max(0.0, 1.0 / self.rate - (time.perf_counter() - start)))
+
+    def stats(self):
+        return {"rate": self.rate, "ticks": self.ticks, "messages": self.messages}
@@ -11,8 +11,15 @@ MOUSEEVENTF_MIDDLEDOWN = 0x0020
 MOUSEEVENTF_MIDDLEUP = 0x0040
 MOUSEEVENTF_WHEEL = 0x0800
 MOUSEEVENTF_HWHEEL = 0x1000
+MOUSEEVENTF_VIRTUALDESK = 0x4000
 MOUSEEVENTF_ABSOLUTE = 0x8000
 
+# Virtual screen metrics, covering every monitor
+SM_XVIRTUALSCREEN = 76
+SM_YVIRTUALSCREEN = 77
+SM_CXVIRTUALSCREEN = 78
+SM_CYVIRTUALSCREEN = 79
+
 # Input type constant
 INPUT_MOUSE = 0
 
@@ -62,9 +69,11 @@ class MouseController:
         self.user32.GetSystemMetrics.argtypes = [INT]
         self.user32.GetSystemMetrics.restype = INT
 
-        # Cache screen dimensions
-        self.screen_width = self.user32.GetSystemMetrics(0)
-        self.screen_height = self.user32.GetSystemMetrics(1)
+        # Cache virtual screen bounds; secondary monitors can sit at negative coordinates
+        self.screen_x = self.user32.GetSystemMetrics(SM_XVIRTUALSCREEN)
+        self.screen_y = self.user32.GetSystemMetrics(SM_YVIRTUALSCREEN)
+        self.screen_width = self.user32.GetSystemMetrics(SM_CXVIRTUALSCREEN)
+        self.screen_height = self.user32.GetSystemMetrics(SM_CYVIRTUALSCREEN)
 
         # Button mapping
         self.button_map = {
@@ -78,8 +87,8 @@ class MouseController:
 
     def _to_windows_coordinates(self, x, y):
         return (
-            int((x * 65536) // self.screen_width + 1),
-            int((y * 65536) // self.screen_height + 1),
+            int(((x - self.screen_x) * 65536) // self.screen_width + 1),
+            int(((y - self.screen_y) * 65536) // self.screen_height + 1),
         )
 
     @property
@@ -92,14 +101,15 @@ class MouseController:
     def position(self, pos):
         x, y = int(pos[0]), int(pos[1])
 
-        # Ensure coordinates are within screen bounds
-        x = max(0, min(x, self.screen_width - 1))
-        y = max(0, min(y, self.screen_height - 1))
+        # Ensure coordinates are within virtual screen bounds
+        x = max(self.screen_x, min(x, self.screen_x + self.screen_width - 1))
+        y = max(self.screen_y, min(y, self.screen_y + self.screen_height - 1))
 
         # Convert to Windows coordinates
         win_x, win_y = self._to_windows_coordinates(x, y)
 
-        self._send_mouse_event(dx=win_x, dy=win_y, flags=MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE)
+        flags = MOUSEEVENTF_MOVE | MOUSEEVENTF_ABSOLUTE | MOUSEEVENTF_VIRTUALDESK
+        self._send_mouse_event(dx=win_x, dy=win_y, flags=flags)
 
     def _send_mouse_event(self, dx=0, dy=0, data=0, flags=0):
         extra = c_ulong(0)
@@ -0,0 +1,103 @@
+from bisect import bisect_right
+from collections import deque
+from threading import Lock
+
+from .session_recorder import RECORD_HEADER
+
+
+class ReplayBuffer:
+    def __init__(self, max_seconds=10.0, max_bytes=64 * 1024 * 1024):
+        self.lock = Lock()
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        # (timestamp, keyframe, packet); packets are shared with the live subscribers, not copied
+        self.frames = deque()
+        self.keyframes = deque()
+        self.bytes = 0
+        self.evicted = 0
+        self.keyframe_requested = False
+
+    def configure(self, max_seconds, max_bytes):
+        with self.lock:
+            self.max_seconds = max_seconds
+            self.max_bytes = max_bytes
+            if not max_seconds:
+                self._clear()
+            elif self.frames:
+                self._trim(self.frames[-1][0])
+
+    def append(self, timestamp, keyframe, packet):
+        with self.lock:
+            if not self.max_seconds:
+                return False
+            if not self.frames and not keyframe:
+                return self._request_keyframe()
+            self.frames.append((timestamp, keyframe, packet))
+            self.bytes += len(packet)
+            if keyframe:
+                self.keyframes.append(timestamp)
+                self.keyframe_requested = False
+            self._trim(timestamp)
+            # Encoders that only send deltas need a fresh keyframe now and then for old groups to be evicted
+            if not self.keyframes:
+                return self._request_keyframe()
+            return timestamp - self.keyframes[-1] >= self.max_seconds / 2 and self._request_keyframe()
+
+    def _request_keyframe(self):
+        requested = not self.keyframe_requested
+        self.keyframe_requested = True
+        return requested
+
+    def _trim(self, now):
+        # Frames leave a whole group at a time, so the buffer always opens with a keyframe; the newest group
+        # stays even when it alone is over budget, since the frames after it still depend on it
+        while len(self.keyframes) > 1 and self.bytes > self.max_bytes:
+            self._evict_group()
+        # The newest keyframe at or before the window start stays, keeping the whole window decodable
+        while len(self.keyframes) > 1 and self.keyframes[1] <= now - self.max_seconds:
+            self._evict_group()
+
+    def _evict_group(self):
+        self.keyframes.popleft()
+        self.bytes -= len(self.frames.popleft()[2])
+        self.evicted += 1
+        while self.frames and not self.frames[0][1]:
+            self.bytes -= len(self.frames.popleft()[2])
+            self.evicted += 1
+
+    def clear(self):
+        with self.lock:
+            self._clear()
+
+    def _clear(self):
+        self.frames.clear()
+        self.keyframes.clear()
+        self.bytes = 0
+
+    def frames_between(self, start, end):
+        with self.lock:
+            frames = list(self.frames)
+        timestamps = [timestamp for timestamp, _, _ in frames]
+        first = max(0, bisect_right(timestamps, start) - 1)
+        last = bisect_right(timestamps, end)
+        if last == 0:
+            return []
+        # Back up to the keyframe the first requested frame depends on
+        while first > 0 and not frames[first][1]:
+            first -= 1
+        return [(timestamp, RECORD_HEADER.pack(len(packet)) + packet) for timestamp, _, packet in frames[first:last]]
+
+    def frame_at(self, timestamp):
+        return self.frames_between(timestamp, timestamp)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "frames": len(self.frames),
+                "bytes": self.bytes,
+                "start": self.frames[0][0] if self.frames else None,
+                "end": self.frames[-1][0] if self.frames else None,
+                "evicted": self.evicted,
+                "max_seconds": self.max_seconds,
+                "max_bytes": self.max_bytes,
+            }
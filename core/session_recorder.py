@@ -0,0 +1,234 @@
+import json
+import re
+import struct
+import time
+from bisect import bisect_right
+from pathlib import Path
+from threading import Thread
+
+from .media_clock import media_time
+
+MANIFEST = "session.json"
+SESSION_NAME = re.compile(r"^[\w-]+$")
+# Each packet on disk is its length followed by the binary stream packet, header included
+RECORD_HEADER = struct.Struct("<I")
+# timestamp, byte offset into the segment, keyframe
+INDEX_ENTRY = struct.Struct("<dQ?")
+FLUSH_INTERVAL = 1.0
+
+
+def session_path(root, name):
+    if not SESSION_NAME.match(name):
+        msg = f"Invalid recording name: {name}"
+        raise ValueError(msg)
+    path = Path(root) / name
+    if not (path / MANIFEST).is_file():
+        msg = f"Recording not found: {name}"
+        raise ValueError(msg)
+    return path
+
+
+def load_manifest(path):
+    with (Path(path) / MANIFEST).open() as f:
+        return json.load(f)
+
+
+def list_sessions(root):
+    root = Path(root)
+    if not root.is_dir():
+        return []
+    sessions = []
+    for path in sorted(root.iterdir()):
+        try:
+            manifest = load_manifest(path)
+        except (OSError, ValueError):
+            continue
+        segments = manifest["segments"]
+        sessions.append({
+            "name": path.name,
+            "profile": manifest["profile"],
+            "started": manifest["started"],
+            "duration": round(segments[-1]["end"] - manifest["started"], 2) if segments else 0,
+            "segments": len(segments),
+            "bytes": sum(segment["bytes"] for segment in segments),
+            "recording": manifest["recording"],
+        })
+    return sessions
+
+
+def read_index(path):
+    data = Path(path).read_bytes()
+    # A segment that is still being recorded can end in a partly written entry
+    complete = len(data) - len(data) % INDEX_ENTRY.size
+    return [INDEX_ENTRY.unpack_from(data, offset) for offset in range(0, complete, INDEX_ENTRY.size)]
+
+
+def read_packets(path, index, position=0):
+    with Path(path).open("rb") as f:
+        if position < len(index):
+            f.seek(index[position][1])
+        for timestamp, _, _ in index[position:]:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            (length,) = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return
+            # Packets keep their length prefix so they can be sent back to back over HTTP
+            yield timestamp, header + payload
+
+
+def pace_packets(packets, target, speed=1.0):
+    clock = None
+    for timestamp, packet in packets:
+        # Frames between the keyframe and the target rebuild the picture without waiting
+        if timestamp >= target and speed > 0:
+            if clock is None:
+                clock = (time.perf_counter(), timestamp)
+            delay = clock[0] + (timestamp - clock[1]) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        yield packet
+
+
+def iter_playback(path, start=0.0, speed=1.0):
+    path = Path(path)
+    manifest = load_manifest(path)
+    target = manifest["started"] + max(0.0, start)
+    yield from pace_packets(_iter_segments(path, manifest["segments"], target), target, speed)
+
+
+def _iter_segments(path, segments, target):
+    if not segments:
+        return
+
+    # Start from the segment covering the target; every segment opens with a keyframe
+    first = max(0, bisect_right([segment["start"] for segment in segments], target) - 1)
+    for number, segment in enumerate(segments[first:]):
+        index = read_index(path / segment["index"])
+        position = 0
+        if number == 0:
+            keyframes = [i for i, (timestamp, _, keyframe) in enumerate(index) if keyframe and timestamp <= target]
+            position = keyframes[-1] if keyframes else 0
+
+        yield from read_packets(path / segment["file"], index, position)
+
+
+class SessionRecorder:
+    def __init__(self, root, profile, subscriber, segment_seconds=60, info=None):
+        self.profile = profile
+        self.subscriber = subscriber
+        self.segment_seconds = segment_seconds
+        self.name = f"{time.strftime('%Y%m%d-%H%M%S')}-{profile}"
+        self.path = Path(root) / self.name
+        self.manifest = {
+            "name": self.name,
+            "profile": profile,
+            # Same clock as the frame timestamps, so playback offsets from it land on the right frames
+            "started": media_time(),
+            "segment_seconds": segment_seconds,
+            "recording": True,
+            "segments": [],
+            **(info or {}),
+        }
+        self.file = None
+        self.index = None
+        self.segment = None
+        self.keyframe_requested = False
+        self.last_flush = 0.0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._write_manifest()
+        self.running = True
+        self.thread = Thread(target=self._record_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.subscriber.close()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+        self._close_segment()
+        self.manifest["recording"] = False
+        self._write_manifest()
+
+    def _record_loop(self):
+        while self.running:
+            frame = self.subscriber.get()
+            if frame is None:
+                continue
+            try:
+                self._write(frame)
+            except OSError as e:
+                print(f"Recording error: {e}")
+                self.running = False
+
+    def _write(self, frame):
+        due = self.segment is None or frame.timestamp - self.segment["start"] >= self.segment_seconds
+        if due and frame.keyframe:
+            self._open_segment(frame.timestamp)
+        elif due and not self.keyframe_requested:
+            # Segments only roll over on a keyframe so each one can be played back on its own
+            self.subscriber.request_keyframe()
+            self.keyframe_requested = True
+        if self.segment is None:
+            return
+
+        offset = self.file.tell()
+        self.file.write(RECORD_HEADER.pack(len(frame.payload)))
+        self.file.write(frame.payload)
+        self.index.write(INDEX_ENTRY.pack(frame.timestamp, offset, frame.keyframe))
+        self.segment["end"] = frame.timestamp
+        self.segment["frames"] += 1
+        self.segment["bytes"] = offset + RECORD_HEADER.size + len(frame.payload)
+
+        # Keep the files readable for playback while the session is still being recorded
+        if frame.timestamp - self.last_flush >= FLUSH_INTERVAL:
+            self.file.flush()
+            self.index.flush()
+            self.last_flush = frame.timestamp
+
+    def _open_segment(self, timestamp):
+        self._close_segment()
+        number = len(self.manifest["segments"])
+        self.segment = {
+            "file": f"segment_{number:05d}.bin",
+            "index": f"segment_{number:05d}.idx",
+            "start": timestamp,
+            "end": timestamp,
+            "frames": 0,
+            "bytes": 0,
+        }
+        self.manifest["segments"].append(self.segment)
+        self.file = (self.path / self.segment["file"]).open("wb")
+        self.index = (self.path / self.segment["index"]).open("wb")
+        self.keyframe_requested = False
+        self._write_manifest()
+
+    def _close_segment(self):
+        if self.file:
+            self.file.close()
+            self.index.close()
+            self.file = None
+            self.index = None
+
+    def _write_manifest(self):
+        temporary = self.path / f"{MANIFEST}.tmp"
+        temporary.write_text(json.dumps(self.manifest))
+        temporary.replace(self.path / MANIFEST)
+
+    def stats(self):
+        segment = self.segment or {}
+        return {
+            "name": self.name,
+            "profile": self.profile,
+            "duration": round(segment.get("end", self.manifest["started"]) - self.manifest["started"], 2),
+            "segments": len(self.manifest["segments"]),
+            "bytes": sum(segment["bytes"] for segment in self.manifest["segments"]),
+            "dropped": self.subscriber.dropped,
+        }
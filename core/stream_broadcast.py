@@ -0,0 +1,159 @@
+import time
+from threading import Event, Lock, Thread
+
+from .adaptive_controller import AdaptiveController
+from .fanout import FanOut
+from .stream_metrics import RateMeter, StreamMetrics
+from .stream_pipeline import EncodedFrame
+from .stream_protocol import FRAME_VIDEO, format_sse_frame, pack_encoded_frame
+from .tile_encoder import TileEncoder
+from .video_encoder import VideoEncoder
+
+
+class StreamBroadcast:
+    def __init__(self, profile, binary, capture_hub, create_pipeline):
+        self.profile = profile
+        self.binary = binary
+        self.capture_hub = capture_hub
+        self.create_pipeline = create_pipeline
+        self.fanout = FanOut()
+        self.tile_encoder = TileEncoder()
+        self.video_encoder = None
+        self.controller = AdaptiveController()
+        self.max_fps = None
+        self.image_encoder = None
+        self.next_frame_due = 0.0
+        self.overview_lock = Lock()
+        self.overview = (0.0, None)
+        self.pipeline = None
+        self.pipeline_updated = Event()
+        self.replay = None
+        self.running = False
+        self.thread = None
+        self.last_frame_id = 0
+        self.frame_rate = RateMeter()
+        self.metrics = StreamMetrics()
+
+    @property
+    def current_fps(self):
+        return round(self.frame_rate.rate)
+
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self._publish_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+    def is_active(self):
+        return self.running and len(self.fanout) > 0 and not self.pipeline_updated.is_set()
+
+    def switch_capture(self, capture_hub):
+        capture_hub.acquire()
+        previous, self.capture_hub = self.capture_hub, capture_hub
+        previous.release()
+        self.last_frame_id = 0
+        with self.overview_lock:
+            self.overview = (0.0, None)
+        self.pipeline_updated.set()
+
+    def request_keyframe(self):
+        self.tile_encoder.request_keyframe()
+        if self.video_encoder:
+            self.video_encoder.request_keyframe()
+
+    def capture(self):
+        frame_id, timestamp, frame = self.capture_hub.wait_frame(self.last_frame_id)
+        if frame is None:
+            return None
+        self.last_frame_id = frame_id
+
+        fps = self.max_fps
+        if self.controller.enabled:
+            _, _, controller_fps = self.controller.current()
+            fps = min(fps or controller_fps, controller_fps)
+        if fps:
+            # Thin the shared capture down to this broadcast's own frame rate, with enough slack that a capture
+            # paced at exactly that rate is not halved by timing jitter
+            interval = 1.0 / fps
+            if timestamp < self.next_frame_due - interval / 4:
+                return None
+            self.next_frame_due = max(self.next_frame_due, timestamp - interval) + interval
+        return timestamp, frame
+
+    def encode_video(self, job):
+        start = time.perf_counter()
+        seq, timestamp, width, height, _, regions, (codec, bitrate, gop_size, fps) = job
+        encoder = self.video_encoder
+        if encoder is None or not encoder.matches(codec, width, height, bitrate, gop_size):
+            encoder = VideoEncoder(codec, (width, height), fps, bitrate, gop_size)
+            self.video_encoder = encoder
+
+        payload, keyframe = encoder.encode(regions[0][4])
+        if payload is None:
+            return None, time.perf_counter() - start
+        tiles = [(0, 0, width, height, payload)]
+        frame = EncodedFrame(seq, timestamp, width, height, keyframe, tiles, FRAME_VIDEO, encoder.flags)
+        return frame, time.perf_counter() - start
+
+    def serialize(self, frame):
+        if self.binary:
+            return pack_encoded_frame(frame)
+        extra = {"seq": frame.seq, "adaptive": self.controller.snapshot()}
+        return format_sse_frame(frame.tiles[0][4], self.current_fps, extra)
+
+    def _publish_loop(self):
+        while self.running:
+            self.pipeline_updated.clear()
+            self.request_keyframe()
+            self.pipeline = self.create_pipeline(self)
+            self.pipeline.start()
+            try:
+                for frame in self.pipeline.frames():
+                    self.frame_rate.tick()
+                    start = time.perf_counter()
+                    payload = self.serialize(frame)
+                    self.metrics.stages["serialize"].record(time.perf_counter() - start)
+                    self.metrics.frame_size.record(len(payload))
+                    self.fanout.publish(frame._replace(payload=payload), keyframe=frame.keyframe)
+                    if self.replay is not None and self.replay.append(frame.timestamp, frame.keyframe, payload):
+                        self.request_keyframe()
+            except Exception as e:
+                # Stopped rather than left running without a loop, so the next viewer starts it again
+                print(f"Stream broadcast error ({self.profile}): {e}")
+                break
+            finally:
+                self.pipeline.stop()
+
+            if not self.pipeline_updated.is_set():
+                break
+        self.running = False
+
+    def stats(self):
+        return {
+            "profile": self.profile,
+            "binary": self.binary,
+            "fps": self.current_fps,
+            "adaptive": self.controller.snapshot(),
+            "image_encoder": self.image_encoder,
+            "pipeline": {name: stats.snapshot() for name, stats in self.metrics.stages.items()},
+            "subscribers": self.fanout.stats(),
+        }
+
+    def metrics_snapshot(self):
+        subscribers = self.fanout.stats()
+        return {
+            "profile": self.profile,
+            "binary": self.binary,
+            "fps": self.current_fps,
+            **self.metrics.snapshot(),
+            "subscriber_dropped": sum(stats["dropped"] for stats in subscribers.values()),
+            "queues": {
+                **(self.pipeline.queue_depths() if self.pipeline else {}),
+                "subscribers": {sid: stats["queued"] for sid, stats in subscribers.items()},
+            },
+        }
@@ -1,177 +1,1048 @@
-import base64
-import json
-import sys
+import os
 import time
-from threading import Event, Lock, Thread
+from threading import Lock
 
-import dxcam
-import win32gui
-from cv2 import IMWRITE_JPEG_QUALITY, imencode, resize
+import numpy as np
 from flask import current_app
 
+from .adaptive_controller import LayerSelector
+from .capture_backends import DxcamBackend, create_outputs
+from .capture_hub import CaptureHub, CompositeHub
+from .encoder_calibration import calibrate, load_profile, save_profile, select_encoder
+from .fanout import DROP_POLICIES, Subscriber
+from .image_encoders import IMAGE_ENCODERS, IMAGE_FORMATS, available_encoders, encode_jpeg, encode_region
+from .media_clock import media_time
+from .metadata_channel import MetadataChannel, sample_cursor
+from .replay_buffer import ReplayBuffer
+from .session_recorder import SessionRecorder, iter_playback, list_sessions, pace_packets, session_path
+from .stream_broadcast import StreamBroadcast
+from .stream_pipeline import EXECUTORS, INTERPOLATIONS, FrameScaler, StreamPipeline, scale_frame
+from .stream_protocol import FLAG_KEYFRAME, FRAME_JPEG, FrameInfo, pack_frame
+from .video_encoder import VIDEO_CODECS, available_codecs, even_frame
+from .window_tracker import Win32WindowProvider, WindowTracker
+
+try:
+    import win32gui
+except ImportError:
+    win32gui = None
+
+STREAM_INFO_INTERVAL = 1.0
+MIN_VIEWPORT_SIZE = 16
+SCREENSHOT_CACHE_TTL = 0.5
+STREAM_ENCODINGS = ("jpeg", "tiles")
+MAX_ENCODE_WORKERS = os.cpu_count() or 1
+PIPELINE_SETTINGS = ("encode_workers", "encode_executor", "encoding")
+VIEWPORT_KEYS = ("x", "y", "width", "height")
+VIRTUAL_DESKTOP = "desktop"
+# A recorder keeps every frame it can; two seconds of backlog before it resyncs on a keyframe
+RECORDING_QUEUE = 120
+# Simulcast layers are profiles derived from the default one; they only ever lower its quality, size and rate
+SIMULCAST_LAYERS = {
+    "thumbnail": {
+        "quality": 40,
+        "resolution_percentage": 15,
+        "max_fps": 2,
+        "encoding": "jpeg",
+        "scale_interpolation": "area",
+        "encode_workers": 1,
+        "adaptive": False,
+        "overview": False,
+    },
+    "medium": {"quality": 70, "resolution_percentage": 50, "max_fps": 30},
+}
+LAYERS = ("thumbnail", "medium", "full")
+
+
+def layer_of(profile):
+    if profile == "default":
+        return "full"
+    return profile if profile in SIMULCAST_LAYERS else None
+
 
 class StreamManager:
-    def __init__(self, socketio):
+    def __init__(
+        self, socketio, capture_backend=None, recording_dir="recordings", window_provider=None, encoder_profile=None,
+    ):
         self.socketio = socketio
-        self.stream_active = False
+        self.recording_dir = recording_dir
+        self.encoder_profile_path = encoder_profile
+        self.encoder_profile = load_profile(encoder_profile) if encoder_profile else None
+        self.window_provider = window_provider or Win32WindowProvider()
+        self.window_trackers = {}
+        # Called with the new input origin when a tracked window moves the default profile's region
+        self.origin_changed = None
+        self.recorders = {}
+        self.replay_buffers = {}
         self.stream_lock = Lock()
         self.settings_lock = Lock()
-        self.current_stream_sid = None
-        self.settings_updated = Event()
         self.stream_settings = {
             "quality": 100,
             "resolution_percentage": 100,
+            "scale_interpolation": "linear",
             "target_fps": 60,
+            "max_fps": None,
+            "encoding": "jpeg",
+            "image_encoder": "auto",
+            "target_bitrate": 20000,
+            "tile_size": 64,
+            "keyframe_interval": 300,
+            "gop_size": 120,
+            "video_bitrate": 4000,
+            "encode_workers": min(4, MAX_ENCODE_WORKERS),
+            "encode_executor": "thread",
+            "send_queue": 3,
+            "drop_policy": "drop_oldest",
+            "adaptive": False,
+            "target_latency": 150,
+            "min_quality": 30,
+            "min_resolution_percentage": 50,
+            "min_fps": 10,
+            "max_queue_depth": 4,
+            "output": 0,
+            "viewport": None,
+            "window": None,
+            "overview": True,
+            "overview_fps": 2,
+            "overview_scale": 20,
+            "overview_quality": 50,
+            "metadata_rate": 30,
+            "metrics_overlay": False,
+            "replay_seconds": 10,
+            "replay_bytes": 64 * 1024 * 1024,
         }
-        self.current_fps = 0
-        self.frame_times = []
-        self.cursor_update_thread = None
-        self.cursor_position = (0, 0)
+        self.profiles = {"default": self.stream_settings}
+        self.profiles.update({layer: self._derive_layer(layer) for layer in SIMULCAST_LAYERS})
+        self.broadcasts = {}
+        self.subscriptions = {}
+        self.layer_selectors = {}
+        self.metadata_app = None
+        self.metrics_summary = (0.0, None)
+        self.screenshot_lock = Lock()
+        self.screenshot_cache = {}
+        self.metadata = MetadataChannel(
+            self._sample_metadata,
+            self._emit_metadata,
+            lambda: list(self.subscriptions),
+            self.stream_settings["metadata_rate"],
+        )
+        if capture_backend is not None and not isinstance(capture_backend, list):
+            capture_backend = [capture_backend]
+        self.outputs = capture_backend
         self.setup_camera()
+        self.capture_hubs = {
+            index: CaptureHub(backend, self.stream_settings["target_fps"]) for index, backend in enumerate(self.outputs)
+        }
+        if len(self.outputs) > 1:
+            self.capture_hubs[VIRTUAL_DESKTOP] = CompositeHub(
+                list(self.capture_hubs.values()),
+                [self._output_geometry(index) for index in range(len(self.outputs))],
+            )
 
     def update_settings(self, new_settings):
+        profile = new_settings.get("profile", "default")
+        if profile in SIMULCAST_LAYERS:
+            msg = f"Simulcast layer {profile} follows the default profile"
+            raise ValueError(msg)
+
         with self.settings_lock:
+            if profile not in self.profiles:
+                self.profiles[profile] = {**self.stream_settings}
+            settings = self.profiles[profile]
+            previous = {key: settings[key] for key in PIPELINE_SETTINGS}
+            previous_output = settings["output"]
+            self._update_output_settings(settings, new_settings)
+            self._update_viewport_settings(settings, new_settings)
+            self._update_window_settings(profile, settings, new_settings)
+
             for key in ["quality", "resolution_percentage"]:
                 if key in new_settings:
-                    self.stream_settings[key] = max(1, min(100, int(new_settings[key])))
+                    settings[key] = max(1, min(100, int(new_settings[key])))
+
+            self._update_encoding_settings(settings, new_settings)
+            self._update_image_encoder_settings(settings, new_settings)
+            self._update_delivery_settings(settings, new_settings)
+            self._update_replay_settings(profile, settings, new_settings)
+            self._update_adaptive_settings(settings, new_settings)
+
+            profiles = (profile,)
+            if profile == "default":
+                self._update_shared_settings(settings, new_settings)
+                self._refresh_layers()
+                profiles = (profile, *SIMULCAST_LAYERS)
+
+            pipeline_changed = any(settings[key] != previous[key] for key in PIPELINE_SETTINGS)
+            output = settings["output"] if settings["output"] != previous_output else None
+
+        if output is not None or pipeline_changed:
+            self._restart_pipelines(profiles, output)
+        with self.stream_lock:
+            self._update_capture_rates()
+
+    def _restart_pipelines(self, profiles, output=None):
+        with self.stream_lock:
+            for broadcast in self.broadcasts.values():
+                if broadcast.profile not in profiles:
+                    continue
+                if output is not None:
+                    broadcast.switch_capture(self.capture_hubs[output])
+                else:
+                    broadcast.pipeline_updated.set()
+
+    def _update_shared_settings(self, settings, new_settings):
+        # Capture rate and the metadata channel are shared by every profile
+        if "target_fps" in new_settings:
+            new_fps = 60 if new_settings["target_fps"] is None else int(new_settings["target_fps"])
+            if new_fps != settings["target_fps"]:
+                settings["target_fps"] = new_fps
+
+        if "metadata_rate" in new_settings:
+            settings["metadata_rate"] = max(1, min(120, int(new_settings["metadata_rate"])))
+            self.metadata.set_rate(settings["metadata_rate"])
+
+        if "metrics_overlay" in new_settings:
+            settings["metrics_overlay"] = bool(new_settings["metrics_overlay"])
+
+    def _update_encoding_settings(self, settings, new_settings):
+        encoding = new_settings.get("encoding")
+        if encoding in STREAM_ENCODINGS or encoding in available_codecs():
+            settings["encoding"] = encoding
+
+        if "tile_size" in new_settings:
+            settings["tile_size"] = max(16, min(512, int(new_settings["tile_size"])))
+
+        if "keyframe_interval" in new_settings:
+            settings["keyframe_interval"] = max(1, int(new_settings["keyframe_interval"]))
+
+        if "gop_size" in new_settings:
+            settings["gop_size"] = max(1, min(1200, int(new_settings["gop_size"])))
+
+        if "video_bitrate" in new_settings:
+            settings["video_bitrate"] = max(100, min(50000, int(new_settings["video_bitrate"])))
+
+        if "encode_workers" in new_settings:
+            settings["encode_workers"] = max(1, min(MAX_ENCODE_WORKERS, int(new_settings["encode_workers"])))
+
+        if new_settings.get("scale_interpolation") in INTERPOLATIONS:
+            settings["scale_interpolation"] = new_settings["scale_interpolation"]
+
+        if new_settings.get("encode_executor") in EXECUTORS:
+            settings["encode_executor"] = new_settings["encode_executor"]
+
+    def _derive_layer(self, layer):
+        settings = {**self.stream_settings, **SIMULCAST_LAYERS[layer]}
+        for key in ("quality", "resolution_percentage", "max_fps"):
+            settings[key] = min(settings[key], self.stream_settings[key] or settings[key])
+        return settings
+
+    def _refresh_layers(self):
+        for layer in SIMULCAST_LAYERS:
+            settings = self.profiles[layer]
+            settings.update(self._derive_layer(layer))
+            self._update_replay_settings(layer, settings, {})
+
+    def _layer_profile(self, layer):
+        if layer not in LAYERS:
+            msg = f"Invalid simulcast layer: {layer}"
+            raise ValueError(msg)
+        return "default" if layer == "full" else layer
+
+    def _update_image_encoder_settings(self, settings, new_settings):
+        image_encoder = new_settings.get("image_encoder")
+        if image_encoder == "auto" or image_encoder in available_encoders():
+            settings["image_encoder"] = image_encoder
+
+        if "target_bitrate" in new_settings:
+            settings["target_bitrate"] = max(100, min(500000, int(new_settings["target_bitrate"])))
+
+    def _update_delivery_settings(self, settings, new_settings):
+        if "max_fps" in new_settings:
+            max_fps = new_settings["max_fps"]
+            settings["max_fps"] = None if max_fps is None else max(1, min(120, int(max_fps)))
+
+        if "send_queue" in new_settings:
+            settings["send_queue"] = max(1, min(60, int(new_settings["send_queue"])))
+
+        if new_settings.get("drop_policy") in DROP_POLICIES:
+            settings["drop_policy"] = new_settings["drop_policy"]
+
+    def _update_replay_settings(self, profile, settings, new_settings):
+        if "replay_seconds" in new_settings:
+            settings["replay_seconds"] = max(0.0, min(300.0, float(new_settings["replay_seconds"])))
+        if "replay_bytes" in new_settings:
+            settings["replay_bytes"] = max(1024 * 1024, int(new_settings["replay_bytes"]))
+        if profile in self.replay_buffers:
+            self.replay_buffers[profile].configure(settings["replay_seconds"], settings["replay_bytes"])
+
+    def _update_adaptive_settings(self, settings, new_settings):
+        if "adaptive" in new_settings:
+            settings["adaptive"] = bool(new_settings["adaptive"])
+
+        if "target_latency" in new_settings:
+            settings["target_latency"] = max(20, min(5000, int(new_settings["target_latency"])))
+
+        for key in ["min_quality", "min_resolution_percentage"]:
+            if key in new_settings:
+                settings[key] = max(1, min(100, int(new_settings[key])))
+
+        if "min_fps" in new_settings:
+            settings["min_fps"] = max(1, min(120, int(new_settings["min_fps"])))
+
+        if "max_queue_depth" in new_settings:
+            settings["max_queue_depth"] = max(1, min(60, int(new_settings["max_queue_depth"])))
 
-            if "target_fps" in new_settings:
-                new_fps = 60 if new_settings["target_fps"] is None else int(new_settings["target_fps"])
-                if new_fps != self.stream_settings["target_fps"]:
-                    self.stream_settings["target_fps"] = new_fps
-                    if self.camera and self.camera.is_capturing:
-                        self.camera.stop()
-                        self.camera.start(target_fps=self.stream_settings["target_fps"], video_mode=True)
-                        self.settings_updated.set()
+    def _update_output_settings(self, settings, new_settings):
+        if "output" not in new_settings:
+            return
+        output = self._parse_output(new_settings["output"])
+        if output != settings["output"]:
+            settings["output"] = output
+            # Viewports are relative to the output they were selected on
+            settings["viewport"] = None
+
+    def _parse_output(self, output):
+        output = int(output) if str(output).isdigit() else output
+        if output not in self.capture_hubs:
+            msg = f"Unknown output: {output}"
+            raise ValueError(msg)
+        return output
+
+    def _update_viewport_settings(self, settings, new_settings):
+        if "viewport" in new_settings:
+            settings["viewport"] = self._clamp_viewport(new_settings["viewport"], settings["output"])
+
+        if "overview" in new_settings:
+            settings["overview"] = bool(new_settings["overview"])
+
+        if "overview_fps" in new_settings:
+            settings["overview_fps"] = max(0.1, min(10.0, float(new_settings["overview_fps"])))
+
+        for key in ["overview_scale", "overview_quality"]:
+            if key in new_settings:
+                settings[key] = max(1, min(100, int(new_settings[key])))
+
+    def _clamp_viewport(self, viewport, output):
+        if not viewport:
+            return None
+        if not isinstance(viewport, dict) or any(key not in viewport for key in VIEWPORT_KEYS):
+            msg = f"Viewport must have {', '.join(VIEWPORT_KEYS)}"
+            raise ValueError(msg)
+
+        _, _, native_width, native_height = self._output_geometry(output)
+        x = max(0, min(native_width - MIN_VIEWPORT_SIZE, int(viewport["x"])))
+        y = max(0, min(native_height - MIN_VIEWPORT_SIZE, int(viewport["y"])))
+        width = max(MIN_VIEWPORT_SIZE, min(native_width - x, int(viewport["width"])))
+        height = max(MIN_VIEWPORT_SIZE, min(native_height - y, int(viewport["height"])))
+        if (x, y, width, height) == (0, 0, native_width, native_height):
+            return None
+        return {"x": x, "y": y, "width": width, "height": height}
+
+    def _update_window_settings(self, profile, settings, new_settings):
+        if not any(key in new_settings for key in ("window", "viewport", "output")):
+            return
+        # Picking a region or display by hand stops following the window
+        tracker = self.window_trackers.pop(profile, None)
+        if tracker:
+            tracker.stop()
+        settings["window"] = None
+        handle = new_settings.get("window")
+        if handle is None:
+            if "window" in new_settings and "viewport" not in new_settings:
+                settings["viewport"] = None
+            return
+
+        handle = int(handle)
+        rect = self.window_provider.window_rect(handle)
+        if rect is None:
+            msg = f"Window not found: {handle}"
+            raise ValueError(msg)
+        settings["window"] = handle
+        self._apply_window(settings, rect)
+
+        def follow(rect):
+            self._follow_window(profile, tracker, rect)
+
+        tracker = WindowTracker(self.window_provider, handle, follow)
+        self.window_trackers[profile] = tracker
+        tracker.start()
+
+    def _apply_window(self, settings, rect):
+        x, y, width, height = rect
+        output = settings["output"]
+        if output != VIRTUAL_DESKTOP:
+            # Follow the window onto whichever display holds its center
+            center_x, center_y = x + width // 2, y + height // 2
+            for index in range(len(self.outputs)):
+                left, top, output_width, output_height = self._output_geometry(index)
+                if left <= center_x < left + output_width and top <= center_y < top + output_height:
+                    output = index
+                    break
+            else:
+                return False
+
+        left, top, output_width, output_height = self._output_geometry(output)
+        visible_left, visible_top = max(x, left), max(y, top)
+        visible_width = min(x + width, left + output_width) - visible_left
+        visible_height = min(y + height, top + output_height) - visible_top
+        # Minimized or pushed off the display: keep streaming the last known position
+        if visible_width < MIN_VIEWPORT_SIZE or visible_height < MIN_VIEWPORT_SIZE:
+            return False
+
+        settings["output"] = output
+        settings["viewport"] = self._clamp_viewport(
+            {"x": visible_left - left, "y": visible_top - top, "width": visible_width, "height": visible_height},
+            output,
+        )
+        return True
+
+    def _follow_window(self, profile, tracker, rect):
+        with self.settings_lock:
+            if self.window_trackers.get(profile) is not tracker:
+                return
+            settings = self.profiles[profile]
+            previous_output = settings["output"]
+            if rect is None:
+                print(f"Window {settings['window']} closed, streaming the whole display")
+                del self.window_trackers[profile]
+                settings["window"] = None
+                settings["viewport"] = None
+            elif not self._apply_window(settings, rect):
+                return
+
+            profiles = (profile,)
+            if profile == "default":
+                self._refresh_layers()
+                profiles = (profile, *SIMULCAST_LAYERS)
+            output = settings["output"] if settings["output"] != previous_output else None
+
+        if output is not None:
+            self._restart_pipelines(profiles, output)
+        if profile == "default" and self.origin_changed:
+            self.origin_changed(self.get_input_origin())
+
+    def get_windows(self):
+        with self.settings_lock:
+            current = self.stream_settings["window"]
+        return {"windows": self.window_provider.list_windows(), "window": current}
+
+    def get_viewport(self, profile="default"):
+        with self.settings_lock:
+            return self.profiles.get(profile, self.stream_settings)["viewport"]
+
+    def get_input_origin(self, profile="default"):
+        # Client input is relative to the streamed region; this is where it starts on the virtual desktop
+        with self.settings_lock:
+            settings = self.profiles.get(profile, self.stream_settings)
+            x, y, _, _ = self._output_geometry(settings["output"])
+            viewport = settings["viewport"]
+        if viewport:
+            x, y = x + viewport["x"], y + viewport["y"]
+        return x, y
 
     def setup_camera(self):
-        self.camera = dxcam.create(output_idx=0, output_color="BGR")
-        if not self.camera:
-            print("\nError: Failed to initialize camera.")
-            sys.exit()
-
-        test_frame = self.camera.grab()
-        if test_frame is not None:
-            self.native_height, self.native_width = test_frame.shape[:2]
-        else:
-            print("Error: Failed to get a test frame from the camera.")
-            sys.exit()
+        if not self.outputs:
+            self.outputs = create_outputs(DxcamBackend.name)
+
+        self.output_sizes = []
+        for index, backend in enumerate(self.outputs):
+            test_frame = backend.grab()
+            if test_frame is None:
+                msg = f"Failed to get a test frame from output {index} of the capture backend."
+                raise RuntimeError(msg)
+            height, width = test_frame.shape[:2]
+            self.output_sizes.append((width, height))
+
+    def _output_geometry(self, output):
+        if output == VIRTUAL_DESKTOP:
+            hub = self.capture_hubs[VIRTUAL_DESKTOP]
+            return (*hub.origin, hub.width, hub.height)
+        return (*self.outputs[output].origin, *self.output_sizes[output])
+
+    def _output_origin(self, profile):
+        x, y, _, _ = self._output_geometry(self.profiles[profile]["output"])
+        return {"x": x, "y": y}
+
+    def get_outputs(self):
+        outputs = [
+            {
+                "id": index,
+                "name": f"Display {index + 1}",
+                **dict(zip(VIEWPORT_KEYS, self._output_geometry(index), strict=True)),
+                "primary": backend.primary,
+            }
+            for index, backend in enumerate(self.outputs)
+        ]
+        if VIRTUAL_DESKTOP in self.capture_hubs:
+            outputs.append({
+                "id": VIRTUAL_DESKTOP,
+                "name": "All displays",
+                **dict(zip(VIEWPORT_KEYS, self._output_geometry(VIRTUAL_DESKTOP), strict=True)),
+                "primary": False,
+            })
+        return outputs
 
     def __del__(self):
-        if hasattr(self, "camera") and self.camera and self.camera.is_capturing:
+        for backend in getattr(self, "outputs", None) or []:
+            if backend.is_capturing:
+                try:
+                    backend.stop()
+                except Exception as e:
+                    print(f"Camera cleanup error: {e}")
+
+    def get_screenshot(self, image_format="png", quality=90, scale=100, output=None):
+        if image_format not in IMAGE_FORMATS:
+            msg = f"Unknown screenshot format: {image_format}"
+            raise ValueError(msg)
+        quality = max(1, min(100, int(quality)))
+        scale = max(1, min(100, int(scale)))
+        if output is None:
+            with self.settings_lock:
+                output = self.stream_settings["output"]
+        output = self._parse_output(output)
+        key = (image_format, quality, scale, output)
+
+        with self.screenshot_lock:
+            now = time.time()
+            for cached_key, (cached_time, _) in list(self.screenshot_cache.items()):
+                if now - cached_time > SCREENSHOT_CACHE_TTL:
+                    del self.screenshot_cache[cached_key]
+            if key in self.screenshot_cache:
+                return self.screenshot_cache[key][1]
+
             try:
-                self.camera.stop()
-            except Exception as e:
-                print(f"Camera cleanup error: {e}")
+                screenshot = self._current_frame(output)
+                if screenshot is None:
+                    return None
 
-    def get_screenshot(self):
-        try:
-            if self.camera and self.camera.is_capturing:
-                self.camera.stop()
-            screenshot = self.camera.grab()
-            if screenshot is None:
+                height, width = screenshot.shape[:2]
+                screenshot = scale_frame(screenshot, scale, width, height)
+                payload = encode_region(image_format, screenshot, quality)
+                image = bytes(payload), IMAGE_ENCODERS[image_format]["mimetype"]
+            except Exception as e:
+                print(f"Screenshot error: {e}")
                 return None
 
-            _, buffer = imencode(".png", screenshot)
-            return base64.b64encode(buffer).decode()
-        except Exception as e:
-            print(f"Screenshot error: {e}")
+            self.screenshot_cache[key] = (now, image)
+            return image
+
+    def _current_frame(self, output):
+        # Read the frame the running capture already has instead of stopping it to grab one
+        hub = self.capture_hubs[output]
+        frame_id, _, frame = hub.latest()
+        if not hub.running or not frame_id:
+            frame = self._grab(output)
+        return frame
+
+    def calibrate_encoders(self, output=None, frames=3, interval=0.2):
+        if output is None:
+            with self.settings_lock:
+                output = self.stream_settings["output"]
+        output = self._parse_output(output)
+
+        # Frames a moment apart, so encoders are measured on this host's real content
+        samples = []
+        for index in range(frames):
+            if index:
+                time.sleep(interval)
+            try:
+                frame = self._current_frame(output)
+            except Exception as e:
+                print(f"Error capturing calibration frame: {e}")
+                continue
+            if frame is not None:
+                samples.append(frame.copy())
+        if not samples:
             return None
 
-    def update_fps(self):
-        current_time = time.time()
-        self.frame_times.append(current_time)
+        profile = calibrate(samples)
+        self.encoder_profile = profile
+        if self.encoder_profile_path:
+            try:
+                save_profile(self.encoder_profile_path, profile)
+            except OSError as e:
+                print(f"Error saving encoder profile: {e}")
+        return profile
 
-        while self.frame_times and self.frame_times[0] < current_time - 1:
-            self.frame_times.pop(0)
+    def get_encoders(self):
+        with self.stream_lock:
+            selected = {
+                f"{broadcast.profile}/{'binary' if broadcast.binary else 'sse'}": broadcast.image_encoder
+                for broadcast in self.broadcasts.values()
+            }
+        return {"available": available_encoders(), "profile": self.encoder_profile, "selected": selected}
 
-        self.current_fps = len(self.frame_times)
+    def _grab(self, output):
+        if output != VIRTUAL_DESKTOP:
+            return self.outputs[output].grab()
 
-    def stream_generator(self, sid):
-        if not self.camera:
-            self.setup_camera()
+        hub = self.capture_hubs[VIRTUAL_DESKTOP]
+        canvas = np.zeros((hub.height, hub.width, 3), dtype=np.uint8)
+        for (x, y), backend in zip(hub.offsets, self.outputs, strict=True):
+            frame = backend.grab()
+            if frame is None:
+                return None
+            height, width = frame.shape[:2]
+            canvas[y:y + height, x:x + width] = frame
+        return canvas
 
-        try:
-            self.camera.start(target_fps=self.stream_settings["target_fps"], video_mode=True)
-            self.start_cursor_updates()
-        except Exception as e:
-            print(f"Failed to start camera: {e}")
-            self.setup_camera()
-            if not self.camera.start(target_fps=self.stream_settings["target_fps"], video_mode=True):
+    def subscribe(self, sid, profile="default", *, binary=False, drop_policy=None, layer=None):
+        # "auto" starts on the full layer and steps down only when this viewer falls behind
+        if layer is not None:
+            profile = self._layer_profile("full" if layer == "auto" else layer)
+        if profile not in self.profiles:
+            msg = f"Invalid stream profile: {profile}"
+            raise ValueError(msg)
+
+        with self.settings_lock:
+            settings = self.profiles[profile]
+            max_queue = settings["send_queue"]
+            drop_policy = drop_policy if drop_policy in DROP_POLICIES else settings["drop_policy"]
+            capture_hub = self.capture_hubs[settings["output"]]
+            selector = None
+            if layer == "auto":
+                selector = LayerSelector(LAYERS, "full")
+                selector.configure(settings)
+
+        with self.stream_lock:
+            self._unsubscribe(sid)
+            broadcast = self._broadcast(profile, capture_hub, binary=binary)
+            subscriber = self._attach(sid, broadcast, max_queue, drop_policy)
+            self.subscriptions[sid] = (broadcast, subscriber)
+            if selector:
+                self.layer_selectors[sid] = selector
+
+        return subscriber
+
+    def _attach(self, sid, broadcast, max_queue, drop_policy):
+        subscriber = Subscriber(sid, max_queue, drop_policy, on_resync=broadcast.request_keyframe)
+        broadcast.fanout.add(subscriber)
+        broadcast.request_keyframe()
+        if not broadcast.running:
+            broadcast.start()
+        return subscriber
+
+    def _broadcast(self, profile, capture_hub, *, binary):
+        key = (profile, binary)
+        broadcast = self.broadcasts.get(key)
+        if broadcast is None:
+            broadcast = StreamBroadcast(profile, binary, capture_hub, self._create_pipeline)
+            if binary:
+                broadcast.replay = self._replay_buffer(profile)
+            self.broadcasts[key] = broadcast
+            self._update_capture_rates()
+            capture_hub.acquire()
+        return broadcast
+
+    def _update_capture_rates(self):
+        # Each output captures only as fast as the fastest broadcast drawing on it needs
+        with self.settings_lock:
+            target_fps = self.stream_settings["target_fps"] or 60
+            rates = {}
+            for broadcast in self.broadcasts.values():
+                max_fps = self.profiles[broadcast.profile]["max_fps"]
+                fps = min(max_fps or target_fps, target_fps)
+                for hub in getattr(broadcast.capture_hub, "hubs", [broadcast.capture_hub]):
+                    rates[hub] = max(rates.get(hub, 0), fps)
+        for index in range(len(self.outputs)):
+            hub = self.capture_hubs[index]
+            fps = rates.get(hub, target_fps)
+            if fps != hub.target_fps:
+                hub.set_target_fps(fps)
+
+    def set_layer(self, sid, layer):
+        if layer != "auto":
+            self.layer_selectors.pop(sid, None)
+            self.switch_layer(sid, layer)
+            return
+
+        broadcast, _ = self.subscriptions.get(sid, (None, None))
+        if broadcast is None or sid in self.layer_selectors:
+            return
+        with self.settings_lock:
+            selector = LayerSelector(LAYERS, layer_of(broadcast.profile) or "full")
+            selector.configure(self.stream_settings)
+        self.layer_selectors[sid] = selector
+
+    def switch_layer(self, sid, layer):
+        profile = self._layer_profile(layer)
+        with self.settings_lock:
+            capture_hub = self.capture_hubs[self.profiles[profile]["output"]]
+
+        with self.stream_lock:
+            broadcast, subscriber = self.subscriptions.get(sid, (None, None))
+            if subscriber is None or broadcast.profile == profile:
                 return
+            # The subscriber moves as is, so the loop sending to it never notices the switch
+            target = self._broadcast(profile, capture_hub, binary=broadcast.binary)
+            self._detach(broadcast, sid, close=False)
+            subscriber.resync(target.request_keyframe)
+            target.fanout.add(subscriber)
+            target.request_keyframe()
+            if not target.running:
+                target.start()
+            self.subscriptions[sid] = (target, subscriber)
 
-        while self.stream_active and self.current_stream_sid == sid:
-            try:
-                if self.settings_updated.is_set():
-                    self.settings_updated.clear()
-                    continue
+    def _detach(self, broadcast, sid, *, close=True):
+        broadcast.fanout.remove(sid, close=close)
+        broadcast.controller.forget(sid)
+        if not len(broadcast.fanout):
+            broadcast.stop()
+            del self.broadcasts[broadcast.profile, broadcast.binary]
+            broadcast.capture_hub.release()
+            self._update_capture_rates()
 
-                screenshot = self.camera.get_latest_frame()
-                if screenshot is None:
-                    continue
+    def is_connected(self, sid):
+        return self.socketio.server.manager.is_connected(sid, "/")
 
-                with self.settings_lock:
-                    resolution_percentage = self.stream_settings["resolution_percentage"]
-                    quality = self.stream_settings["quality"]
+    def unsubscribe(self, sid, subscriber=None):
+        with self.stream_lock:
+            self._unsubscribe(sid, subscriber)
 
-                if resolution_percentage < 100:
-                    new_width = int(self.native_width * (resolution_percentage / 100))
-                    new_height = int(self.native_height * (resolution_percentage / 100))
-                    screenshot = resize(screenshot, (new_width, new_height))
+    def stop_all(self):
+        with self.stream_lock:
+            for sid in list(self.subscriptions):
+                self._unsubscribe(sid)
 
-                _, buffer = imencode(".jpg", screenshot, [int(IMWRITE_JPEG_QUALITY), quality])
-                img_str = base64.b64encode(buffer).decode()
+    def _unsubscribe(self, sid, subscriber=None):
+        broadcast, current = self.subscriptions.get(sid, (None, None))
+        if broadcast is None or (subscriber is not None and current is not subscriber):
+            return
 
-                self.update_fps()
+        del self.subscriptions[sid]
+        self.layer_selectors.pop(sid, None)
+        self._detach(broadcast, sid)
 
-                yield f"data: {json.dumps({
-                    'image': img_str,
-                    'fps': self.current_fps,
-                    'active_window': self.get_active_window_title()
-                })}\n\n"
+    def _replay_buffer(self, profile):
+        # Outlives the broadcast, so the last seconds stay available after viewers leave
+        with self.settings_lock:
+            if profile not in self.replay_buffers:
+                settings = self.profiles[profile]
+                self.replay_buffers[profile] = ReplayBuffer(settings["replay_seconds"], settings["replay_bytes"])
+            return self.replay_buffers[profile]
 
-            except Exception as e:
-                print(f"Stream error: {e}")
+    def _profile_replay(self, profile):
+        if profile not in self.profiles:
+            msg = f"Invalid stream profile: {profile}"
+            raise ValueError(msg)
+        return self._replay_buffer(profile)
+
+    def get_replay(self, profile="default"):
+        return self._profile_replay(profile).stats()
+
+    def replay_frame(self, profile="default", ago=0.0):
+        # The frame shown `ago` seconds back, preceded by the frames needed to decode it
+        packets = self._profile_replay(profile).frame_at(media_time() - max(0.0, ago))
+        return b"".join(packet for _, packet in packets)
+
+    def replay_range(self, profile="default", ago=5.0, duration=None, speed=1.0):
+        start = media_time() - max(0.0, ago)
+        end = start + duration if duration is not None else media_time()
+        return pace_packets(self._profile_replay(profile).frames_between(start, end), start, speed)
+
+    def start_recording(self, profile="default", segment_seconds=60):
+        if profile not in self.profiles:
+            msg = f"Invalid stream profile: {profile}"
+            raise ValueError(msg)
+
+        with self.settings_lock:
+            settings = self.profiles[profile]
+            capture_hub = self.capture_hubs[settings["output"]]
+            info = {"encoding": settings["encoding"], "output": settings["output"]}
+
+        with self.stream_lock:
+            if profile in self.recorders:
+                return self.recorders[profile][1].stats()
+            # Records the binary broadcast's packets as they are, sharing its encode with live viewers
+            sid = f"recorder-{profile}"
+            broadcast = self._broadcast(profile, capture_hub, binary=True)
+            subscriber = self._attach(sid, broadcast, RECORDING_QUEUE, "drop_oldest")
+            recorder = SessionRecorder(self.recording_dir, profile, subscriber, max(1, segment_seconds), info)
+            recorder.start()
+            self.recorders[profile] = (broadcast, recorder)
+            return recorder.stats()
+
+    def stop_recording(self, profile="default"):
+        with self.stream_lock:
+            broadcast, recorder = self.recorders.pop(profile, (None, None))
+            if recorder is None:
+                return None
+            self._detach(broadcast, recorder.subscriber.sid)
+        recorder.stop()
+        return recorder.stats()
+
+    def get_recordings(self):
+        with self.stream_lock:
+            active = [recorder.stats() for _, recorder in self.recorders.values()]
+        return {"active": active, "sessions": list_sessions(self.recording_dir)}
+
+    def playback(self, name, start=0.0, speed=1.0):
+        return iter_playback(session_path(self.recording_dir, name), start, speed)
+
+    def request_keyframe(self, sid):
+        broadcast, _ = self.subscriptions.get(sid, (None, None))
+        if broadcast:
+            broadcast.request_keyframe()
+
+    def acknowledge(self, sid, seq):
+        broadcast, subscriber = self.subscriptions.get(sid, (None, None))
+        if subscriber is None:
+            return
+        sample = subscriber.acknowledge(seq)
+        if not sample:
+            return
+        broadcast.controller.record(sid, *sample)
+        broadcast.controller.update()
+
+        selector = self.layer_selectors.get(sid)
+        if selector:
+            latency, _, queue_depth = sample
+            layer = selector.record(latency, queue_depth)
+            if layer:
+                self.switch_layer(sid, layer)
+
+    def _wait_for_ack_window(self, broadcast, subscriber):
+        with self.settings_lock:
+            window = self.profiles[broadcast.profile]["max_queue_depth"]
+        # Hold frames back on the server, where drop policies apply, instead of in socket buffers
+        while subscriber.active and broadcast.controller.enabled and subscriber.in_flight() >= window:
+            time.sleep(0.005)
+
+    def _prepare_job(self, broadcast, workers):
+        # Every job queued or being encoded may still reference its scaled frame
+        scaler = FrameScaler(buffers=workers + 3)
+
+        def prepare(seq, timestamp, frame):
+            with self.settings_lock:
+                settings = self.profiles[broadcast.profile]
+                broadcast.controller.configure(settings)
+                broadcast.max_fps = settings["max_fps"]
+                viewport = settings["viewport"]
+                resolution_percentage = settings["resolution_percentage"]
+                interpolation = settings["scale_interpolation"]
+                options = settings["quality"]
+                if broadcast.controller.enabled:
+                    options, resolution_percentage, _ = broadcast.controller.current()
+                encoding = settings["encoding"] if broadcast.binary else "jpeg"
+                # Server-sent events are displayed as data: URLs, which are always JPEG
+                image_encoder = settings["image_encoder"] if broadcast.binary else "jpeg"
+                target_bitrate = settings["target_bitrate"]
+                target_fps = self.stream_settings["target_fps"] or 60
+                frame_rate = min(settings["max_fps"] or target_fps, target_fps)
+                if encoding == "tiles":
+                    broadcast.tile_encoder.configure(settings["tile_size"], settings["keyframe_interval"])
+                elif encoding in VIDEO_CODECS:
+                    fps = self.stream_settings["target_fps"]
+                    options = (encoding, settings["video_bitrate"], settings["gop_size"], fps)
+
+            if viewport:
+                x, y, width, height = (viewport[key] for key in VIEWPORT_KEYS)
+                frame = frame[y:y + height, x:x + width]
+
+            frame = scaler.scale(frame, resolution_percentage, interpolation)
+            if encoding in VIDEO_CODECS:
+                frame = even_frame(frame)
+                height, width = frame.shape[:2]
+                return seq, timestamp, width, height, False, [(0, 0, width, height, frame)], options
+
+            height, width = frame.shape[:2]
+            if image_encoder == "auto":
+                image_encoder = self._auto_encoder(options, width * height, frame_rate, target_bitrate, workers)
+            broadcast.image_encoder = image_encoder
+            options = (image_encoder, options)
+            if encoding == "jpeg":
+                return seq, timestamp, width, height, True, [(0, 0, width, height, frame)], options
+
+            keyframe, rects = broadcast.tile_encoder.dirty_tiles(frame)
+            if not rects:
+                return None
+            regions = [(x, y, w, h, frame[y:y + h, x:x + w]) for x, y, w, h in rects]
+            return seq, timestamp, width, height, keyframe, regions, options
+
+        return prepare
+
+    def _auto_encoder(self, quality, pixels, fps, target_bitrate, workers):
+        if self.encoder_profile is None:
+            return "jpeg"
+        return select_encoder(self.encoder_profile, quality, (pixels, fps), target_bitrate, workers)
+
+    def _create_pipeline(self, broadcast):
+        with self.settings_lock:
+            settings = self.profiles[broadcast.profile]
+            workers = settings["encode_workers"]
+            executor = settings["encode_executor"]
+            video = broadcast.binary and settings["encoding"] in VIDEO_CODECS
+
+        if video:
+            # The codec keeps reference frames, so frames must go through one encoder in order
+            stages = {
+                "capture": broadcast.capture,
+                "scale": self._prepare_job(broadcast, 1),
+                "encode": broadcast.encode_video,
+            }
+            return StreamPipeline(
+                stages, active=broadcast.is_active, workers=1, executor="thread", stats=broadcast.metrics.stages,
+            )
+
+        return StreamPipeline(
+            {"capture": broadcast.capture, "scale": self._prepare_job(broadcast, workers)},
+            active=broadcast.is_active,
+            workers=workers,
+            executor=executor,
+            stats=broadcast.metrics.stages,
+        )
+
+    def _overview_packet(self, broadcast):
+        with self.settings_lock:
+            settings = self.profiles[broadcast.profile]
+            if not settings["viewport"] or not settings["overview"]:
+                return 0.0, None
+            interval = 1.0 / settings["overview_fps"]
+            scale = settings["overview_scale"]
+            quality = settings["overview_quality"]
+
+        # Encoded once per interval and shared by every subscriber of the broadcast
+        with broadcast.overview_lock:
+            overview_time, packet = broadcast.overview
+            _, timestamp, frame = broadcast.capture_hub.latest()
+            if frame is None or timestamp - overview_time < interval:
+                return broadcast.overview
+
+            frame = scale_frame(frame, scale, frame.shape[1], frame.shape[0])
+            height, width = frame.shape[:2]
+            info = FrameInfo(0, timestamp, width, height)
+            packet = pack_frame(FRAME_JPEG, info, encode_jpeg(frame, quality), FLAG_KEYFRAME)
+            broadcast.overview = (timestamp, packet)
+            return broadcast.overview
+
+    def stream_generator(self, subscriber):
+        broadcast, _ = self.subscriptions.get(subscriber.sid, (None, None))
+        try:
+            while subscriber.active:
+                # Switching layers moves the subscriber to another broadcast
+                broadcast, _ = self.subscriptions.get(subscriber.sid, (broadcast, None))
+                self._wait_for_ack_window(broadcast, subscriber)
+                frame = subscriber.get()
+                if frame is None:
+                    continue
+
+                broadcast.metrics.queue_depth.record(len(subscriber.queue))
+                subscriber.record_sent(len(frame.payload), frame.seq, frame.timestamp)
+                start = time.perf_counter()
+                yield frame.payload
+                broadcast.metrics.stages["send"].record(time.perf_counter() - start)
+        finally:
+            self.unsubscribe(subscriber.sid, subscriber)
+
+    def binary_stream_loop(self, subscriber):
+        sid = subscriber.sid
+        broadcast, _ = self.subscriptions.get(sid, (None, None))
+        last_info = None
+        last_info_time = 0
+        last_overview_time = 0.0
+        while subscriber.active:
+            if not self.is_connected(sid):
+                self.unsubscribe(sid, subscriber)
                 break
+            broadcast, _ = self.subscriptions.get(sid, (broadcast, None))
+
+            self._wait_for_ack_window(broadcast, subscriber)
+            frame = subscriber.get()
+            if frame is None:
+                continue
 
-        if self.camera and self.camera.is_capturing:
-            self.camera.stop()
-        self.cursor_update_thread = None
+            broadcast.metrics.queue_depth.record(len(subscriber.queue))
+            start = time.perf_counter()
+            self.socketio.emit("stream_frame", frame.payload, room=sid)
+            broadcast.metrics.stages["send"].record(time.perf_counter() - start)
+            subscriber.record_sent(len(frame.payload), frame.seq, frame.timestamp)
 
-    def get_current_settings(self):
+            overview_time, overview = self._overview_packet(broadcast)
+            if overview and overview_time != last_overview_time:
+                last_overview_time = overview_time
+                self.socketio.emit("stream_overview", overview, room=sid)
+                subscriber.record_sent(len(overview))
+
+            if frame.timestamp - last_info_time >= STREAM_INFO_INTERVAL:
+                last_info_time = frame.timestamp
+                info = {
+                    "fps": broadcast.current_fps,
+                    "adaptive": broadcast.controller.snapshot(),
+                    "viewport": self.get_viewport(broadcast.profile),
+                    "origin": self._output_origin(broadcast.profile),
+                    "layer": layer_of(broadcast.profile),
+                    "auto_layer": sid in self.layer_selectors,
+                    "pipeline": {name: stats.snapshot() for name, stats in broadcast.metrics.stages.items()},
+                    "delivery": subscriber.stats(),
+                }
+                if info != last_info:
+                    last_info = info
+                    self.socketio.emit("stream_info", info, room=sid)
+
+    def get_stream_stats(self):
+        with self.stream_lock:
+            return [broadcast.stats() for broadcast in self.broadcasts.values()]
+
+    def get_metrics(self):
+        with self.stream_lock:
+            broadcasts = [broadcast.metrics_snapshot() for broadcast in self.broadcasts.values()]
+        return {"broadcasts": broadcasts, "metadata": self.metadata.stats()}
+
+    def get_current_settings(self, profile="default"):
+        settings = self.profiles.get(profile, self.stream_settings)
+        x, y, native_width, native_height = self._output_geometry(settings["output"])
         return {
-            **self.stream_settings,
-            "native_width": self.native_width,
-            "native_height": self.native_height,
-            "current_resolution_percentage": self.stream_settings["resolution_percentage"],
+            **settings,
+            "native_width": native_width,
+            "native_height": native_height,
+            "origin": {"x": x, "y": y},
+            "outputs": self.get_outputs(),
+            "current_resolution_percentage": settings["resolution_percentage"],
             "current_fps": self.stream_settings["target_fps"] or "Unlimited",
+            "encodings": [*STREAM_ENCODINGS, *available_codecs()],
+            "image_encoders": available_encoders(),
+            "profiles": list(self.profiles),
+            "viewers": len(self.subscriptions),
         }
 
     def get_active_window_title(self):
+        if win32gui is None:
+            return ""
         try:
             return win32gui.GetWindowText(win32gui.GetForegroundWindow())
         except Exception:
             return ""
 
-    def start_cursor_updates(self):
-        if self.cursor_update_thread is None or not self.cursor_update_thread.is_alive():
-            self.cursor_update_thread = Thread(
-                target=self._cursor_update_loop,
-                args=(current_app._get_current_object(),),
-                daemon=True,
-            )
-            self.cursor_update_thread.start()
-
-    def _cursor_update_loop(self, app):
-        with app.app_context():
-            while self.stream_active:
-                if self.current_stream_sid:
-                    try:
-                        x, y = app.input_manager.mouse.position
-                        self.socketio.emit("mouse_position", {"x": x, "y": y})
-                    except Exception as e:
-                        print(f"Error getting or emitting mouse position: {e}")
+    def start_metadata_updates(self):
+        self.metadata_app = current_app._get_current_object()
+        self.metadata.start()
 
-                target_fps = self.stream_settings["target_fps"] or 60
-                sleep_time = 1.0 / target_fps if target_fps > 0 else 0.02
-                time.sleep(sleep_time)
+    def _sample_metadata(self):
+        metadata = {"active_window": self.get_active_window_title()}
+        cursor = sample_cursor()
+        if cursor:
+            x, y, metadata["cursor_shape"] = cursor
+            metadata["cursor"] = {"x": x, "y": y}
+        elif self.metadata_app:
+            x, y = self.metadata_app.input_manager.mouse.position
+            metadata["cursor"] = {"x": x, "y": y}
+        metadata["metrics"] = self._metrics_summary() if self.stream_settings["metrics_overlay"] else None
+        return metadata
+
+    def _metrics_summary(self):
+        # Percentiles shift on every frame, so the overlay is refreshed once a second
+        # instead of riding along with each cursor update
+        updated, summary = self.metrics_summary
+        now = time.time()
+        if summary is None or now - updated >= 1.0:
+            with self.stream_lock:
+                summary = {
+                    f"{broadcast.profile}/{'binary' if broadcast.binary else 'sse'}": {
+                        "fps": broadcast.current_fps,
+                        **broadcast.metrics.summary(),
+                    }
+                    for broadcast in self.broadcasts.values()
+                }
+            self.metrics_summary = (now, summary)
+        return summary
+
+    def _emit_metadata(self, message, sid):
+        self.socketio.emit("stream_metadata", message, room=sid)
@@ -0,0 +1,141 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+
+# Bucket upper bounds grow by 25%, so percentiles are accurate to within one bucket while
+# memory stays fixed no matter how many samples are recorded.
+LATENCY_BOUNDS = tuple(0.00005 * 1.25**i for i in range(56))  # 50 us to ~10 s
+SIZE_BOUNDS = tuple(256 * 1.25**i for i in range(50))  # 256 B to ~15 MiB
+DEPTH_BOUNDS = tuple(range(65))
+STAGES = ("capture_wait", "resize", "encode", "serialize", "send")
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.lock = Lock()
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def _percentile(self, fraction):
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.bounds):
+                    return self.max
+                # Interpolate within the bucket instead of always reporting its upper bound
+                low = self.bounds[index - 1] if index else 0.0
+                return min(low + (self.bounds[index] - low) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def snapshot(self, scale=1.0, digits=2):
+        with self.lock:
+            if not self.count:
+                return {"count": 0, "avg": 0, "p50": 0, "p95": 0, "p99": 0, "max": 0}
+            return {
+                "count": self.count,
+                "avg": round(self.total / self.count * scale, digits),
+                "p50": round(self._percentile(0.5) * scale, digits),
+                "p95": round(self._percentile(0.95) * scale, digits),
+                "p99": round(self._percentile(0.99) * scale, digits),
+                "max": round(self.max * scale, digits),
+            }
+
+
+class RateMeter:
+    def __init__(self, window=1.0):
+        self.window = window
+        self.lock = Lock()
+        self._rate = 0.0
+        self._window_start = time.perf_counter()
+        self._window_count = 0
+
+    def tick(self):
+        with self.lock:
+            self._window_count += 1
+            now = time.perf_counter()
+            if now - self._window_start >= self.window:
+                self._rate = self._window_count / (now - self._window_start)
+                self._window_start = now
+                self._window_count = 0
+
+    @property
+    def rate(self):
+        # Windows only close on a tick, so one left open past its length means the ticks slowed or stopped
+        with self.lock:
+            elapsed = time.perf_counter() - self._window_start
+            if elapsed < self.window:
+                return self._rate
+            if elapsed < 2 * self.window:
+                return self._window_count / elapsed
+            return 0.0
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.lock = Lock()
+        self.processed = 0
+        self.dropped = 0
+        self.latency = Histogram(LATENCY_BOUNDS)
+        self.meter = RateMeter()
+
+    def record(self, elapsed):
+        self.latency.record(elapsed)
+        self.meter.tick()
+        with self.lock:
+            self.processed += 1
+
+    def drop(self, count=1):
+        with self.lock:
+            self.dropped += count
+
+    def snapshot(self):
+        latency = self.latency.snapshot(scale=1000)
+        with self.lock:
+            return {
+                "fps": round(self.meter.rate, 1),
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "avg_ms": latency["avg"],
+                "p50_ms": latency["p50"],
+                "p95_ms": latency["p95"],
+                "p99_ms": latency["p99"],
+                "max_ms": latency["max"],
+            }
+
+
+class StreamMetrics:
+    def __init__(self):
+        self.stages = {name: StageStats(name) for name in STAGES}
+        self.frame_size = Histogram(SIZE_BOUNDS)
+        self.queue_depth = Histogram(DEPTH_BOUNDS)
+
+    def snapshot(self):
+        stages = {name: stats.snapshot() for name, stats in self.stages.items()}
+        return {
+            "stages": stages,
+            "frame_size_kib": self.frame_size.snapshot(scale=1 / 1024, digits=1),
+            "send_queue_depth": self.queue_depth.snapshot(digits=1),
+            "dropped": sum(stage["dropped"] for stage in stages.values()),
+        }
+
+    def summary(self):
+        stages = {name: stats.latency.snapshot(scale=1000, digits=1) for name, stats in self.stages.items()}
+        return {
+            "stages_ms": {name: [latency["p50"], latency["p95"]] for name, latency in stages.items()},
+            "frame_kib": self.frame_size.snapshot(scale=1 / 1024, digits=1)["avg"],
+            "dropped": sum(stats.dropped for stats in self.stages.values()),
+        }
@@ -0,0 +1,241 @@
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import suppress
+from threading import Thread
+from typing import NamedTuple
+
+import numpy as np
+from cv2 import INTER_AREA, INTER_CUBIC, INTER_LINEAR, INTER_NEAREST, resize
+
+from .image_encoders import IMAGE_ENCODERS, encode_region
+from .stream_metrics import StageStats
+from .stream_protocol import FRAME_JPEG, FRAME_TILES
+
+EXECUTORS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+INTERPOLATIONS = {
+    "nearest": INTER_NEAREST,
+    "linear": INTER_LINEAR,
+    "area": INTER_AREA,
+    "cubic": INTER_CUBIC,
+}
+# Frames held between stages; kept short so a slow stage drops frames instead of adding latency
+QUEUE_SIZE = 2
+
+
+class EncodedFrame(NamedTuple):
+    seq: int
+    timestamp: float
+    width: int
+    height: int
+    keyframe: bool
+    tiles: list
+    frame_type: int = FRAME_JPEG
+    flags: int = 0
+    # Transport-ready bytes, serialized once per frame and shared by every subscriber
+    payload: bytes = None
+
+
+def put_latest(target, item):
+    dropped = []
+    while True:
+        try:
+            target.put_nowait(item)
+        except queue.Full:
+            with suppress(queue.Empty):
+                dropped.append(target.get_nowait())
+        else:
+            return dropped
+
+
+def scale_frame(frame, resolution_percentage, native_width, native_height):
+    if resolution_percentage < 100:
+        new_width = int(native_width * (resolution_percentage / 100))
+        new_height = int(native_height * (resolution_percentage / 100))
+        return resize(frame, (new_width, new_height))
+    return frame
+
+
+class FrameScaler:
+    def __init__(self, buffers=3):
+        self.buffers = buffers
+        self.key = None
+        self.size = None
+        self.interpolation = INTER_LINEAR
+        self.pool = []
+        self.index = 0
+
+    def scale(self, frame, resolution_percentage, interpolation="linear"):
+        key = (frame.shape, frame.dtype, resolution_percentage, interpolation)
+        if key != self.key:
+            self._configure(key)
+        if self.size is None:
+            return frame
+
+        # Frames are encoded asynchronously, so destinations rotate through a pool larger
+        # than the number of frames that can be in flight at once.
+        target = self.pool[self.index]
+        self.index = (self.index + 1) % len(self.pool)
+        return resize(frame, self.size, dst=target, interpolation=self.interpolation)
+
+    def _configure(self, key):
+        shape, dtype, resolution_percentage, interpolation = key
+        self.key = key
+        self.interpolation = INTERPOLATIONS[interpolation]
+        self.index = 0
+        if resolution_percentage >= 100:
+            self.size = None
+            self.pool = []
+            return
+
+        height, width = shape[:2]
+        scale = resolution_percentage / 100
+        self.size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        self.pool = [np.empty((self.size[1], self.size[0], *shape[2:]), dtype) for _ in range(self.buffers)]
+
+
+def encode_job(job):
+    start = time.perf_counter()
+    seq, timestamp, width, height, keyframe, regions, (encoder, quality) = job
+    tiles = [(x, y, w, h, encode_region(encoder, region, quality)) for x, y, w, h, region in regions]
+    frame_type = FRAME_JPEG if keyframe else FRAME_TILES
+    flags = IMAGE_ENCODERS[encoder]["format"] << 4
+    return EncodedFrame(seq, timestamp, width, height, keyframe, tiles, frame_type, flags), time.perf_counter() - start
+
+
+class StreamPipeline:
+    def __init__(self, stages, active, workers=2, executor="thread", stats=None):
+        # capture() -> (timestamp, frame), scale(seq, timestamp, frame) -> job, and optionally encode(job)
+        self.capture = stages["capture"]
+        self.scale = stages["scale"]
+        self.encode = stages.get("encode", encode_job)
+        self.active = active
+        self.workers = workers
+        self.executor_type = executor
+        self.running = False
+        self.executor = None
+        self.threads = []
+
+        self.captured = queue.Queue(maxsize=QUEUE_SIZE)
+        self.encoding = queue.Queue(maxsize=workers)
+        self.output = queue.Queue(maxsize=QUEUE_SIZE)
+        self.stats = stats or {name: StageStats(name) for name in ("capture_wait", "resize", "encode")}
+
+    def start(self):
+        self.running = True
+        self.executor = EXECUTORS[self.executor_type](max_workers=self.workers)
+        self.threads = [
+            Thread(target=self._capture_loop, daemon=True),
+            Thread(target=self._scale_loop, daemon=True),
+            Thread(target=self._collect_loop, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=1)
+        self.threads = []
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _is_running(self):
+        return self.running and self.active()
+
+    def _capture_loop(self):
+        while self._is_running():
+            start = time.perf_counter()
+            try:
+                captured = self.capture()
+            except Exception as e:
+                print(f"Capture error: {e}")
+                self.running = False
+                break
+
+            if captured is None:
+                continue
+
+            self.stats["capture_wait"].record(time.perf_counter() - start)
+            dropped = put_latest(self.captured, captured)
+            self.stats["capture_wait"].drop(len(dropped))
+
+    def _scale_loop(self):
+        seq = 0
+        while self._is_running():
+            try:
+                timestamp, frame = self.captured.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            try:
+                job = self.scale(seq + 1, timestamp, frame)
+            except Exception as e:
+                print(f"Scale error: {e}")
+                self.running = False
+                break
+            self.stats["resize"].record(time.perf_counter() - start)
+
+            if job is None:
+                continue
+            seq += 1
+
+            future = self.executor.submit(self.encode, job)
+            while self._is_running():
+                try:
+                    self.encoding.put(future, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def _collect_loop(self):
+        while self._is_running():
+            try:
+                future = self.encoding.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            try:
+                frame, elapsed = future.result()
+            except Exception as e:
+                print(f"Encode error: {e}")
+                continue
+            self.stats["encode"].record(elapsed)
+
+            if frame is None:
+                continue
+
+            if frame.keyframe:
+                # A keyframe supersedes everything queued before it, so older frames can go
+                self.stats["encode"].drop(len(put_latest(self.output, frame)))
+                continue
+
+            # Deltas build on each other and are never dropped; waiting here pushes the
+            # backpressure up to the capture queue, where dropping frames is safe.
+            while self._is_running():
+                try:
+                    self.output.put(frame, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+    def frames(self):
+        while self._is_running():
+            try:
+                frame = self.output.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            yield frame
+
+    def queue_depths(self):
+        return {
+            "captured": self.captured.qsize(),
+            "encoding": self.encoding.qsize(),
+            "output": self.output.qsize(),
+        }
@@ -0,0 +1,83 @@
+import base64
+import json
+import struct
+from typing import NamedTuple
+
+# frame_type, flags, sequence, timestamp, width, height
+FRAME_HEADER = struct.Struct("<BBIdHH")
+TILE_COUNT = struct.Struct("<H")
+# x, y, width, height, payload length
+TILE_HEADER = struct.Struct("<HHHHI")
+
+FRAME_JPEG = 1
+FRAME_TILES = 2
+FRAME_VIDEO = 3
+
+FLAG_KEYFRAME = 0x01
+
+
+class FrameInfo(NamedTuple):
+    # The per-frame header fields; EncodedFrame starts with the same four, so it can be passed as is
+    seq: int
+    timestamp: float
+    width: int
+    height: int
+
+
+def pack_frame(frame_type, info, payload, flags=0):
+    header = FRAME_HEADER.pack(frame_type, flags, info.seq & 0xFFFFFFFF, info.timestamp, info.width, info.height)
+    return b"".join((header, payload))
+
+
+def pack_tiles(info, tiles, keyframe, flags=0):
+    flags |= FLAG_KEYFRAME if keyframe else 0
+    parts = [
+        FRAME_HEADER.pack(FRAME_TILES, flags, info.seq & 0xFFFFFFFF, info.timestamp, info.width, info.height),
+        TILE_COUNT.pack(len(tiles)),
+    ]
+    for x, y, tile_width, tile_height, payload in tiles:
+        parts.append(TILE_HEADER.pack(x, y, tile_width, tile_height, len(payload)))
+        parts.append(payload)
+    return b"".join(parts)
+
+
+def pack_encoded_frame(frame):
+    if frame.frame_type == FRAME_VIDEO:
+        flags = frame.flags | (FLAG_KEYFRAME if frame.keyframe else 0)
+        return pack_frame(FRAME_VIDEO, frame, frame.tiles[0][4], flags)
+    # Still images carry their image format in the upper nibble of the flags
+    if frame.keyframe:
+        return pack_frame(FRAME_JPEG, frame, frame.tiles[0][4], frame.flags | FLAG_KEYFRAME)
+    return pack_tiles(frame, frame.tiles, frame.keyframe, frame.flags)
+
+
+def unpack_tiles(packet):
+    offset = FRAME_HEADER.size
+    (count,) = TILE_COUNT.unpack_from(packet, offset)
+    offset += TILE_COUNT.size
+    tiles = []
+    for _ in range(count):
+        x, y, width, height, length = TILE_HEADER.unpack_from(packet, offset)
+        offset += TILE_HEADER.size
+        tiles.append((x, y, width, height, packet[offset:offset + length]))
+        offset += length
+    return tiles
+
+
+def unpack_header(packet):
+    frame_type, flags, seq, timestamp, width, height = FRAME_HEADER.unpack_from(packet)
+    return {
+        "frame_type": frame_type,
+        "flags": flags,
+        "seq": seq,
+        "timestamp": timestamp,
+        "width": width,
+        "height": height,
+    }
+
+
+def format_sse_frame(payload, fps, extra=None):
+    # Base64 never needs JSON escaping, so the image is spliced in as bytes instead of
+    # going through str decoding, json.dumps and re-encoding.
+    fields = json.dumps({"fps": fps, **(extra or {})})
+    return b"".join((b'data: {"image": "', base64.b64encode(payload), b'", ', fields[1:].encode(), b"\n\n"))
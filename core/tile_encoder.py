@@ -0,0 +1,75 @@
+import numpy as np
+
+
+class TileEncoder:
+    def __init__(self, tile_size=64, keyframe_interval=300, full_frame_ratio=0.5):
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.full_frame_ratio = full_frame_ratio
+        self.previous = None
+        self.diff = None
+        self.row_mask = None
+        self.frames_since_keyframe = 0
+        self.keyframe_requested = True
+
+    def request_keyframe(self):
+        self.keyframe_requested = True
+
+    def configure(self, tile_size, keyframe_interval):
+        if tile_size != self.tile_size:
+            self.tile_size = tile_size
+            self.keyframe_requested = True
+        self.keyframe_interval = keyframe_interval
+
+    def dirty_tiles(self, frame):
+        height, width = frame.shape[:2]
+        keyframe = (
+            self.keyframe_requested
+            or self.previous is None
+            or self.previous.shape != frame.shape
+            or self.frames_since_keyframe >= self.keyframe_interval
+        )
+
+        if not keyframe:
+            tile = self.tile_size
+            changed = self._changed_tiles(frame)
+            rows, cols = np.nonzero(changed)
+
+            if len(rows) <= changed.size * self.full_frame_ratio:
+                self.frames_since_keyframe += 1
+                self._remember(frame)
+                return False, [
+                    (x, y, min(tile, width - x), min(tile, height - y))
+                    for y, x in zip((rows * tile).tolist(), (cols * tile).tolist(), strict=True)
+                ]
+
+        self.keyframe_requested = False
+        self.frames_since_keyframe = 0
+        self._remember(frame)
+        return True, [(0, 0, width, height)]
+
+    def _changed_tiles(self, frame):
+        tile = self.tile_size
+        height, width = frame.shape[:2]
+        # Compare raw bytes row by row; channels are folded in when reducing over tile columns.
+        np.not_equal(frame, self.previous, out=self.diff)
+        changed = self.diff.reshape(height, -1)
+
+        full_rows = height // tile
+        rows = -(-height // tile)
+        if self.row_mask is None or self.row_mask.shape != (rows, changed.shape[1]):
+            self.row_mask = np.empty((rows, changed.shape[1]), dtype=bool)
+        row_mask = self.row_mask
+        changed[:full_rows * tile].reshape(full_rows, tile, -1).any(axis=1, out=row_mask[:full_rows])
+        if full_rows < len(row_mask):
+            row_mask[-1] = changed[full_rows * tile:].any(axis=0)
+
+        channels = changed.shape[1] // width
+        return np.logical_or.reduceat(row_mask, np.arange(0, width * channels, tile * channels), axis=1)
+
+    def _remember(self, frame):
+        if self.previous is None or self.previous.shape != frame.shape:
+            self.previous = frame.copy()
+            self.diff = np.empty(frame.shape, dtype=bool)
+        else:
+            np.copyto(self.previous, frame)
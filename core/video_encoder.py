@@ -0,0 +1,84 @@
+from fractions import Fraction
+
+try:
+    import av
+    from av.video.frame import PictureType
+except ImportError:
+    av = None
+
+# The codec id travels in the upper nibble of the frame flags so the client can
+# configure its decoder from the packet alone.
+VIDEO_CODECS = {
+    "h264": {
+        "id": 1,
+        "encoder": "libx264",
+        "options": {"preset": "ultrafast", "tune": "zerolatency", "profile": "baseline"},
+    },
+    "vp8": {
+        "id": 2,
+        "encoder": "libvpx",
+        "options": {"deadline": "realtime", "cpu-used": "8", "lag-in-frames": "0"},
+    },
+}
+
+
+def available_codecs():
+    if av is None:
+        return []
+    return [name for name, codec in VIDEO_CODECS.items() if codec["encoder"] in av.codecs_available]
+
+
+def even_frame(frame):
+    height, width = frame.shape[:2]
+    return frame[:height & ~1, :width & ~1]
+
+
+class VideoEncoder:
+    def __init__(self, codec, size, fps=60, bitrate=4000, gop_size=120):
+        if av is None:
+            msg = "Video encoding requires PyAV (pip install av)."
+            raise RuntimeError(msg)
+        if codec not in VIDEO_CODECS:
+            msg = f"Unknown video codec: {codec}"
+            raise ValueError(msg)
+
+        width, height = size
+        self.codec = codec
+        self.width = width
+        self.height = height
+        self.bitrate = bitrate
+        self.gop_size = gop_size
+        self.flags = VIDEO_CODECS[codec]["id"] << 4
+        self.pts = 0
+        self.keyframe_requested = True
+
+        self.context = av.CodecContext.create(VIDEO_CODECS[codec]["encoder"], "w")
+        self.context.width = width
+        self.context.height = height
+        self.context.pix_fmt = "yuv420p"
+        self.context.time_base = Fraction(1, fps or 60)
+        self.context.framerate = fps or 60
+        self.context.gop_size = gop_size
+        self.context.max_b_frames = 0
+        self.context.bit_rate = bitrate * 1000
+        self.context.options = VIDEO_CODECS[codec]["options"]
+
+    def matches(self, codec, width, height, bitrate, gop_size):
+        return (codec, width, height, bitrate, gop_size) == (
+            self.codec, self.width, self.height, self.bitrate, self.gop_size)
+
+    def request_keyframe(self):
+        self.keyframe_requested = True
+
+    def encode(self, frame):
+        video_frame = av.VideoFrame.from_ndarray(frame, format="bgr24")
+        video_frame.pts = self.pts
+        self.pts += 1
+        if self.keyframe_requested:
+            self.keyframe_requested = False
+            video_frame.pict_type = PictureType.I
+
+        packets = self.context.encode(video_frame)
+        if not packets:
+            return None, False
+        return b"".join(bytes(packet) for packet in packets), any(packet.is_keyframe for packet in packets)
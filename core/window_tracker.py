@@ -0,0 +1,97 @@
+import time
+from threading import Thread
+
+try:
+    import win32gui
+except ImportError:
+    win32gui = None
+
+try:
+    from ctypes import byref, sizeof, windll
+    from ctypes.wintypes import RECT
+
+    dwmapi = windll.dwmapi
+except (ImportError, AttributeError, OSError):
+    dwmapi = None
+
+# GetWindowRect includes the invisible resize borders Windows 10+ draws around windows
+DWMWA_EXTENDED_FRAME_BOUNDS = 9
+WINDOW_POLL_INTERVAL = 0.1
+
+
+class Win32WindowProvider:
+    def list_windows(self):
+        if win32gui is None:
+            return []
+        windows = []
+
+        def collect(handle, _):
+            if not win32gui.IsWindowVisible(handle) or win32gui.IsIconic(handle):
+                return True
+            title = win32gui.GetWindowText(handle)
+            rect = self.window_rect(handle)
+            if title and rect and rect[2] > 0 and rect[3] > 0:
+                windows.append({"id": handle, "title": title, "rect": rect})
+            return True
+
+        try:
+            win32gui.EnumWindows(collect, None)
+        except Exception as e:
+            print(f"Error listing windows: {e}")
+        return windows
+
+    def window_rect(self, handle):
+        # None once the window is gone; (x, y, width, height) on the virtual desktop otherwise
+        if win32gui is None or not win32gui.IsWindow(handle):
+            return None
+        if win32gui.IsIconic(handle):
+            return 0, 0, 0, 0
+        if dwmapi is not None:
+            rect = RECT()
+            if not dwmapi.DwmGetWindowAttribute(handle, DWMWA_EXTENDED_FRAME_BOUNDS, byref(rect), sizeof(rect)):
+                return rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top
+        try:
+            left, top, right, bottom = win32gui.GetWindowRect(handle)
+        except Exception:
+            return None
+        return left, top, right - left, bottom - top
+
+
+class WindowTracker:
+    def __init__(self, provider, handle, on_change, interval=WINDOW_POLL_INTERVAL):
+        self.provider = provider
+        self.handle = handle
+        self.on_change = on_change
+        self.interval = interval
+        self.rect = provider.window_rect(handle)
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # Not joined: the thread may be the one calling, from inside on_change
+        self.running = False
+
+    def poll(self):
+        rect = self.provider.window_rect(self.handle)
+        if rect == self.rect:
+            return False
+        self.rect = rect
+        self.on_change(rect)
+        return True
+
+    def _loop(self):
+        while self.running:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Error tracking window {self.handle}: {e}")
+            if self.rect is None:
+                # The window is gone; there is nothing left to follow
+                self.running = False
+                break
+            time.sleep(self.interval)
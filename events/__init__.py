@@ -1,16 +1,21 @@
 # events/__init__.py
 from .audio_events import register_audio_events
 from .auth_events import register_auth_events
+from .clock_events import register_clock_events
 from .connection_events import register_connection_events
 from .input_events import register_input_events
 from .shell_events import register_shell_events
+from .stream_events import register_stream_events
 from .task_events import register_task_events
 
 
-def register_events(socketio, input_manager, audio_manager, shell_manager, task_manager):
+def register_events(socketio, app):
+    # The managers are the ones create_app attached to the app
     register_connection_events(socketio)
-    register_audio_events(socketio, audio_manager)
-    register_input_events(socketio, input_manager)
-    register_shell_events(socketio, shell_manager)
+    register_audio_events(socketio, app.audio_manager)
+    register_input_events(socketio, app.input_manager)
+    register_shell_events(socketio, app.shell_manager)
     register_auth_events(socketio)
-    register_task_events(socketio, task_manager)
+    register_task_events(socketio, app.task_manager)
+    register_stream_events(socketio, app.stream_manager)
+    register_clock_events(socketio, app.clock_sync)
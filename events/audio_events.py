@@ -11,8 +11,10 @@ def register_audio_events(socketio, audio_manager):
     @socketio.on("stop_server_audio")
     @login_required
     def handle_stop_server_audio():
-        audio_manager.stop_stream("server_mic")
-        audio_manager.stop_stream("server_system")
+        # Other listeners of the same source keep hearing it
+        audio_manager.stop_stream("server_mic", request.sid)
+        audio_manager.stop_stream("server_system", request.sid)
+        audio_manager.stop_stream("server_mix", request.sid)
 
     @socketio.on("start_client_audio")
     @login_required
@@ -22,12 +24,9 @@ def register_audio_events(socketio, audio_manager):
     @socketio.on("stop_client_audio")
     @login_required
     def handle_stop_client_audio():
-        audio_manager.stop_stream("client_playback")
+        audio_manager.stop_stream("client_playback", request.sid)
 
     @socketio.on("client_audio_data")
     @login_required
     def handle_client_audio_data(data):
-        with audio_manager.audio_lock:
-            state = audio_manager.streams.get("client_playback")
-            if state and state.get("active"):
-                state["queue"].put(data)
+        audio_manager.queue_client_audio(request.sid, data)
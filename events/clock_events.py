@@ -0,0 +1,19 @@
+from flask import request
+from flask_login import login_required
+
+
+def register_clock_events(socketio, clock_sync):
+    @socketio.on("clock_sync")
+    @login_required
+    def handle_clock_sync(data=None):
+        # Returned as the acknowledgement, so the client can time the round trip
+        return clock_sync.ping((data or {}).get("client_time"))
+
+    @socketio.on("clock_report")
+    @login_required
+    def handle_clock_report(data=None):
+        data = data or {}
+        try:
+            clock_sync.report(request.sid, data.get("offset", 0), data.get("rtt", 0), data.get("latency") or {})
+        except (TypeError, ValueError, AttributeError) as e:
+            print(f"Error reading clock report: {e}")
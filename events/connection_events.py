@@ -1,4 +1,4 @@
-from flask import current_app
+from flask import current_app, request
 from flask_login import current_user
 from flask_socketio import emit
 
@@ -14,11 +14,5 @@ def register_connection_events(socketio):
     @socketio.on("disconnect")
     def handle_disconnect():
         print("Client disconnected")
-        with current_app.audio_manager.audio_lock:
-            for stream_name in current_app.audio_manager.streams:
-                if stream_name.startswith("server"):
-                    current_app.audio_manager.streams[stream_name]["active"] = False
-                if stream_name == "client_playback":
-                    current_app.audio_manager.streams[stream_name]["active"] = False
-                    while not current_app.audio_manager.streams[stream_name]["queue"].empty():
-                        current_app.audio_manager.streams[stream_name]["queue"].get()
+        current_app.audio_manager.disconnect(request.sid)
+        current_app.clock_sync.remove(request.sid)
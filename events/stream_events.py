@@ -0,0 +1,48 @@
+from flask import request
+from flask_login import login_required
+from flask_socketio import emit
+
+
+def register_stream_events(socketio, stream_manager):
+    @socketio.on("start_binary_stream")
+    @login_required
+    def handle_start_binary_stream(data=None):
+        data = data or {}
+        try:
+            subscriber = stream_manager.subscribe(
+                request.sid,
+                data.get("profile", "default"),
+                binary=True,
+                drop_policy=data.get("drop_policy"),
+                layer=data.get("layer"),
+            )
+        except ValueError as e:
+            emit("stream_error", {"message": str(e)})
+            return
+
+        stream_manager.start_metadata_updates()
+        socketio.start_background_task(stream_manager.binary_stream_loop, subscriber)
+
+    @socketio.on("stop_binary_stream")
+    @login_required
+    def handle_stop_binary_stream():
+        stream_manager.unsubscribe(request.sid)
+
+    @socketio.on("set_stream_layer")
+    @login_required
+    def handle_set_stream_layer(data=None):
+        try:
+            stream_manager.set_layer(request.sid, (data or {}).get("layer", "auto"))
+        except ValueError as e:
+            emit("stream_error", {"message": str(e)})
+
+    @socketio.on("request_keyframe")
+    @login_required
+    def handle_request_keyframe():
+        stream_manager.request_keyframe(request.sid)
+
+    @socketio.on("stream_ack")
+    @login_required
+    def handle_stream_ack(data=None):
+        if data and "seq" in data:
+            stream_manager.acknowledge(request.sid, int(data["seq"]))
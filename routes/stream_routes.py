@@ -7,12 +7,21 @@ bp = Blueprint("stream", __name__)
 @bp.route("/api/screenshot")
 @login_required
 def screenshot():
-    img_str = current_app.stream_manager.get_screenshot()
-    return jsonify({
-        "status": "success" if img_str else "error",
-        "image": img_str,
-        "message": "Failed to capture screenshot" if not img_str else None,
-    })
+    try:
+        image = current_app.stream_manager.get_screenshot(
+            request.args.get("format", "png"),
+            request.args.get("quality", 90, type=int),
+            request.args.get("scale", 100, type=int),
+            request.args.get("output"),
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    if image is None:
+        return jsonify({"status": "error", "message": "Failed to capture screenshot"}), 503
+
+    data, mimetype = image
+    return Response(data, mimetype=mimetype, headers={"Cache-Control": "no-store"})
 
 
 @bp.route("/api/stream")
@@ -21,35 +30,193 @@ def stream():
     sid = request.args.get("sid")
     if not sid:
         return jsonify({"status": "error", "message": "No session ID provided"})
+    # Cursor and active window updates reach SSE viewers over their socket, so the sid must be one
+    if not current_app.stream_manager.is_connected(sid):
+        return jsonify({"status": "error", "message": "Session ID is not a connected socket"}), 400
 
-    with current_app.stream_manager.stream_lock:
-        current_app.stream_manager.stream_active = True
-        current_app.stream_manager.current_stream_sid = sid
-        current_app.stream_manager.start_cursor_updates()
+    try:
+        subscriber = current_app.stream_manager.subscribe(
+            sid,
+            request.args.get("profile", "default"),
+            drop_policy=request.args.get("drop_policy"),
+            layer=request.args.get("layer"),
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
 
-    return Response(current_app.stream_manager.stream_generator(sid), mimetype="text/event-stream")
+    current_app.stream_manager.start_metadata_updates()
+    return Response(current_app.stream_manager.stream_generator(subscriber), mimetype="text/event-stream")
 
 
 @bp.route("/api/stream/stop")
 @login_required
 def stop_stream():
-    with current_app.stream_manager.stream_lock:
-        current_app.stream_manager.stream_active = False
-        current_app.stream_manager.current_stream_sid = None
-        if current_app.stream_manager.camera.is_capturing:
-            current_app.stream_manager.camera.stop()
-        current_app.stream_manager.cursor_update_thread = None
+    sid = request.args.get("sid")
+    if sid:
+        current_app.stream_manager.unsubscribe(sid)
+    else:
+        current_app.stream_manager.stop_all()
     return jsonify({"status": "success"})
 
 
+@bp.route("/api/stream/viewers")
+@login_required
+def stream_viewers():
+    return jsonify(current_app.stream_manager.get_stream_stats())
+
+
+@bp.route("/api/stream/metrics")
+@login_required
+def stream_metrics():
+    return jsonify(current_app.stream_manager.get_metrics())
+
+
+@bp.route("/api/stream/encoders")
+@login_required
+def stream_encoders():
+    return jsonify(current_app.stream_manager.get_encoders())
+
+
+@bp.route("/api/stream/encoders/calibrate", methods=["POST"])
+@login_required
+def calibrate_encoders():
+    data = request.json or {}
+    try:
+        profile = current_app.stream_manager.calibrate_encoders(data.get("output"))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if profile is None:
+        return jsonify({"status": "error", "message": "Failed to capture sample frames"}), 503
+    return jsonify({"status": "success", "profile": profile})
+
+
+@bp.route("/api/stream/windows")
+@login_required
+def stream_windows():
+    return jsonify(current_app.stream_manager.get_windows())
+
+
 @bp.route("/api/stream/settings", methods=["GET", "POST"])
 @login_required
 def stream_settings():
     if request.method == "POST":
         settings = request.json
-        current_app.stream_manager.update_settings(settings)
+        try:
+            current_app.stream_manager.update_settings(settings)
+            if "audio_settings" in settings:
+                current_app.audio_manager.update_settings(settings["audio_settings"])
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        region_changed = any(key in settings for key in ("viewport", "output", "window"))
+        if region_changed and settings.get("profile", "default") == "default":
+            current_app.input_manager.set_origin(current_app.stream_manager.get_input_origin())
+
+        return jsonify(current_app.stream_manager.get_current_settings(settings.get("profile", "default")))
+
+    return jsonify(current_app.stream_manager.get_current_settings(request.args.get("profile", "default")))
+
+
+@bp.route("/api/audio/stats")
+@login_required
+def audio_stats():
+    return jsonify(current_app.audio_manager.get_stats())
+
+
+@bp.route("/api/stream/clock")
+@login_required
+def clock_stats():
+    return jsonify(current_app.clock_sync.stats())
 
-        if "audio_settings" in settings:
-            current_app.audio_manager.update_settings(settings["audio_settings"])
 
-    return jsonify(current_app.stream_manager.get_current_settings())
+@bp.route("/api/audio/devices", methods=["GET", "POST"])
+@login_required
+def audio_devices():
+    if request.method == "POST":
+        data = request.json or {}
+        try:
+            current_app.audio_manager.select_device(data.get("role"), data.get("index"))
+        except (ValueError, RuntimeError) as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+    try:
+        return jsonify(current_app.audio_manager.get_devices(refresh=request.args.get("refresh") == "1"))
+    except RuntimeError as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@bp.route("/api/recordings")
+@login_required
+def recordings():
+    return jsonify(current_app.stream_manager.get_recordings())
+
+
+@bp.route("/api/recordings/start", methods=["POST"])
+@login_required
+def start_recording():
+    data = request.json or {}
+    try:
+        recording = current_app.stream_manager.start_recording(
+            data.get("profile", "default"), int(data.get("segment_seconds", 60)),
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "recording": recording})
+
+
+@bp.route("/api/recordings/stop", methods=["POST"])
+@login_required
+def stop_recording():
+    data = request.json or {}
+    recording = current_app.stream_manager.stop_recording(data.get("profile", "default"))
+    return jsonify({"status": "success" if recording else "error", "recording": recording})
+
+
+@bp.route("/api/recordings/<name>/play")
+@login_required
+def play_recording(name):
+    try:
+        packets = current_app.stream_manager.playback(
+            name, request.args.get("start", 0.0, type=float), request.args.get("speed", 1.0, type=float),
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 404
+    return Response(packets, mimetype="application/octet-stream", headers={"Cache-Control": "no-store"})
+
+
+@bp.route("/api/replay")
+@login_required
+def replay():
+    try:
+        buffer = current_app.stream_manager.get_replay(request.args.get("profile", "default"))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify(buffer)
+
+
+@bp.route("/api/replay/frame")
+@login_required
+def replay_frame():
+    try:
+        packets = current_app.stream_manager.replay_frame(
+            request.args.get("profile", "default"), request.args.get("ago", 0.0, type=float),
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if not packets:
+        return jsonify({"status": "error", "message": "No buffered frame at that time"}), 404
+    return Response(packets, mimetype="application/octet-stream", headers={"Cache-Control": "no-store"})
+
+
+@bp.route("/api/replay/stream")
+@login_required
+def replay_stream():
+    try:
+        packets = current_app.stream_manager.replay_range(
+            request.args.get("profile", "default"),
+            request.args.get("ago", 5.0, type=float),
+            request.args.get("duration", type=float),
+            request.args.get("speed", 1.0, type=float),
+        )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return Response(packets, mimetype="application/octet-stream", headers={"Cache-Control": "no-store"})
@@ -2,6 +2,7 @@
 import { initializeSocketIO } from './modules/connection.js';
 import { showConnectionOverlay, hideConnectionOverlay, LoadingButton } from './modules/dom.js';
 import { AudioManager } from './modules/audio.js';
+import { MediaClock } from './modules/clock.js';
 import { initializeStream, updateSettingsDisplay } from './modules/stream.js';
 import { InteractiveShell } from './modules/shell.js';
 import { initializeFileManagement } from './modules/file.js';
@@ -29,16 +30,23 @@ function updateUIBasedOnAuthentication(isAuthenticated) {
 }
 
 (async function () {
-    const socket = initializeSocketIO(updateUIBasedOnAuthentication);
-
-    const sessionId = Math.random().toString(36).substring(2);
+    const socket = initializeSocketIO((isAuthenticated) => {
+        updateUIBasedOnAuthentication(isAuthenticated);
+        // Audio and video latency are both measured against the server's clock, so keep in step with it
+        if (isAuthenticated) {
+            clock.start();
+        } else {
+            clock.stop();
+        }
+    });
+    const clock = new MediaClock(socket);
 
-    const audioManager = new AudioManager(socket);
+    const audioManager = new AudioManager(socket, clock);
 
     const shell = new InteractiveShell('shellSection');
         
     // Initialize different parts of the application
-    initializeStream(sessionId, socket);
+    initializeStream(socket, clock);
     initializeFileManagement();
     initializeInputHandlers(socket);
     initializeTaskManager(socket);
@@ -1,15 +1,68 @@
 // static/js/modules/audio.js
+// Every audio message opens with [u8 codec][u32 sequence][u16 rms][u16 peak][f64 capture time on the server's clock];
+// Opus messages then carry [u16 length][packet] pairs and comfort noise markers a u16 silent duration in milliseconds
+const AUDIO_CODECS = { pcm: 0, opus: 1, cn: 2 };
+const AUDIO_HEADER_SIZE = 17;
+const LEVEL_SCALE = 65535;
+// Audio is held back at most this long to line up with slower video, in seconds
+const MAX_SYNC_DELAY = 0.5;
+// Drift smaller than this is left alone, since every correction leaves a gap in playback
+const SYNC_TOLERANCE = 0.02;
+
+function packAudio(codec, sequence, packets, timestamp) {
+    const framed = codec !== 'pcm';
+    const size = packets.reduce((total, packet) => total + packet.byteLength + (framed ? 2 : 0), AUDIO_HEADER_SIZE);
+    const payload = new Uint8Array(size);
+    const view = new DataView(payload.buffer);
+    payload[0] = AUDIO_CODECS[codec];
+    view.setUint32(1, sequence >>> 0, true);
+    view.setFloat64(9, timestamp, true);
+    let offset = AUDIO_HEADER_SIZE;
+    for (const packet of packets) {
+        if (framed) {
+            view.setUint16(offset, packet.byteLength, true);
+            offset += 2;
+        }
+        payload.set(packet, offset);
+        offset += packet.byteLength;
+    }
+    return payload.buffer;
+}
+
+function unpackOpus(bytes) {
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    const packets = [];
+    let offset = AUDIO_HEADER_SIZE;
+    while (offset + 2 <= bytes.length) {
+        const length = view.getUint16(offset, true);
+        packets.push(bytes.subarray(offset + 2, offset + 2 + length));
+        offset += 2 + length;
+    }
+    return packets;
+}
+
 class AudioManager {
-    constructor(socket) {
+    constructor(socket, clock) {
         this.socket = socket;
+        this.clock = clock;
         this.audioContext = null;
         this.currentStream = null;
         this.workletNode = null;
         this.audioQueue = [];
         this.isProcessingAudio = false;
+        this.audioEncoder = null;
+        this.audioDecoder = null;
+        this.clientSequence = 0;
+        this.playbackTime = 0;
+        this.avSync = false;
+        this.devices = null;
+        this.comfortNoise = null;
         this.currentSettings = {
-            server: { rate: 48000, chunk: 4096 },
-            client: { rate: 48000, chunk: 512 }
+            server: {
+                rate: 48000, chunk: 4096, codec: 'pcm', bitrate: 32, frame_ms: 20,
+                mic_gain: 1, system_gain: 1, vad: false, vad_threshold: -50, vad_hangover: 300
+            },
+            client: { rate: 48000, chunk: 512, codec: 'pcm', bitrate: 32, frame_ms: 20 }
         };
         this.streamActive = {
             server: false,
@@ -97,11 +150,15 @@ class AudioManager {
             this.currentSettings[type] = { ...settings };
         }
 
-        await fetch('/api/stream/settings', {
+        const response = await fetch('/api/stream/settings', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ audio_settings: settings })
         });
+        if (!response.ok) {
+            const error = await response.json().catch(() => ({}));
+            throw new Error(error.message || `Failed to apply ${type} audio settings`);
+        }
         
         return needsReset;
     }
@@ -116,6 +173,7 @@ class AudioManager {
 
             // Stop any existing stream first
             await this.stopAudioStream(type, true);
+            await this.updateSettings({ ...settings, type });
 
             await this.ensureAudioContext(settings.rate || this.currentSettings[type].rate);
 
@@ -125,8 +183,12 @@ class AudioManager {
                     throw new Error('Failed to access microphone');
                 }
 
+                this.clientSequence = 0;
                 await this.initializeAudioWorklet();
                 this.setupWorkletNode(settings.chunk || this.currentSettings.client.chunk);
+                if (this.currentSettings.client.codec === 'opus') {
+                    this.setupAudioEncoder(this.currentSettings.client);
+                }
 
                 const source = this.audioContext.createMediaStreamSource(this.currentStream);
                 source.connect(this.workletNode);
@@ -134,6 +196,7 @@ class AudioManager {
 
             // Remove any existing server_audio_data listeners before adding new one
             if (type === 'server') {
+                this.playbackTime = 0;
                 this.socket.off('server_audio_data', this.handleServerAudioData);
                 this.socket.on('server_audio_data', this.handleServerAudioData);
             }
@@ -154,15 +217,57 @@ class AudioManager {
         });
 
         this.workletNode.port.onmessage = (event) => {
-            if (event.data.type === 'pcmData') {
-                this.audioQueue.push(event.data.pcmData);
-                if (!this.isProcessingAudio) {
-                    this.processAudioQueue();
-                }
+            if (event.data.type !== 'pcmData') return;
+            const samples = new Int16Array(event.data.pcmData);
+            const sampleRate = this.currentSettings.client.rate / 2;
+            // When the chunk's first sample was captured, on the server's clock
+            const captureTime = this.clock.toServer(this.clock.now() - samples.length / sampleRate);
+            if (this.audioEncoder) {
+                // Encoded chunks keep their input's timestamp, which carries the capture time through
+                this.audioEncoder.encode(new AudioData({
+                    format: 's16',
+                    sampleRate,
+                    numberOfChannels: 1,
+                    numberOfFrames: samples.length,
+                    timestamp: Math.round(captureTime * 1e6),
+                    data: samples
+                }));
+                return;
             }
+            this.queueClientAudio('pcm', new Uint8Array(event.data.pcmData), captureTime);
         };
     }
 
+    setupAudioEncoder(settings) {
+        if (typeof AudioEncoder === 'undefined') {
+            throw new Error('Opus audio requires a browser with WebCodecs');
+        }
+        // The worklet halves the context rate before encoding
+        this.audioEncoder = new AudioEncoder({
+            output: (chunk) => {
+                const packet = new Uint8Array(chunk.byteLength);
+                chunk.copyTo(packet);
+                this.queueClientAudio('opus', packet, chunk.timestamp / 1e6);
+            },
+            error: (error) => console.error('Audio encoder error:', error)
+        });
+        this.audioEncoder.configure({
+            codec: 'opus',
+            sampleRate: settings.rate / 2,
+            numberOfChannels: 1,
+            bitrate: settings.bitrate * 1000,
+            opus: { frameDuration: settings.frame_ms * 1000 }
+        });
+    }
+
+    queueClientAudio(codec, packet, captureTime) {
+        // Sequenced so the server's jitter buffer can reorder, spot losses and measure arrival jitter
+        this.audioQueue.push(packAudio(codec, this.clientSequence++, [packet], captureTime));
+        if (!this.isProcessingAudio) {
+            this.processAudioQueue();
+        }
+    }
+
     async processAudioQueue() {
         if (this.audioQueue.length === 0) {
             this.isProcessingAudio = false;
@@ -178,24 +283,145 @@ class AudioManager {
     }
 
     handleServerAudioData(data) {
-        const uint8Array = new Uint8Array(data);
-        if (uint8Array.length === 0) return;
+        const bytes = new Uint8Array(data);
+        if (bytes.length <= AUDIO_HEADER_SIZE || !this.audioContext) return;
+
+        const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+        const rms = view.getUint16(5, true) / LEVEL_SCALE;
+        const captureTime = view.getFloat64(9, true);
+        this.updateLevelMeter(rms, view.getUint16(7, true) / LEVEL_SCALE, bytes[0] === AUDIO_CODECS.cn);
+        if (bytes[0] === AUDIO_CODECS.cn) {
+            this.startComfortNoise(rms);
+            return;
+        }
+        this.stopComfortNoise();
 
-        const bufferLength = uint8Array.length - (uint8Array.length % 2);
-        const int16Array = new Int16Array(uint8Array.buffer, 0, bufferLength / 2);
+        if (bytes[0] === AUDIO_CODECS.opus) {
+            this.decodeServerAudio(unpackOpus(bytes), captureTime);
+            return;
+        }
 
-        const audioBuffer = this.audioContext.createBuffer(1, int16Array.length, this.audioContext.sampleRate);
-        const audioData = audioBuffer.getChannelData(0);
+        const sampleCount = Math.floor((bytes.length - AUDIO_HEADER_SIZE) / 2);
+        const int16Array = new Int16Array(bytes.slice(AUDIO_HEADER_SIZE, AUDIO_HEADER_SIZE + sampleCount * 2).buffer);
+        const samples = new Float32Array(sampleCount);
+        for (let i = 0; i < sampleCount; i++) {
+            samples[i] = int16Array[i] / 32768.0;
+        }
+        this.playSamples(samples, this.audioContext.sampleRate, captureTime);
+    }
 
-        for (let i = 0; i < int16Array.length; i++) {
-            audioData[i] = int16Array[i] / 32768.0;
+    decodeServerAudio(packets, captureTime) {
+        if (!this.audioDecoder) {
+            if (typeof AudioDecoder === 'undefined') {
+                console.error('Opus audio requires a browser with WebCodecs');
+                return;
+            }
+            this.audioDecoder = new AudioDecoder({
+                output: (audioData) => {
+                    const samples = new Float32Array(audioData.numberOfFrames);
+                    audioData.copyTo(samples, { planeIndex: 0, format: 'f32-planar' });
+                    this.playSamples(samples, audioData.sampleRate, audioData.timestamp / 1e6);
+                    audioData.close();
+                },
+                error: (error) => console.error('Audio decoder error:', error)
+            });
+            this.audioDecoder.configure({
+                codec: 'opus',
+                sampleRate: this.currentSettings.server.rate,
+                numberOfChannels: 1
+            });
         }
+        // Timestamps are capture times in microseconds, so each decoded frame still knows when it was captured
+        const frameDuration = this.currentSettings.server.frame_ms * 1000;
+        packets.forEach((packet, i) => {
+            this.audioDecoder.decode(new EncodedAudioChunk({
+                type: 'key',
+                timestamp: Math.round(captureTime * 1e6) + i * frameDuration,
+                duration: frameDuration,
+                data: packet
+            }));
+        });
+    }
+
+    playSamples(samples, sampleRate, captureTime) {
+        if (!this.audioContext || samples.length === 0) return;
+        const audioBuffer = this.audioContext.createBuffer(1, samples.length, sampleRate);
+        audioBuffer.copyToChannel(samples, 0);
 
+        // Back to back rather than on arrival, so short Opus frames do not overlap or leave gaps
+        const now = this.audioContext.currentTime;
+        if (this.playbackTime < now) {
+            this.playbackTime = now;
+        }
+        // From scheduling a buffer to it leaving the speakers
+        const outputLatency = (this.audioContext.outputLatency || 0) + (this.audioContext.baseLatency || 0);
+        const video = this.clock.latency.video;
+        if (this.avSync && video !== undefined) {
+            // Hold audio back until the frame captured with it is on screen; video cannot be hurried to meet audio
+            const shown = this.clock.toLocal(captureTime) + Math.min(video, MAX_SYNC_DELAY);
+            const due = now + shown - this.clock.now() - outputLatency;
+            if (due - this.playbackTime > SYNC_TOLERANCE) {
+                this.playbackTime = due;
+            }
+        }
         const source = this.audioContext.createBufferSource();
         source.buffer = audioBuffer;
         source.connect(this.audioContext.destination);
-        source.start();
+        source.start(this.playbackTime);
         source.onended = () => source.disconnect();
+        this.clock.record('audio', captureTime, this.clock.now() + this.playbackTime - now + outputLatency);
+        this.playbackTime += audioBuffer.duration;
+    }
+
+    startComfortNoise(rms) {
+        // Uniform noise of amplitude a has an RMS of a / sqrt(3)
+        const amplitude = Math.min(1, rms * Math.sqrt(3));
+        if (this.comfortNoise) {
+            this.comfortNoise.gain.gain.value = amplitude;
+            return;
+        }
+        const buffer = this.audioContext.createBuffer(1, this.audioContext.sampleRate, this.audioContext.sampleRate);
+        const samples = buffer.getChannelData(0);
+        for (let i = 0; i < samples.length; i++) {
+            samples[i] = Math.random() * 2 - 1;
+        }
+        const source = this.audioContext.createBufferSource();
+        source.buffer = buffer;
+        source.loop = true;
+        const gain = this.audioContext.createGain();
+        gain.gain.value = amplitude;
+        source.connect(gain).connect(this.audioContext.destination);
+        source.start(Math.max(this.playbackTime, this.audioContext.currentTime));
+        this.comfortNoise = { source, gain };
+    }
+
+    stopComfortNoise() {
+        if (!this.comfortNoise) return;
+        const { source, gain } = this.comfortNoise;
+        source.stop(this.audioContext ? Math.max(this.playbackTime, this.audioContext.currentTime) : 0);
+        source.onended = () => {
+            source.disconnect();
+            gain.disconnect();
+        };
+        this.comfortNoise = null;
+    }
+
+    updateLevelMeter(rms, peak, gated) {
+        const toDb = (level) => (level > 0 ? 20 * Math.log10(level) : -Infinity);
+        const rmsDb = toDb(rms);
+        // -60 dBFS and below reads as empty
+        const width = Math.max(0, Math.min(100, (rmsDb + 60) / 60 * 100));
+        document.getElementById('serverAudioLevel').style.width = `${width}%`;
+        const format = (db) => (Number.isFinite(db) ? `${db.toFixed(0)} dB` : '-∞ dB');
+        document.getElementById('serverAudioLevelText').textContent =
+            `${format(rmsDb)} / peak ${format(toDb(peak))}${gated ? ' (gated)' : ''}`;
+    }
+
+    closeCodec(name) {
+        if (this[name] && this[name].state !== 'closed') {
+            this[name].close();
+        }
+        this[name] = null;
     }
 
     async stopAudioStream(type, isResetting = false) {
@@ -209,6 +435,10 @@ class AudioManager {
             this.cleanupWorklet();
         } else if (type === 'server') {
             this.socket.off('server_audio_data', this.handleServerAudioData);
+            this.closeCodec('audioDecoder');
+            this.stopComfortNoise();
+            this.updateLevelMeter(0, 0, false);
+            this.clock.reset('audio');
         }
 
         // Only close AudioContext if we're not resetting
@@ -230,6 +460,7 @@ class AudioManager {
             this.workletNode.port.close();
             this.workletNode = null;
         }
+        this.closeCodec('audioEncoder');
         this.audioQueue = [];
         this.isProcessingAudio = false;
     }
@@ -238,13 +469,78 @@ class AudioManager {
         this.cleanupWorklet();
     }
 
+    liveSettings() {
+        return {
+            mic_gain: parseFloat(document.getElementById('serverMicGain').value),
+            system_gain: parseFloat(document.getElementById('serverSystemGain').value),
+            vad: document.getElementById('serverAudioVad').checked,
+            vad_threshold: parseFloat(document.getElementById('serverVadThreshold').value),
+            vad_hangover: parseInt(document.getElementById('serverVadHangover').value)
+        };
+    }
+
+    async updateLiveSettings() {
+        // Gains and the silence gate apply to a running stream, so they do not restart it
+        const settings = this.liveSettings();
+        Object.assign(this.currentSettings.server, settings);
+        await fetch('/api/stream/settings', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ audio_settings: { type: 'server', ...settings } })
+        });
+    }
+
+    async loadDevices(refresh = false) {
+        const response = await fetch(`/api/audio/devices${refresh ? '?refresh=1' : ''}`);
+        const data = await response.json();
+        if (!response.ok) {
+            console.error('Error loading audio devices:', data.message);
+            return;
+        }
+        this.devices = data;
+        this.fillDeviceSelect('serverAudioDevice', document.getElementById('audioSourceSelect').value, 'input_channels');
+        this.fillDeviceSelect('clientAudioDevice', 'output', 'output_channels');
+    }
+
+    fillDeviceSelect(id, role, channels) {
+        const select = document.getElementById(id);
+        // The mix uses whichever devices are selected for the microphone and system audio
+        select.disabled = role === 'mix';
+        if (!this.devices || role === 'mix') return;
+        select.innerHTML = '';
+        select.add(new Option(role === 'system' ? 'Auto (Stereo Mix)' : 'Default', ''));
+        for (const device of this.devices.devices.filter(device => device[channels] > 0)) {
+            select.add(new Option(device.name, device.index));
+        }
+        const selected = this.devices.selected[role];
+        select.value = selected === null || selected === undefined ? '' : String(selected);
+    }
+
+    async selectDevice(role, value) {
+        const response = await fetch('/api/audio/devices', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ role, index: value === '' ? null : parseInt(value) })
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            alert(data.message);
+            return;
+        }
+        this.devices = data;
+    }
+
     initializeEventListeners() {
         // Server Audio Controls
         document.getElementById('startServerAudio').addEventListener('click', async () => {
             const settings = {
                 source: document.getElementById('audioSourceSelect').value,
                 rate: parseInt(document.getElementById('serverAudioRate').value),
-                chunk: parseInt(document.getElementById('serverAudioChunk').value)
+                chunk: parseInt(document.getElementById('serverAudioChunk').value),
+                codec: document.getElementById('serverAudioCodec').value,
+                bitrate: parseInt(document.getElementById('serverAudioBitrate').value),
+                frame_ms: parseFloat(document.getElementById('serverAudioFrame').value),
+                ...this.liveSettings()
             };
             await this.startAudioStream('server', settings);
         });
@@ -253,11 +549,37 @@ class AudioManager {
             this.stopAudioStream('server');
         });
 
+        // Device changes apply the next time a stream starts
+        const sourceSelect = document.getElementById('audioSourceSelect');
+        sourceSelect.addEventListener('change', () => {
+            this.fillDeviceSelect('serverAudioDevice', sourceSelect.value, 'input_channels');
+        });
+        for (const id of ['serverAudioDevice', 'clientAudioDevice']) {
+            const select = document.getElementById(id);
+            select.addEventListener('focus', () => {
+                if (!this.devices) this.loadDevices();
+            });
+            select.addEventListener('change', () => {
+                this.selectDevice(id === 'clientAudioDevice' ? 'output' : sourceSelect.value, select.value);
+            });
+        }
+        for (const id of ['serverMicGain', 'serverSystemGain', 'serverAudioVad', 'serverVadThreshold', 'serverVadHangover']) {
+            document.getElementById(id).addEventListener('change', () => this.updateLiveSettings());
+        }
+        document.getElementById('rescanAudioDevices').addEventListener('click', () => this.loadDevices(true));
+        const avSync = document.getElementById('audioVideoSync');
+        avSync.addEventListener('change', () => {
+            this.avSync = avSync.checked;
+        });
+
         // Client Audio Controls
         document.getElementById('startClientAudio').addEventListener('click', async () => {
             const settings = {
                 rate: parseInt(document.getElementById('clientAudioRate').value),
-                chunk: parseInt(document.getElementById('clientAudioChunk').value)
+                chunk: parseInt(document.getElementById('clientAudioChunk').value),
+                codec: document.getElementById('clientAudioCodec').value,
+                bitrate: parseInt(document.getElementById('clientAudioBitrate').value),
+                frame_ms: parseFloat(document.getElementById('clientAudioFrame').value)
             };
             await this.startAudioStream('client', settings);
         });
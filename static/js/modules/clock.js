@@ -0,0 +1,100 @@
+// static/js/modules/clock.js
+// Maps the server's media clock, which stamps every video frame and audio chunk with its capture time,
+// onto this browser's clock, and tracks how long each media type takes from capture to playout
+const SYNC_SAMPLES = 5;
+const SYNC_TIMEOUT = 2000;
+const RESYNC_INTERVAL = 30000;
+const REPORT_INTERVAL = 2000;
+// Weight of each new capture-to-playout sample in the smoothed latency
+const LATENCY_SMOOTHING = 0.1;
+
+class MediaClock {
+    constructor(socket) {
+        this.socket = socket;
+        // Server time minus local time, in seconds
+        this.offset = 0;
+        this.rtt = null;
+        this.latency = {};
+        this.timers = [];
+        this.latencyText = document.getElementById('mediaLatency');
+    }
+
+    now() {
+        return (performance.timeOrigin + performance.now()) / 1000;
+    }
+
+    toLocal(serverTime) {
+        return serverTime - this.offset;
+    }
+
+    toServer(localTime) {
+        return localTime + this.offset;
+    }
+
+    ping() {
+        return new Promise((resolve) => {
+            const timer = setTimeout(() => resolve(null), SYNC_TIMEOUT);
+            const sent = this.now();
+            this.socket.emit('clock_sync', { client_time: sent }, (reply) => {
+                clearTimeout(timer);
+                const received = this.now();
+                resolve(reply ? { rtt: received - sent, offset: reply.server_time - (sent + received) / 2 } : null);
+            });
+        });
+    }
+
+    async sync() {
+        // The sample with the shortest round trip has the least room for asymmetric delay
+        let best = null;
+        for (let i = 0; i < SYNC_SAMPLES; i++) {
+            const sample = await this.ping();
+            if (sample && (!best || sample.rtt < best.rtt)) {
+                best = sample;
+            }
+        }
+        if (best) {
+            this.offset = best.offset;
+            this.rtt = best.rtt;
+        }
+    }
+
+    start() {
+        this.stop();
+        this.sync();
+        this.timers.push(setInterval(() => this.sync(), RESYNC_INTERVAL));
+        this.timers.push(setInterval(() => this.report(), REPORT_INTERVAL));
+    }
+
+    stop() {
+        this.timers.forEach(clearInterval);
+        this.timers = [];
+    }
+
+    record(media, captureTime, playedAt = this.now()) {
+        if (!captureTime) return;
+        const latency = playedAt - this.toLocal(captureTime);
+        const previous = this.latency[media];
+        this.latency[media] = previous === undefined ? latency : previous + (latency - previous) * LATENCY_SMOOTHING;
+    }
+
+    reset(media) {
+        delete this.latency[media];
+    }
+
+    report() {
+        const { video, audio } = this.latency;
+        if (video === undefined && audio === undefined) {
+            this.latencyText.textContent = '';
+            return;
+        }
+        const format = (latency) => (latency === undefined ? '-' : `${Math.round(latency * 1000)} ms`);
+        const parts = [`Latency: video ${format(video)}`, `audio ${format(audio)}`];
+        if (video !== undefined && audio !== undefined) {
+            parts.push(`A/V ${Math.round((audio - video) * 1000)} ms`);
+        }
+        this.latencyText.textContent = parts.join(', ');
+        this.socket.emit('clock_report', { offset: this.offset, rtt: this.rtt ?? 0, latency: { video, audio } });
+    }
+}
+
+export { MediaClock };
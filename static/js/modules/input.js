@@ -243,7 +243,7 @@ function initializeInputHandlers(socket) {
     });
 
     function sendMouseEvent(type, event, options = {}) {
-        if (!streamActive) return;
+        if (!streamActive || streamUI.selectingViewport) return;
         
         // Process move events during drag or when Ctrl is pressed
         if (type === 'move' && !isCtrlPressed && !isDragging && !touchStarted) {
@@ -257,8 +257,9 @@ function initializeInputHandlers(socket) {
         const relativeX = clientX - dimensions.container.left - dimensions.offsetX;
         const relativeY = clientY - dimensions.container.top - dimensions.offsetY;
         
-        const x = Math.max(0, Math.min(streamUI.nativeWidth, relativeX * dimensions.scaleX));
-        const y = Math.max(0, Math.min(streamUI.nativeHeight, relativeY * dimensions.scaleY));
+        // Coordinates are relative to the streamed viewport; the server adds its origin
+        const x = Math.max(0, Math.min(dimensions.sourceWidth, relativeX * dimensions.scaleX));
+        const y = Math.max(0, Math.min(dimensions.sourceHeight, relativeY * dimensions.scaleY));
         
         const data = { type, x, y, ...options };
         socket.emit('mouse_event', data);
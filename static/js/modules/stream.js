@@ -7,9 +7,15 @@ const streamUI = {
     view: document.getElementById('streamView'),
     fpsCounter: document.getElementById('currentFPS'),
     activeWindowText: document.getElementById('activeWindow'),
+    adaptiveText: document.getElementById('adaptiveInfo'),
     cursorOverlay: document.getElementById('cursorOverlay'),
+    overview: document.getElementById('streamOverview'),
+    metricsOverlay: document.getElementById('metricsOverlay'),
     nativeWidth: null,
     nativeHeight: null,
+    origin: { x: 0, y: 0 },
+    viewport: null,
+    selectingViewport: false,
 
     show() {
         this.container.classList.remove('h-0');
@@ -26,61 +32,332 @@ const streamUI = {
     },
 
     updateStream(data) {
-        this.view.src = `data:image/jpeg;base64,${data.image}`;
+        const image = new Image();
+        image.onload = () => {
+            this.draw(image, 0, 0, image.width, image.height);
+            this.clock?.record('video', data.timestamp);
+            this.acknowledge?.(data.seq);
+        };
+        image.src = `data:image/jpeg;base64,${data.image}`;
+        this.updateInfo(data);
+    },
+
+    updateInfo(data) {
         this.fpsCounter.textContent = data.fps;
-        this.activeWindowText.textContent = data.active_window ? `Active Window: ${data.active_window}` : '';
+        if (data.layer !== undefined) {
+            this.layer = data.layer;
+        }
+        if (data.origin !== undefined) {
+            this.origin = data.origin;
+        }
+        if (data.viewport !== undefined) {
+            this.setViewport(data.viewport);
+        }
+        if (data.adaptive !== undefined) {
+            const adaptive = data.adaptive;
+            this.adaptiveText.textContent = adaptive ?
+                `Adaptive: quality ${adaptive.quality}, ${adaptive.resolution_percentage}%, ${adaptive.fps} FPS, ` +
+                `${adaptive.latency_ms} ms latency${adaptive.decision ? ` (${adaptive.decision})` : ''}` :
+                '';
+        }
+    },
+
+    updateFrame(packet) {
+        // Tiles patch the previous frame, so packets are decoded and drawn strictly in order
+        this.pendingFrame = this.pendingFrame
+            .then(() => this.renderPacket(packet))
+            .then((header) => {
+                // Decoded video is timed when the decoder hands the frame over
+                if (header.frameType !== FRAME_VIDEO) {
+                    this.clock?.record('video', header.timestamp);
+                }
+                this.acknowledge?.(header.seq);
+            })
+            .catch((error) => {
+                console.error('Failed to render frame:', error);
+                this.requestKeyframe?.();
+            });
+    },
+
+    async renderPacket(packet) {
+        const header = parseFrameHeader(packet);
+        if (header.frameType === FRAME_JPEG) {
+            const type = IMAGE_TYPES[header.flags >> 4];
+            const bitmap = await createImageBitmap(new Blob([new Uint8Array(packet, FRAME_HEADER_SIZE)], { type }));
+            this.draw(bitmap, 0, 0, header.width, header.height);
+        } else if (header.frameType === FRAME_TILES) {
+            const tiles = parseTiles(packet, header.flags);
+            const bitmaps = await Promise.all(tiles.map((tile) => createImageBitmap(tile.blob)));
+            tiles.forEach((tile, i) => this.draw(bitmaps[i], tile.x, tile.y, header.width, header.height));
+        } else if (header.frameType === FRAME_VIDEO) {
+            this.decodeVideo(header, new Uint8Array(packet, FRAME_HEADER_SIZE));
+        }
+        return header;
+    },
+
+    decodeVideo(header, data) {
+        const codec = VIDEO_CODECS[header.flags >> 4];
+        const keyframe = (header.flags & FLAG_KEYFRAME) !== 0;
+        if (!this.decoder || this.decoder.state === 'closed' || this.decoderCodec !== codec) {
+            // A decoder can only start from a keyframe, so ask for one and skip deltas until it arrives
+            if (!keyframe) {
+                if (!this.awaitingKeyframe) {
+                    this.awaitingKeyframe = true;
+                    this.requestKeyframe?.();
+                }
+                return;
+            }
+            this.resetDecoder();
+            this.decoder = new VideoDecoder({
+                output: (frame) => {
+                    const captureTime = this.captureTimes.get(frame.timestamp);
+                    this.captureTimes.delete(frame.timestamp);
+                    this.draw(frame, 0, 0, frame.displayWidth, frame.displayHeight);
+                    this.clock?.record('video', captureTime);
+                },
+                error: (error) => {
+                    console.error('Video decode error:', error);
+                    this.decoder = null;
+                }
+            });
+            this.decoder.configure({ codec, optimizeForLatency: true });
+            this.decoderCodec = codec;
+            this.awaitingKeyframe = false;
+        }
+        // Chunk timestamps are sequence numbers; the capture time waits here until the frame comes out
+        this.captureTimes.set(header.seq, header.timestamp);
+        if (this.captureTimes.size > MAX_PENDING_CAPTURE_TIMES) {
+            this.captureTimes.delete(this.captureTimes.keys().next().value);
+        }
+        this.decoder.decode(new EncodedVideoChunk({
+            type: keyframe ? 'key' : 'delta',
+            timestamp: header.seq,
+            data
+        }));
+    },
+
+    resetDecoder() {
+        if (this.decoder && this.decoder.state !== 'closed') {
+            this.decoder.close();
+        }
+        this.decoder = null;
+        this.decoderCodec = null;
+        this.captureTimes.clear();
+    },
+
+    draw(source, x, y, frameWidth, frameHeight) {
+        if (this.view.width !== frameWidth || this.view.height !== frameHeight) {
+            this.view.width = frameWidth;
+            this.view.height = frameHeight;
+        }
+        this.context.drawImage(source, x, y);
+        source.close?.();
+    },
+
+    updateMetadata(changes) {
+        // Only changed fields are sent, so merge them into what we already know
+        Object.assign(this.metadata, changes);
+        if ('active_window' in changes) {
+            this.activeWindowText.textContent = changes.active_window ? `Active Window: ${changes.active_window}` : '';
+        }
+        if ('cursor_shape' in changes) {
+            this.cursorOverlay.dataset.shape = changes.cursor_shape;
+            this.view.style.cursor = changes.cursor_shape === 'none' ? 'default' : changes.cursor_shape;
+        }
+        if ('metrics' in changes) {
+            const profile = this.layer && this.layer !== 'full' ? this.layer : 'default';
+            this.drawMetrics(changes.metrics?.[`${profile}/${streamTransport}`]);
+        }
+        this.positionCursor();
+    },
+
+    drawMetrics(metrics) {
+        if (!metrics) {
+            this.metricsOverlay.classList.add('hidden');
+            return;
+        }
+        const stages = Object.entries(metrics.stages_ms)
+            .map(([name, [p50, p95]]) => `${name.padEnd(12)} ${p50.toFixed(1).padStart(6)} / ${p95.toFixed(1).padStart(6)} ms`);
+        this.metricsOverlay.textContent = [
+            `${metrics.fps} FPS, ${metrics.frame_kib} KiB/frame, ${metrics.dropped} dropped`,
+            `${'stage'.padEnd(12)} ${'p50'.padStart(6)} / ${'p95'.padStart(6)}`,
+            ...stages
+        ].join('\n');
+        this.metricsOverlay.classList.remove('hidden');
+    },
+
+    positionCursor() {
+        const cursor = this.metadata.cursor;
+        if (!cursor || this.metadata.cursor_shape === 'none') {
+            this.cursorOverlay.style.display = 'none';
+            return;
+        }
+        const dimensions = calculateStreamDimensions();
+
+        // Calculate cursor position in client coordinates, relative to the streamed display and viewport
+        const adjustedX = ((cursor.x - this.origin.x - dimensions.sourceX) / dimensions.scaleX) + dimensions.offsetX;
+        const adjustedY = ((cursor.y - this.origin.y - dimensions.sourceY) / dimensions.scaleY) + dimensions.offsetY;
+
+        this.cursorOverlay.style.left = `${adjustedX}px`;
+        this.cursorOverlay.style.top = `${adjustedY}px`;
+
+        // Hide cursor when outside stream bounds
+        const outside =
+            adjustedX < dimensions.offsetX ||
+            adjustedX > dimensions.offsetX + dimensions.streamWidth ||
+            adjustedY < dimensions.offsetY ||
+            adjustedY > dimensions.offsetY + dimensions.streamHeight;
+        this.cursorOverlay.style.display = outside ? 'none' : 'block';
+    },
+
+    setViewport(viewport) {
+        this.viewport = viewport;
+        if (!viewport) {
+            this.overview.classList.add('hidden');
+        }
+        this.positionCursor();
+    },
+
+    async drawOverview(packet) {
+        const header = parseFrameHeader(packet);
+        const bitmap = await createImageBitmap(new Blob([new Uint8Array(packet, FRAME_HEADER_SIZE)], { type: 'image/jpeg' }));
+        if (!this.viewport) {
+            bitmap.close();
+            return;
+        }
+
+        const context = this.overview.getContext('2d');
+        this.overview.width = header.width;
+        this.overview.height = header.height;
+        context.drawImage(bitmap, 0, 0);
+        bitmap.close();
+
+        // Outline the part of the desktop the main view is showing
+        const scale = header.width / this.nativeWidth;
+        context.strokeStyle = '#3b82f6';
+        context.lineWidth = 2;
+        context.strokeRect(
+            this.viewport.x * scale, this.viewport.y * scale,
+            this.viewport.width * scale, this.viewport.height * scale
+        );
+        this.overview.classList.remove('hidden');
     },
 
     clear() {
-        this.view.src = '';
+        this.pendingFrame = Promise.resolve();
+        this.resetDecoder();
+        this.awaitingKeyframe = false;
+        this.context.clearRect(0, 0, this.view.width, this.view.height);
         this.fpsCounter.textContent = '0';
+        this.adaptiveText.textContent = '';
+        this.activeWindowText.textContent = '';
+        this.metadata = {};
+        this.view.style.cursor = '';
+        this.overview.classList.add('hidden');
+        this.metricsOverlay.classList.add('hidden');
         this.cursorOverlay.style.display = 'none';
+        this.clock?.reset('video');
     }
 };
 
+streamUI.context = streamUI.view.getContext('2d');
+streamUI.pendingFrame = Promise.resolve();
+streamUI.metadata = {};
+streamUI.captureTimes = new Map();
+
+// frame_type (u8), flags (u8), seq (u32), timestamp (f64), width (u16), height (u16)
+const FRAME_HEADER_SIZE = 18;
+// x (u16), y (u16), width (u16), height (u16), length (u32)
+const TILE_HEADER_SIZE = 12;
+const FRAME_JPEG = 1;
+const FRAME_TILES = 2;
+const FRAME_VIDEO = 3;
+const FLAG_KEYFRAME = 0x01;
+// Codec id from the upper nibble of the frame flags to its WebCodecs codec string
+const VIDEO_CODECS = { 1: 'avc1.42E01F', 2: 'vp8' };
+// Image and tile frames use the same nibble for the image format the server's encoder picked
+const IMAGE_TYPES = { 0: 'image/jpeg', 1: 'image/webp', 2: 'image/png' };
+// Frames the video decoder has not produced yet; more than this means it dropped some
+const MAX_PENDING_CAPTURE_TIMES = 120;
+
+function parseFrameHeader(packet) {
+    const view = new DataView(packet, 0, FRAME_HEADER_SIZE);
+    return {
+        frameType: view.getUint8(0),
+        flags: view.getUint8(1),
+        seq: view.getUint32(2, true),
+        timestamp: view.getFloat64(6, true),
+        width: view.getUint16(14, true),
+        height: view.getUint16(16, true)
+    };
+}
+
+function parseTiles(packet, flags) {
+    const type = IMAGE_TYPES[flags >> 4];
+    const view = new DataView(packet);
+    const count = view.getUint16(FRAME_HEADER_SIZE, true);
+    const tiles = [];
+    let offset = FRAME_HEADER_SIZE + 2;
+    for (let i = 0; i < count; i++) {
+        const length = view.getUint32(offset + 8, true);
+        const start = offset + TILE_HEADER_SIZE;
+        tiles.push({
+            x: view.getUint16(offset, true),
+            y: view.getUint16(offset + 2, true),
+            blob: new Blob([new Uint8Array(packet, start, length)], { type })
+        });
+        offset = start + length;
+    }
+    return tiles;
+}
+
 let streamActive = false;
+let streamTransport = null;
 let eventSource = null;
+let streamSid = null;
 let nativeWidth, nativeHeight;
 let isFullscreen = false;
+let playback = null;
 
-function initializeStream(sessionId, socket) {
+function initializeStream(socket, clock) {
     document.getElementById('startStream').addEventListener('click', () => {
         if (!streamActive) {
+            stopPlayback();
             streamActive = true;
             streamUI.show();
 
-            eventSource = new EventSource(`/api/stream?sid=${sessionId}`);
-            eventSource.onmessage = (event) => {
-                const data = JSON.parse(event.data);
-                streamUI.updateStream(data);
-            };
-
-            // Listen for mouse position updates from the server
-            socket.on('mouse_position', (data) => {
-                const dimensions = calculateStreamDimensions();
-
-                // Calculate cursor position in client coordinates
-                const adjustedX = (data.x / dimensions.scaleX) + dimensions.offsetX;
-                const adjustedY = (data.y / dimensions.scaleY) + dimensions.offsetY;
-
-                streamUI.cursorOverlay.style.display = 'block';
-                streamUI.cursorOverlay.style.left = `${adjustedX}px`;
-                streamUI.cursorOverlay.style.top = `${adjustedY}px`;
-
-                // Hide cursor when outside stream bounds
-                if (
-                    adjustedX < dimensions.offsetX ||
-                    adjustedX > dimensions.offsetX + dimensions.streamWidth ||
-                    adjustedY < dimensions.offsetY ||
-                    adjustedY > dimensions.offsetY + dimensions.streamHeight
-                ) {
-                    streamUI.cursorOverlay.style.display = 'none';
-                }
-            });
+            streamTransport = document.getElementById('streamTransport').value;
+            const layer = document.getElementById('streamLayer').value;
+            streamUI.layer = layer === 'auto' ? 'full' : layer;
+            streamUI.acknowledge = (seq) => socket.emit('stream_ack', { seq });
+            streamUI.clock = clock;
+            if (streamTransport === 'binary') {
+                streamUI.requestKeyframe = () => socket.emit('request_keyframe');
+                socket.on('stream_frame', (packet) => streamUI.updateFrame(packet));
+                socket.on('stream_info', (data) => streamUI.updateInfo(data));
+                socket.on('stream_overview', (packet) => streamUI.drawOverview(packet));
+                socket.emit('start_binary_stream', { profile: 'default', layer });
+            } else {
+                // Keyed by this socket, so acks, layer switches and metadata sent over it find the SSE viewer
+                streamSid = socket.id;
+                eventSource = new EventSource(`/api/stream?sid=${streamSid}&layer=${layer}`);
+                eventSource.onmessage = (event) => {
+                    const data = JSON.parse(event.data);
+                    streamUI.updateStream(data);
+                };
+            }
+
+            // Cursor, cursor shape and active window arrive only when they change
+            socket.on('stream_metadata', (changes) => streamUI.updateMetadata(changes));
         }
     });
 
     document.getElementById('stopStream').addEventListener('click', async () => {
+        if (playback) {
+            stopPlayback();
+            streamUI.hide();
+            streamUI.clear();
+        }
         if (streamActive) {
             streamActive = false;
             streamUI.hide();
@@ -89,27 +366,61 @@ function initializeStream(sessionId, socket) {
                 eventSource.close();
                 eventSource = null;
             }
-            await apiCall('/api/stream/stop');
+            socket.off('stream_frame');
+            socket.off('stream_info');
+            socket.off('stream_overview');
+            if (streamTransport === 'binary') {
+                socket.emit('stop_binary_stream');
+            } else {
+                await apiCall(`/api/stream/stop?sid=${streamSid}`);
+            }
             streamUI.clear();
 
-            // Stop listening for mouse position updates
-            socket.off('mouse_position');
+            socket.off('stream_metadata');
         }
     });
 
     document.getElementById('screenshot').addEventListener('click', async () => {
         streamUI.show();
 
-        const response = await apiCall('/api/screenshot');
-        if (response.status === 'success') {
-            streamUI.view.src = `data:image/jpeg;base64,${response.image}`;
+        const response = await fetch('/api/screenshot?format=png');
+        if (response.ok) {
+            const image = await createImageBitmap(await response.blob());
+            streamUI.draw(image, 0, 0, image.width, image.height);
         }
     });
 
     document.getElementById('streamQuality').addEventListener('input', updateStreamSettings);
     document.getElementById('streamResolution').addEventListener('input', updateStreamSettings);
     document.getElementById('streamFPS').addEventListener('input', updateStreamSettings);
+    document.getElementById('streamEncoding').addEventListener('change', updateStreamSettings);
+    document.getElementById('streamImageEncoder').addEventListener('change', updateStreamSettings);
+    document.getElementById('calibrateEncoders').addEventListener('click', async (event) => {
+        // Benchmarks every encoder on frames from this host; takes a few seconds
+        event.target.disabled = true;
+        const response = await apiCall('/api/stream/encoders/calibrate', 'POST', {});
+        event.target.disabled = false;
+        if (response.status === 'error') {
+            console.error('Calibration failed:', response.message);
+        }
+    });
+    document.getElementById('streamLayer').addEventListener('change', (event) => {
+        // Each viewer picks its own layer; the stream keeps running while it switches
+        if (streamActive && streamTransport === 'binary') {
+            socket.emit('set_stream_layer', { layer: event.target.value });
+        }
+    });
+    document.getElementById('streamOutput').addEventListener('change', async (event) => {
+        const response = await apiCall('/api/stream/settings', 'POST', { output: event.target.value });
+        if (response.status !== 'error') {
+            updateSettingsDisplay(response);
+        }
+    });
+    document.getElementById('streamAdaptive').addEventListener('change', updateStreamSettings);
+    document.getElementById('streamMetricsOverlay').addEventListener('change', updateStreamSettings);
     document.getElementById('autoFpsButton').addEventListener('click', setAutoFPS);
+    initializeViewportSelection();
+    initializeRecordings();
 
     // Fullscreen handling
     const fullscreenBtn = document.getElementById('fullscreenBtn');
@@ -172,6 +483,9 @@ function initializeStream(sessionId, socket) {
 }
 
 function calculateStreamDimensions() {
+    const viewport = streamUI.viewport;
+    const sourceWidth = viewport ? viewport.width : nativeWidth;
+    const sourceHeight = viewport ? viewport.height : nativeHeight;
     const rect = streamUI.view.getBoundingClientRect();
     const container = streamUI.container.getBoundingClientRect();
 
@@ -180,7 +494,7 @@ function calculateStreamDimensions() {
 
     if (isFullscreen) {
         const containerAspect = container.width / container.height;
-        const streamAspect = nativeWidth / nativeHeight;
+        const streamAspect = sourceWidth / sourceHeight;
 
         if (containerAspect > streamAspect) {
             streamWidth = container.height * streamAspect;
@@ -200,16 +514,108 @@ function calculateStreamDimensions() {
         streamHeight,
         offsetX,
         offsetY,
-        scaleX: nativeWidth / streamWidth,
-        scaleY: nativeHeight / streamHeight
+        sourceX: viewport ? viewport.x : 0,
+        sourceY: viewport ? viewport.y : 0,
+        sourceWidth,
+        sourceHeight,
+        scaleX: sourceWidth / streamWidth,
+        scaleY: sourceHeight / streamHeight
+    };
+}
+
+function toNativeCoordinates(event) {
+    const dimensions = calculateStreamDimensions();
+    return {
+        x: dimensions.sourceX + (event.clientX - dimensions.container.left - dimensions.offsetX) * dimensions.scaleX,
+        y: dimensions.sourceY + (event.clientY - dimensions.container.top - dimensions.offsetY) * dimensions.scaleY
     };
 }
 
+async function setViewport(viewport) {
+    const response = await apiCall('/api/stream/settings', 'POST', { viewport });
+    if (response.status !== 'error') {
+        updateSettingsDisplay(response);
+    }
+}
+
+function initializeViewportSelection() {
+    const selectButton = document.getElementById('selectViewport');
+    const windowSelect = document.getElementById('streamWindow');
+    let start = null;
+
+    // The list is fetched when opened, since windows come and go
+    windowSelect.addEventListener('focus', async () => {
+        const response = await apiCall('/api/stream/windows');
+        windowSelect.replaceChildren(new Option('Whole display', ''), ...response.windows.map((entry) => new Option(
+            `${entry.title} - ${entry.rect[2]} x ${entry.rect[3]}`,
+            entry.id
+        )));
+        windowSelect.value = response.window ?? '';
+    });
+    windowSelect.addEventListener('change', async () => {
+        const selected = windowSelect.value ? Number(windowSelect.value) : null;
+        const response = await apiCall('/api/stream/settings', 'POST', { window: selected });
+        if (response.status !== 'error') {
+            updateSettingsDisplay(response);
+        }
+    });
+
+    selectButton.addEventListener('click', () => {
+        streamUI.selectingViewport = !streamUI.selectingViewport;
+        selectButton.classList.toggle('ring-2', streamUI.selectingViewport);
+    });
+    document.getElementById('resetViewport').addEventListener('click', () => setViewport(null));
+
+    // While selecting, a drag on the stream picks the region instead of being sent as input
+    streamUI.view.addEventListener('mousedown', (event) => {
+        if (streamUI.selectingViewport) {
+            start = toNativeCoordinates(event);
+        }
+    });
+    streamUI.view.addEventListener('mouseup', (event) => {
+        if (!streamUI.selectingViewport || !start) return;
+        const end = toNativeCoordinates(event);
+        streamUI.selectingViewport = false;
+        selectButton.classList.remove('ring-2');
+        setViewport({
+            x: Math.round(Math.min(start.x, end.x)),
+            y: Math.round(Math.min(start.y, end.y)),
+            width: Math.round(Math.abs(end.x - start.x)),
+            height: Math.round(Math.abs(end.y - start.y))
+        });
+        start = null;
+    });
+
+    // Clicking the overview moves the viewport there, keeping its size
+    streamUI.overview.addEventListener('click', (event) => {
+        const viewport = streamUI.viewport;
+        if (!viewport) return;
+        const rect = streamUI.overview.getBoundingClientRect();
+        const x = (event.clientX - rect.left) / rect.width * nativeWidth;
+        const y = (event.clientY - rect.top) / rect.height * nativeHeight;
+        setViewport({
+            x: Math.round(x - viewport.width / 2),
+            y: Math.round(y - viewport.height / 2),
+            width: viewport.width,
+            height: viewport.height
+        });
+    });
+}
+
 function updateSettingsDisplay(settings) {
     nativeWidth = settings.native_width;
     nativeHeight = settings.native_height;
     streamUI.nativeWidth = settings.native_width;
     streamUI.nativeHeight = settings.native_height;
+    streamUI.origin = settings.origin;
+    streamUI.setViewport(settings.viewport);
+
+    const outputSelect = document.getElementById('streamOutput');
+    outputSelect.replaceChildren(...settings.outputs.map((output) => new Option(
+        `${output.name}${output.primary ? ' (primary)' : ''} - ${output.width} x ${output.height}`,
+        output.id
+    )));
+    outputSelect.value = settings.output;
 
     const resolutionPercentage = settings.resolution_percentage;
     const resolutionText = resolutionPercentage == 100 ?
@@ -217,6 +623,20 @@ function updateSettingsDisplay(settings) {
         `${resolutionPercentage}% (${Math.round(nativeWidth * resolutionPercentage / 100)} x ${Math.round(nativeHeight * resolutionPercentage / 100)})`;
     document.getElementById('resolutionValue').textContent = resolutionText;
 
+    const encodingSelect = document.getElementById('streamEncoding');
+    Array.from(encodingSelect.options).forEach((option) => {
+        option.disabled = Boolean(settings.encodings) && !settings.encodings.includes(option.value);
+    });
+    encodingSelect.value = settings.encoding;
+    const imageEncoderSelect = document.getElementById('streamImageEncoder');
+    imageEncoderSelect.replaceChildren(
+        new Option('Fastest within target bitrate', 'auto'),
+        ...settings.image_encoders.map((encoder) => new Option(encoder, encoder))
+    );
+    imageEncoderSelect.value = settings.image_encoder;
+    document.getElementById('streamAdaptive').checked = settings.adaptive;
+    document.getElementById('streamMetricsOverlay').checked = settings.metrics_overlay;
+
     const fpsValue = document.getElementById('fpsValue');
     fpsValue.textContent = settings.target_fps === null ?
         '(Unlimited FPS)' :
@@ -249,7 +669,11 @@ async function updateStreamSettings() {
     const response = await apiCall('/api/stream/settings', 'POST', {
         quality: parseInt(quality),
         resolution_percentage: parseInt(resolutionPercentage),
-        target_fps: fps ? parseInt(fps) : null
+        target_fps: fps ? parseInt(fps) : null,
+        encoding: document.getElementById('streamEncoding').value,
+        image_encoder: document.getElementById('streamImageEncoder').value,
+        adaptive: document.getElementById('streamAdaptive').checked,
+        metrics_overlay: document.getElementById('streamMetricsOverlay').checked
     });
 
     updateSettingsDisplay(response);
@@ -261,6 +685,94 @@ function setAutoFPS() {
     updateStreamSettings();
 }
 
+function initializeRecordings() {
+    const recordButton = document.getElementById('toggleRecording');
+    let recording = false;
+
+    const refresh = async () => {
+        const response = await apiCall('/api/recordings');
+        recording = response.active.some((active) => active.profile === 'default');
+        recordButton.textContent = recording ? 'Stop recording' : 'Start recording';
+        recordButton.classList.toggle('bg-red-600', recording);
+        document.getElementById('recordingList').replaceChildren(...response.sessions.reverse().map((session) => new Option(
+            `${session.name} (${Math.round(session.duration)} s${session.recording ? ', recording' : ''})`,
+            session.name
+        )));
+    };
+
+    recordButton.addEventListener('click', async () => {
+        await apiCall(`/api/recordings/${recording ? 'stop' : 'start'}`, 'POST', { profile: 'default' });
+        await refresh();
+    });
+    document.getElementById('playRecording').addEventListener('click', () => {
+        const name = document.getElementById('recordingList').value;
+        if (name && !streamActive) {
+            const start = parseFloat(document.getElementById('playbackStart').value) || 0;
+            playPackets(`/api/recordings/${encodeURIComponent(name)}/play?start=${start}`);
+        }
+    });
+    // The server keeps the last seconds of the binary stream in memory, so they can be replayed once it stops
+    document.getElementById('playReplay').addEventListener('click', () => {
+        if (!streamActive) {
+            const ago = parseFloat(document.getElementById('replaySeconds').value) || 10;
+            playPackets(`/api/replay/stream?ago=${ago}`);
+        }
+    });
+    refresh();
+}
+
+async function playPackets(url) {
+    stopPlayback();
+    const controller = new AbortController();
+    playback = controller;
+    streamUI.clear();
+    streamUI.acknowledge = null;
+    streamUI.requestKeyframe = null;
+    // Recorded frames are old by design, so they say nothing about live latency
+    streamUI.clock = null;
+    streamUI.show();
+
+    try {
+        const response = await fetch(url, { signal: controller.signal });
+        const reader = response.body.getReader();
+        let buffered = new Uint8Array(0);
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) {
+                break;
+            }
+            const joined = new Uint8Array(buffered.length + value.length);
+            joined.set(buffered);
+            joined.set(value, buffered.length);
+            buffered = joined;
+
+            // Recorded packets are the live binary packets, each prefixed with its little-endian length
+            while (buffered.length >= 4) {
+                const length = new DataView(buffered.buffer, buffered.byteOffset, 4).getUint32(0, true);
+                if (buffered.length < 4 + length) {
+                    break;
+                }
+                streamUI.updateFrame(buffered.slice(4, 4 + length).buffer);
+                buffered = buffered.subarray(4 + length);
+            }
+        }
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Playback failed:', error);
+        }
+    }
+    if (playback === controller) {
+        playback = null;
+    }
+}
+
+function stopPlayback() {
+    if (playback) {
+        playback.abort();
+        playback = null;
+    }
+}
+
 export {
     initializeStream,
     streamUI,
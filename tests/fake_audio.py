@@ -0,0 +1,94 @@
+# Stands in for the pyaudio module in tests and benchmarks, passed to AudioManager or AudioEngine as the backend
+import time
+
+from core.audio_engine import PA_INT16
+
+# Seconds; roughly what PortAudio takes for each call with WASAPI/MME on Windows
+FAKE_DELAYS = {"init_delay": 0.15, "query_delay": 0.002, "open_delay": 0.02, "terminate_delay": 0.03}
+
+
+class FakeAudioStream:
+    def __init__(self, backend, rate, frames_per_buffer=1024, **_):
+        self.backend = backend
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.position = 0
+        self.written = 0
+        self.closed = False
+
+    def read(self, frames, exception_on_overflow=True):  # noqa: ARG002, FBT002
+        time.sleep(frames / self.rate * self.backend.realtime)
+        self.position += frames
+        return bytes(frames * 2)
+
+    def write(self, data):
+        self.written += len(data)
+        time.sleep(len(data) / 2 / self.rate * self.backend.realtime)
+
+    def get_input_latency(self):
+        return self.frames_per_buffer / self.rate
+
+    def get_output_latency(self):
+        return self.frames_per_buffer / self.rate
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAudioHost:
+    def __init__(self, backend):
+        self.backend = backend
+        time.sleep(backend.init_delay)
+
+    def get_device_count(self):
+        return len(self.backend.devices)
+
+    def get_device_info_by_index(self, index):
+        time.sleep(self.backend.query_delay)
+        return {"index": index, "hostApi": 0, **self.backend.devices[index]}
+
+    def is_format_supported(self, rate, **_):
+        time.sleep(self.backend.query_delay)
+        if rate not in self.backend.rates:
+            msg = "Invalid sample rate"
+            raise ValueError(msg)
+        return True
+
+    def open(self, **kwargs):
+        time.sleep(self.backend.open_delay)
+        stream = FakeAudioStream(self.backend, **kwargs)
+        self.backend.opened += 1
+        return stream
+
+    def terminate(self):
+        time.sleep(self.backend.terminate_delay)
+
+
+class FakeAudioBackend:
+    paInt16 = PA_INT16  # noqa: N815
+
+    def __init__(self, devices=None, realtime=1.0, **delays):
+        self.devices = devices or [
+            {"name": "Microphone (USB Audio)", "maxInputChannels": 1, "maxOutputChannels": 0,
+             "defaultSampleRate": 48000.0},
+            {"name": "Stereo Mix (Realtek Audio)", "maxInputChannels": 2, "maxOutputChannels": 0,
+             "defaultSampleRate": 48000.0},
+            {"name": "Speakers (Realtek Audio)", "maxInputChannels": 0, "maxOutputChannels": 2,
+             "defaultSampleRate": 48000.0},
+        ]
+        self.rates = (16000, 24000, 44100, 48000)
+        delays = {**FAKE_DELAYS, **delays}
+        self.init_delay = delays["init_delay"]
+        self.query_delay = delays["query_delay"]
+        self.open_delay = delays["open_delay"]
+        self.terminate_delay = delays["terminate_delay"]
+        self.realtime = realtime
+        self.hosts = 0
+        self.opened = 0
+
+    def PyAudio(self):  # noqa: N802
+        self.hosts += 1
+        return FakeAudioHost(self)
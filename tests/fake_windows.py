@@ -0,0 +1,27 @@
+# Stands in for Win32WindowProvider in tests, passed to StreamManager as the window provider
+from threading import Lock
+
+
+class FakeWindowProvider:
+    def __init__(self, windows=None):
+        self.lock = Lock()
+        # id -> (title, (x, y, width, height))
+        self.windows = dict(windows or {})
+
+    def list_windows(self):
+        with self.lock:
+            return [{"id": handle, "title": title, "rect": rect} for handle, (title, rect) in self.windows.items()]
+
+    def window_rect(self, handle):
+        with self.lock:
+            window = self.windows.get(handle)
+        return window[1] if window else None
+
+    def move(self, handle, rect):
+        with self.lock:
+            title, _ = self.windows[handle]
+            self.windows[handle] = (title, tuple(rect))
+
+    def close(self, handle):
+        with self.lock:
+            self.windows.pop(handle, None)
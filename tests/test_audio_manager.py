@@ -0,0 +1,44 @@
+import pytest
+
+from core.audio_manager import AudioManager
+from tests.fake_audio import FakeAudioBackend
+
+
+class FakeSocketIO:
+    def emit(self, event, data, room=None):
+        pass
+
+
+def test_capture_settings_refused_while_shared():
+    backend = FakeAudioBackend(init_delay=0, query_delay=0, open_delay=0, terminate_delay=0)
+    manager = AudioManager(FakeSocketIO(), backend)
+    manager.start_stream("first", "server_mic")
+    manager.start_stream("second", "server_mic")
+    try:
+        with pytest.raises(ValueError, match="more than one listener"):
+            manager.update_settings({"type": "server", "rate": 16000})
+        assert manager.configs["server"]["rate"] != 16000
+
+        # Settings that leave the capture alone still apply
+        manager.update_settings({"type": "server", "mic_gain": 2.0})
+        assert manager.configs["server"]["mic_gain"] == 2.0
+
+        manager.stop_stream("server_mic", "second")
+        manager.update_settings({"type": "server", "rate": 16000})
+        assert manager.configs["server"]["rate"] == 16000
+    finally:
+        manager.stop_stream("server_mic", "first")
+
+
+def test_shutdown_releases_the_audio_host():
+    backend = FakeAudioBackend(init_delay=0, query_delay=0, open_delay=0, terminate_delay=0)
+    manager = AudioManager(FakeSocketIO(), backend)
+    manager.start_stream("listener", "server_mic")
+    manager.start_stream("mixer", "server_mix")
+
+    manager.shutdown()
+
+    stats = manager.engine.stats()
+    assert not stats["initialized"]
+    assert stats["open_streams"] == 0
+    assert all(not state["active"] and state["thread"] is None for state in manager.streams.values())
@@ -0,0 +1,18 @@
+from core.capture_backends import SyntheticBackend
+from core.stream_manager import StreamManager
+
+
+def test_capture_follows_fastest_broadcast():
+    manager = StreamManager(socketio=None, capture_backend=SyntheticBackend(320, 240))
+    hub = manager.capture_hubs[0]
+    try:
+        manager.subscribe("thumbnail-viewer", binary=True, layer="thumbnail")
+        assert hub.target_fps == 2
+
+        manager.subscribe("full-viewer", binary=True, layer="full")
+        assert hub.target_fps == 60
+
+        manager.unsubscribe("full-viewer")
+        assert hub.target_fps == 2
+    finally:
+        manager.stop_all()
@@ -0,0 +1,17 @@
+import numpy as np
+import pytest
+from cv2 import IMREAD_COLOR, imdecode
+
+from core.capture_backends import SyntheticBackend
+from core.image_encoders import IMAGE_FORMATS
+from core.stream_manager import StreamManager
+
+
+@pytest.mark.parametrize("image_format", IMAGE_FORMATS)
+def test_screenshot_formats(image_format):
+    manager = StreamManager(socketio=None, capture_backend=SyntheticBackend(320, 240))
+    image, mimetype = manager.get_screenshot(image_format, quality=80, scale=50)
+
+    assert mimetype == f"image/{image_format}"
+    decoded = imdecode(np.frombuffer(image, dtype=np.uint8), IMREAD_COLOR)
+    assert decoded.shape == (120, 160, 3)
@@ -0,0 +1,94 @@
+import time
+from threading import Thread
+
+from core.jitter_buffer import JitterBuffer
+
+FRAME = 0.02
+
+
+def make_buffer():
+    buffer = JitterBuffer(FRAME)
+    buffer.origin = 0.0
+    return buffer
+
+
+def push(buffer, sequence, payload=None):
+    # Arriving exactly on schedule keeps the measured jitter, and so the target depth, at its minimum
+    buffer.push(sequence, payload or f"frame {sequence}".encode(), arrival=sequence * FRAME)
+
+
+def test_reordered_frames_play_in_sequence():
+    buffer = make_buffer()
+    for sequence in (2, 1, 3):
+        push(buffer, sequence)
+
+    assert [buffer.pop(0) for _ in range(3)] == [b"frame 1", b"frame 2", b"frame 3"]
+
+
+def test_late_frame_is_dropped():
+    buffer = make_buffer()
+    push(buffer, 1)
+    push(buffer, 2)
+    buffer.pop(0)
+    buffer.pop(0)
+
+    push(buffer, 1)
+
+    assert buffer.stats()["late"] == 1
+    assert buffer.stats()["depth"] == 0
+
+
+def test_gap_is_concealed_and_empty_buffer_underruns():
+    buffer = make_buffer()
+    push(buffer, 1)
+    push(buffer, 3)
+
+    assert buffer.pop(0) == b"frame 1"
+    # Frame 2 is missing but 3 is already here: conceal and keep playing
+    assert buffer.pop(0) is None
+    assert buffer.stats()["concealed"] == 1
+    assert buffer.pop(0) == b"frame 3"
+    # Nothing left: an underrun, which stops playback until the buffer refills
+    assert buffer.pop(0) is None
+    stats = buffer.stats()
+    assert stats["underruns"] == 1
+    assert not stats["playing"]
+
+
+def test_overrun_catches_up_to_newest_frames():
+    buffer = make_buffer()
+    for sequence in range(1, 7):
+        push(buffer, sequence)
+
+    assert buffer.pop(0) == b"frame 4"
+    assert buffer.stats()["overruns"] == 3
+
+
+def test_sender_restart_starts_over():
+    buffer = make_buffer()
+    for sequence in range(100, 103):
+        push(buffer, sequence)
+        buffer.pop(0)
+
+    push(buffer, 1, b"restarted")
+
+    assert buffer.pop(0) == b"restarted"
+    assert buffer.stats()["late"] == 0
+
+
+def test_clear_while_waiting_returns_concealment():
+    buffer = make_buffer()
+    push(buffer, 1)
+    assert buffer.pop(0) == b"frame 1"
+
+    results = []
+    waiter = Thread(target=lambda: results.append(buffer.pop(1.0)))
+    waiter.start()
+    time.sleep(0.05)
+    # Cleared while pop waits for frame 2; the new stream's first frame wakes it
+    buffer.clear()
+    push(buffer, 7, b"new stream")
+    waiter.join()
+
+    assert results == [None]
+    assert buffer.pop(0) == b"new stream"
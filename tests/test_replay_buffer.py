@@ -0,0 +1,26 @@
+from core.replay_buffer import ReplayBuffer
+
+
+def test_oversized_keyframe_is_kept():
+    buffer = ReplayBuffer(max_seconds=10.0, max_bytes=1024)
+    buffer.append(0.0, True, bytes(4096))
+    buffer.append(0.1, False, bytes(100))
+
+    stats = buffer.stats()
+    assert stats["frames"] == 2
+    assert stats["start"] == 0.0
+
+
+def test_oversized_group_keeps_newest_group_only():
+    buffer = ReplayBuffer(max_seconds=10.0, max_bytes=1024 * 1024)
+    buffer.append(0.0, True, bytes(1000))
+    for index in range(300):
+        buffer.append(0.01 * (index + 1), False, bytes(5 * 1024))
+    buffer.append(4.0, True, bytes(1000))
+    for index in range(300):
+        buffer.append(4.0 + 0.01 * (index + 1), False, bytes(5 * 1024))
+
+    # The first group was evicted; the newest one stays decodable from its keyframe even though it is over budget
+    packets = buffer.frames_between(4.0, 10.0)
+    assert len(packets) == 301
+    assert buffer.stats()["start"] == 4.0
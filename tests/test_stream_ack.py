@@ -0,0 +1,19 @@
+from core.capture_backends import SyntheticBackend
+from core.stream_manager import StreamManager
+
+
+def test_ack_reaches_sse_subscription():
+    # SSE viewers subscribe under their Socket.IO sid, which is also the sid their stream_ack events arrive with
+    manager = StreamManager(socketio=None, capture_backend=SyntheticBackend(320, 240))
+    subscriber = manager.subscribe("viewer-socket", binary=False)
+    frames = manager.stream_generator(subscriber)
+    try:
+        next(frames)
+        seq = next(iter(subscriber.pending))
+        manager.acknowledge("viewer-socket", seq)
+
+        broadcast, _ = manager.subscriptions["viewer-socket"]
+        assert subscriber.acked == 1
+        assert "viewer-socket" in broadcast.controller.samples
+    finally:
+        frames.close()
@@ -0,0 +1,21 @@
+import time
+
+from core.stream_metrics import RateMeter, StageStats
+
+
+def test_rate_meter_measures_ticks():
+    meter = RateMeter(window=0.05)
+    for _ in range(20):
+        meter.tick()
+        time.sleep(0.005)
+    assert meter.rate > 0
+
+
+def test_stalled_meter_reads_zero():
+    stats = StageStats("encode")
+    stats.meter = RateMeter(window=0.05)
+    for _ in range(20):
+        stats.record(0.001)
+        time.sleep(0.005)
+    time.sleep(0.15)
+    assert stats.snapshot()["fps"] == 0
@@ -0,0 +1,22 @@
+from core.stream_protocol import FLAG_KEYFRAME, FRAME_TILES, FrameInfo, pack_tiles, unpack_header, unpack_tiles
+
+
+def test_tiles_round_trip():
+    tiles = [(0, 0, 64, 64, b"first tile"), (64, 128, 32, 16, b""), (1856, 1024, 64, 56, bytes(range(256)))]
+    packet = pack_tiles(FrameInfo(2**32 + 5, 12.5, 1920, 1080), tiles, keyframe=False, flags=0x20)
+
+    assert unpack_header(packet) == {
+        "frame_type": FRAME_TILES,
+        "flags": 0x20,
+        "seq": 5,
+        "timestamp": 12.5,
+        "width": 1920,
+        "height": 1080,
+    }
+    assert unpack_tiles(packet) == tiles
+
+
+def test_keyframe_flag_is_set():
+    packet = pack_tiles(FrameInfo(1, 0.0, 64, 64), [(0, 0, 64, 64, b"tile")], keyframe=True)
+
+    assert unpack_header(packet)["flags"] & FLAG_KEYFRAME
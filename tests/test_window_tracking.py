@@ -0,0 +1,73 @@
+import pytest
+
+from core.capture_backends import SyntheticBackend
+from core.stream_manager import StreamManager
+from tests.fake_windows import FakeWindowProvider
+
+WINDOW = 7
+
+
+@pytest.fixture
+def windows():
+    return FakeWindowProvider({WINDOW: ("Editor", (10, 20, 100, 80))})
+
+
+@pytest.fixture
+def manager(windows):
+    # Two 320x240 displays side by side
+    outputs = [SyntheticBackend(320, 240), SyntheticBackend(320, 240, origin=(320, 0), seed=1)]
+    manager = StreamManager(socketio=None, capture_backend=outputs, window_provider=windows)
+    manager.update_settings({"window": WINDOW})
+    # Polled by hand below instead of on the tracker's own thread
+    manager.window_trackers["default"].stop()
+    yield manager
+    manager.stop_all()
+
+
+def follow(manager, windows, rect):
+    if rect is None:
+        windows.close(WINDOW)
+    else:
+        windows.move(WINDOW, rect)
+    manager.window_trackers["default"].poll()
+
+
+def test_move_within_display(manager, windows):
+    assert manager.get_viewport() == {"x": 10, "y": 20, "width": 100, "height": 80}
+
+    follow(manager, windows, (50, 60, 100, 80))
+
+    assert manager.stream_settings["output"] == 0
+    assert manager.get_viewport() == {"x": 50, "y": 60, "width": 100, "height": 80}
+    assert manager.get_input_origin() == (50, 60)
+
+
+def test_move_onto_another_output(manager, windows):
+    origins = []
+    manager.origin_changed = origins.append
+
+    follow(manager, windows, (400, 30, 100, 80))
+
+    assert manager.stream_settings["output"] == 1
+    assert manager.get_viewport() == {"x": 80, "y": 30, "width": 100, "height": 80}
+    assert manager.get_input_origin() == (400, 30)
+    assert origins == [(400, 30)]
+
+
+def test_minimize_keeps_last_region(manager, windows):
+    follow(manager, windows, (0, 0, 0, 0))
+
+    assert manager.stream_settings["window"] == WINDOW
+    assert manager.get_viewport() == {"x": 10, "y": 20, "width": 100, "height": 80}
+
+
+def test_close_falls_back_to_whole_display(manager, windows):
+    tracker = manager.window_trackers["default"]
+
+    follow(manager, windows, None)
+
+    assert manager.stream_settings["window"] is None
+    assert manager.get_viewport() is None
+    assert manager.get_input_origin() == (0, 0)
+    assert "default" not in manager.window_trackers
+    assert tracker.rect is None